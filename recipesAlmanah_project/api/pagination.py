@@ -0,0 +1,48 @@
+# api/pagination.py
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def get_limit(params):
+    """Размер страницы из ?limit= (ValueError при неверном значении)"""
+    limit = int(params.get('limit', DEFAULT_LIMIT))
+    if limit < 1:
+        raise ValueError('limit должен быть положительным')
+    return min(limit, MAX_LIMIT)
+
+
+def encode_cursor(obj, date_field):
+    return f"{getattr(obj, date_field).isoformat()}_{obj.pk}"
+
+
+def decode_cursor(cursor):
+    created_at, _, last_id = cursor.rpartition('_')
+    parsed = parse_datetime(created_at)
+    if parsed is None:
+        raise ValueError(f"Неверный курсор: {cursor}")
+    return parsed, int(last_id)
+
+
+def cursor_paginate(queryset, date_field, cursor=None, limit=DEFAULT_LIMIT):
+    """Keyset-пагинация по (date_field DESC, id DESC).
+
+    Возвращает (объекты страницы, курсор следующей страницы или None).
+    """
+    queryset = queryset.order_by(f'-{date_field}', '-id')
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': value}) |
+            Q(**{date_field: value, 'id__lt': last_id})
+        )
+
+    # Берем на один больше, чтобы понять, есть ли следующая страница
+    items = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1], date_field)
+    return items, next_cursor
@@ -0,0 +1,175 @@
+# api/resources.py
+"""Описание ресурсов API: какие поля можно запросить через ?fields=
+и какие связи подгрузить через ?include=."""
+from collections import namedtuple
+
+from django.db.models import Prefetch
+
+from comments.models import Comment
+from others.models import Article
+from recipes.models import Recipe, Ingredient, CookingStep, Hashtag
+
+# only - поля модели для .only(); get - получение значения из объекта;
+# related - lookup для select_related; annotation - выражение для annotate
+Field = namedtuple('Field', ['only', 'get', 'related', 'annotation'], defaults=(None, None))
+
+
+def attr(name):
+    return Field([name], lambda obj: getattr(obj, name))
+
+
+def file_url(name):
+    return Field([name], lambda obj: getattr(obj, name).url if getattr(obj, name) else None)
+
+
+def author_name():
+    return Field(['author__username'], lambda obj: obj.author.username, related='author')
+
+
+class Resource:
+    model = None
+    fields = {}
+    default_fields = []
+    # имя связи -> (атрибут объекта, класс вложенного ресурса, поле FK для only() вложенных объектов)
+    includes = {}
+
+    def __init__(self, fields=None, includes=()):
+        fields = list(fields or self.default_fields)
+        unknown = [name for name in fields if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+        unknown = [name for name in includes if name not in self.includes]
+        if unknown:
+            raise ValueError(f"Неизвестные связи: {', '.join(unknown)}")
+        self.field_names = fields
+        self.include_names = list(includes)
+
+    @classmethod
+    def from_request(cls, request):
+        """Ресурс с полями из ?fields=a,b и связями из ?include=x,y"""
+        fields = [name for name in request.GET.get('fields', '').split(',') if name]
+        includes = [name for name in request.GET.get('include', '').split(',') if name]
+        return cls(fields or None, includes)
+
+    def prepare(self, queryset, extra_only=()):
+        """Ограничить выборку запрошенными полями и подгрузить связи"""
+        only = {'id', *extra_only}
+        related = set()
+        for name in self.field_names:
+            field = self.fields[name]
+            only.update(field.only)
+            if field.related:
+                related.add(field.related)
+            if field.annotation is not None:
+                # Свое имя, чтобы не конфликтовать со свойствами модели (Recipe.favorite_count)
+                queryset = queryset.annotate(**{f'{name}_value': field.annotation})
+        if related:
+            queryset = queryset.select_related(*related)
+        queryset = queryset.only(*only)
+
+        for name in self.include_names:
+            attribute, nested_class, fk_name = self.includes[name]
+            nested = nested_class()
+            nested_queryset = nested.prepare(
+                nested_class.model.objects.all(),
+                extra_only=[fk_name] if fk_name else (),
+            )
+            queryset = queryset.prefetch_related(Prefetch(attribute, queryset=nested_queryset))
+        return queryset
+
+    def serialize(self, obj):
+        data = {name: self.fields[name].get(obj) for name in self.field_names}
+        for name in self.include_names:
+            attribute, nested_class, fk_name = self.includes[name]
+            nested = nested_class()
+            data[name] = [nested.serialize(item) for item in getattr(obj, attribute).all()]
+        return data
+
+
+class HashtagResource(Resource):
+    model = Hashtag
+    fields = {
+        'id': attr('id'),
+        'name': attr('name'),
+        'slug': attr('slug'),
+    }
+    default_fields = ['id', 'name']
+
+
+class IngredientResource(Resource):
+    model = Ingredient
+    fields = {
+        'id': attr('id'),
+        'name': attr('name'),
+        'quantity': attr('quantity'),
+    }
+    default_fields = ['id', 'name', 'quantity']
+
+
+class CookingStepResource(Resource):
+    model = CookingStep
+    fields = {
+        'id': attr('id'),
+        'step_number': attr('step_number'),
+        'description': attr('description'),
+        'photo': file_url('photo'),
+    }
+    default_fields = ['id', 'step_number', 'description', 'photo']
+
+
+class RecipeResource(Resource):
+    model = Recipe
+    fields = {
+        'id': attr('id'),
+        'title': attr('title'),
+        'description': attr('description'),
+        'author': author_name(),
+        'cooking_time': attr('cooking_time'),
+        'servings': attr('servings'),
+        'calories_per_100g': attr('calories_per_100g'),
+        'difficulty': attr('difficulty'),
+        'created_at': attr('created_at'),
+        'updated_at': attr('updated_at'),
+        'main_photo': file_url('main_photo'),
+        'video': file_url('video'),
+        # Денормализованный счетчик (recipes.popularity), без COUNT по избранному
+        'favorite_count': attr('favorites_count'),
+    }
+    default_fields = ['id', 'title', 'description', 'author', 'cooking_time', 'servings',
+                      'calories_per_100g', 'difficulty', 'created_at', 'main_photo']
+    includes = {
+        'ingredients': ('ingredients', IngredientResource, 'recipe_id'),
+        'cooking_steps': ('cooking_steps', CookingStepResource, 'recipe_id'),
+        'hashtags': ('hashtags', HashtagResource, None),
+    }
+
+
+class CommentResource(Resource):
+    model = Comment
+    fields = {
+        'id': attr('id'),
+        'author': author_name(),
+        'text': attr('text'),
+        'image': file_url('image'),
+        'created_at': attr('created_at'),
+        'updated_at': attr('updated_at'),
+    }
+    default_fields = ['id', 'author', 'text', 'image', 'created_at']
+
+
+class ArticleResource(Resource):
+    model = Article
+    fields = {
+        'id': attr('id'),
+        'title': attr('title'),
+        'content': attr('content'),
+        'author': author_name(),
+        'published_at': attr('published_at'),
+        'updated_at': attr('updated_at'),
+        'main_image': file_url('main_image'),
+        'views_count': attr('views_count'),
+    }
+    default_fields = ['id', 'title', 'author', 'published_at', 'main_image', 'views_count']
+    includes = {
+        'hashtags': ('hashtags', HashtagResource, None),
+    }
@@ -0,0 +1,14 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    # Версия 1
+    path('v1/recipes/', views.recipe_list, name='recipe-list'),
+    path('v1/recipes/<int:pk>/', views.recipe_detail, name='recipe-detail'),
+    path('v1/recipes/<int:pk>/comments/', views.recipe_comments, name='recipe-comments'),
+    path('v1/hashtags/', views.hashtag_list, name='hashtag-list'),
+    path('v1/articles/', views.article_list, name='article-list'),
+    path('v1/articles/<int:pk>/', views.article_detail, name='article-detail'),
+]
@@ -0,0 +1,125 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from comments.models import Comment
+from others.models import Article
+from recipes.models import Recipe, Hashtag
+from .pagination import cursor_paginate, get_limit
+from .resources import RecipeResource, HashtagResource, CommentResource, ArticleResource
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него работает стандартный json
+    orjson = None
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+
+
+def json_response(request, payload, status=200):
+    """JSON-ответ с ETag; на совпадающий If-None-Match отвечаем 304"""
+    body = dumps(payload)
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+    if status == 200:
+        # GZip делает ETag слабым (W/"..."), поэтому сравниваем без префикса
+        client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+        if etag in client_etags:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+    response = HttpResponse(body, content_type='application/json', status=status)
+    response['ETag'] = etag
+    return response
+
+
+def error_response(request, message, status=400):
+    return json_response(request, {'error': message}, status=status)
+
+
+def api_view(view_func):
+    """GET-only, gzip и ошибки параметров (ValueError) как JSON 400"""
+    @gzip_page
+    @require_GET
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except ValueError as e:
+            return error_response(request, str(e))
+
+    return _wrapped_view
+
+
+def paginated_response(request, resource, items, next_cursor):
+    return json_response(request, {
+        'data': [resource.serialize(item) for item in items],
+        'next_cursor': next_cursor,
+    })
+
+
+@api_view
+def recipe_list(request):
+    """Лента рецептов с теми же фильтрами, что и RecipeListView (q, hashtags, NUTRITION_FILTERS)"""
+    resource = RecipeResource.from_request(request)
+    queryset = resource.prepare(Recipe.objects.filter_by_params(request.GET, strict=True), extra_only=['created_at'])
+    items, next_cursor = cursor_paginate(
+        queryset, 'created_at', request.GET.get('cursor'), get_limit(request.GET)
+    )
+    return paginated_response(request, resource, items, next_cursor)
+
+
+@api_view
+def recipe_detail(request, pk):
+    resource = RecipeResource.from_request(request)
+    recipe = resource.prepare(Recipe.objects.filter(pk=pk)).first()
+    if recipe is None:
+        return error_response(request, 'Рецепт не найден', status=404)
+    return json_response(request, {'data': resource.serialize(recipe)})
+
+
+@api_view
+def recipe_comments(request, pk):
+    """Комментарии к рецепту, новые сверху (та же пагинация, что и comments:comment-list)"""
+    if not Recipe.objects.filter(pk=pk).exists():
+        return error_response(request, 'Рецепт не найден', status=404)
+    resource = CommentResource.from_request(request)
+    items, next_cursor = Comment.objects.page_for_recipe(
+        pk, cursor=request.GET.get('cursor'), limit=get_limit(request.GET)
+    )
+    return paginated_response(request, resource, items, next_cursor)
+
+
+@api_view
+def hashtag_list(request):
+    resource = HashtagResource.from_request(request)
+    hashtags = resource.prepare(Hashtag.objects.order_by('name'))
+    return json_response(request, {'data': [resource.serialize(hashtag) for hashtag in hashtags]})
+
+
+@api_view
+def article_list(request):
+    resource = ArticleResource.from_request(request)
+    queryset = resource.prepare(Article.objects.filter(is_published=True), extra_only=['published_at'])
+    items, next_cursor = cursor_paginate(
+        queryset, 'published_at', request.GET.get('cursor'), get_limit(request.GET)
+    )
+    return paginated_response(request, resource, items, next_cursor)
+
+
+@api_view
+def article_detail(request, pk):
+    resource = ArticleResource.from_request(request)
+    article = resource.prepare(Article.objects.filter(pk=pk, is_published=True)).first()
+    if article is None:
+        return error_response(request, 'Статья не найдена', status=404)
+    return json_response(request, {'data': resource.serialize(article)})
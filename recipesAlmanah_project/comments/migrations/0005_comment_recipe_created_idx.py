@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0004_rename_article_commentarticle'),
+        ('recipes', '002_dd_default_hashtags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['recipe', 'created_at'], name='comment_recipe_created_idx'),
+        ),
+    ]
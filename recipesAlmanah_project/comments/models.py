@@ -1,7 +1,12 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
+from django.utils.dateparse import parse_datetime
 from recipes.models import Recipe
 
+# Количество комментариев на одной странице
+COMMENTS_PAGE_SIZE = 20
+
 
 #Модель для предстваления публикаций на сайте
 class CommentArticle(models.Model):
@@ -14,7 +19,54 @@ class CommentArticle(models.Model):
     def __str__(self):
         return self.title
 
-#Модель для представления комментариев к рецептам
+class CommentManager(models.Manager):
+    def page_for_recipe(self, recipe_id, cursor=None, limit=COMMENTS_PAGE_SIZE):
+        """Страница комментариев к рецепту (новые сверху) с курсорной пагинацией
+
+        Курсор - строка "<created_at>_<id>" последнего комментария предыдущей страницы.
+        Возвращает кортеж (список комментариев, курсор следующей страницы или None).
+        """
+        queryset = self._page_queryset(recipe_id, cursor)
+        # Берем на один больше, чтобы понять, есть ли следующая страница
+        return self._split_page(list(queryset[:limit + 1]), limit)
+
+    async def apage_for_recipe(self, recipe_id, cursor=None, limit=COMMENTS_PAGE_SIZE):
+        """Асинхронный вариант page_for_recipe"""
+        queryset = self._page_queryset(recipe_id, cursor)
+        return self._split_page([comment async for comment in queryset[:limit + 1]], limit)
+
+    def _page_queryset(self, recipe_id, cursor):
+        queryset = self.filter(recipe_id=recipe_id).select_related(
+            'author', 'author__profile'
+        ).order_by(*self.model._meta.ordering, '-id')
+
+        if cursor:
+            created_at, last_id = self.parse_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) |
+                Q(created_at=created_at, id__lt=last_id)
+            )
+        return queryset
+
+    @staticmethod
+    def _split_page(comments, limit):
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            last = comments[-1]
+            next_cursor = f"{last.created_at.isoformat()}_{last.pk}"
+        return comments, next_cursor
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """Разобрать курсор, ValueError при неверном формате"""
+        created_at, _, last_id = cursor.rpartition('_')
+        parsed = parse_datetime(created_at)
+        if parsed is None:
+            raise ValueError(f"Неверный курсор: {cursor}")
+        return parsed, int(last_id)
+
+
 # Модель для представления комментариев к рецептам
 class Comment(models.Model):
     # При удалении рецепта удалятся и все комменты
@@ -25,9 +77,14 @@ class Comment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     image = models.ImageField(upload_to='comments/images/', blank=True, null=True)
 
+    objects = CommentManager()
+
     # Сортировка по дате публикации
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipe', 'created_at'], name='comment_recipe_created_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.recipe.title}"
\ No newline at end of file
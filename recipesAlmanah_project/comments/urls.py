@@ -5,5 +5,6 @@ app_name = 'comments'
 
 urlpatterns = [
     path('recipe/<int:pk>/comment/', views.add_comment, name='add-comment'),
+    path('recipe/<int:pk>/comments/', views.comment_list, name='comment-list'),
     path('comment/<int:pk>/delete/', views.delete_comment, name='delete-comment'),
 ]
\ No newline at end of file
@@ -1,12 +1,16 @@
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse, HttpResponseBadRequest
+from django.views.decorators.http import require_GET
 from .models import Comment
 from .forms import CommentForm
 from recipes.models import Recipe
+from others.ratelimit import rate_limit
 
 
 @login_required
+@rate_limit('comments')
 def add_comment(request, pk):
     recipe = get_object_or_404(Recipe, pk=pk)
     if request.method == 'POST':
@@ -32,4 +36,38 @@ def delete_comment(request, pk):
         return redirect('recipes:recipe-detail', pk=recipe_pk)
     else:
         messages.error(request, 'Вы не можете удалить этот комментарий!')
-        return redirect('recipes:recipe-detail', pk=comment.recipe.pk)
\ No newline at end of file
+        return redirect('recipes:recipe-detail', pk=comment.recipe.pk)
+
+
+#Страница комментариев к рецепту: HTML-фрагмент или JSON (?format=json)
+@require_GET
+def comment_list(request, pk):
+    recipe = get_object_or_404(Recipe, pk=pk)
+    try:
+        comments, next_cursor = Comment.objects.page_for_recipe(
+            recipe.pk, cursor=request.GET.get('cursor')
+        )
+    except ValueError:
+        return HttpResponseBadRequest('Неверный курсор')
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'image': comment.image.url if comment.image else None,
+                    'created_at': comment.created_at.isoformat(),
+                    'updated_at': comment.updated_at.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': next_cursor,
+        })
+
+    return render(request, 'comments/_comment_list.html', {
+        'recipe': recipe,
+        'comments': comments,
+        'next_cursor': next_cursor,
+    })
@@ -0,0 +1,27 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'priority', 'attempts', 'run_at', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedup_key']
+    readonly_fields = ['locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at']
+    actions = ['retry_jobs']
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.STATUS_RUNNING).filter(dedup_key__isnull=True).update(
+            status=Job.STATUS_QUEUED, attempts=0, run_at=timezone.now(), finished_at=None
+        )
+        # С ключом дедупликации - по одной, чтобы не нарушить уникальность ожидающих
+        for job in queryset.exclude(status=Job.STATUS_RUNNING).filter(dedup_key__isnull=False):
+            if not Job.objects.filter(dedup_key=job.dedup_key, status=Job.STATUS_QUEUED).exists():
+                Job.objects.filter(pk=job.pk).update(
+                    status=Job.STATUS_QUEUED, attempts=0, run_at=timezone.now(), finished_at=None
+                )
+                updated += 1
+        self.message_user(request, f"Поставлено в очередь: {updated}")
@@ -0,0 +1,81 @@
+import logging
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.registry import schedule_all_periodic
+from jobs.worker import work
+
+
+class Command(BaseCommand):
+    help = 'Запустить воркер(ы) очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Количество процессов-воркеров')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument('--max-jobs', type=int, help='Завершиться после стольких задач (на процесс)')
+        parser.add_argument('--burst', action='store_true', help='Выполнить готовые задачи и выйти')
+        parser.add_argument('--keep-days', type=int, default=7,
+                            help='Сколько дней хранить выполненные задачи')
+
+    def handle(self, *args, **options):
+        # Периодические задачи запускаются, даже если их цепочка прервалась
+        schedule_all_periodic()
+
+        if options['processes'] <= 1:
+            self._run(options)
+            return
+
+        # Соединения родителя не должны наследоваться дочерними процессами
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=self._run_child, args=(options,), daemon=False)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Запущено воркеров: {len(processes)}")
+
+        # Ctrl+C получают все процессы группы; родитель просто ждет их завершения
+        for process in processes:
+            while process.is_alive():
+                try:
+                    process.join()
+                except KeyboardInterrupt:
+                    pass
+
+    def _run_child(self, options):
+        try:
+            self._run(options)
+        finally:
+            # Дочерний процесс multiprocessing выходит через os._exit, минуя atexit:
+            # дописываем очередь логов (others.log) сами
+            logging.shutdown()
+
+    def _run(self, options):
+        stopping = []
+
+        def stop(signum, frame):
+            # Текущая задача доводится до конца, новые не берутся
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        def report(job, ok, elapsed):
+            status = self.style.SUCCESS('OK') if ok else self.style.ERROR('ошибка')
+            self.stdout.write(f"[{job.pk}] {job.name}: {status} за {elapsed:.2f}с")
+
+        processed = work(
+            should_stop=lambda: bool(stopping),
+            poll_interval=options['poll_interval'],
+            max_jobs=options['max_jobs'],
+            burst=options['burst'],
+            keep_days=options['keep_days'],
+            on_job=report,
+        )
+        self.stdout.write(f"Воркер завершен, выполнено задач: {processed}")
+        connections.close_all()
@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, router, connections, transaction, IntegrityError
+from django.db.models import F, Q
+from django.utils import timezone
+
+# Через сколько секунд задача в статусе "выполняется" считается брошенной (упавший воркер)
+JOB_STALE_SECONDS = getattr(settings, 'JOB_STALE_SECONDS', 600)
+
+
+class JobManager(models.Manager):
+    def enqueue(self, name, kwargs=None, *, priority=0, dedup_key=None, delay=None, max_attempts=3):
+        """Поставить задачу в очередь.
+
+        Если в очереди уже есть задача с тем же dedup_key, новая не создается,
+        возвращается существующая.
+        """
+        run_at = timezone.now() + timedelta(seconds=delay) if delay else timezone.now()
+        try:
+            with transaction.atomic(using=router.db_for_write(self.model)):
+                return self.create(
+                    name=name,
+                    kwargs=kwargs or {},
+                    priority=priority,
+                    dedup_key=dedup_key,
+                    run_at=run_at,
+                    max_attempts=max_attempts,
+                )
+        except IntegrityError:
+            if dedup_key is None:
+                raise
+            return self.filter(dedup_key=dedup_key, status=Job.STATUS_QUEUED).first()
+
+    def claim(self, worker_id):
+        """Захватить следующую готовую задачу (с наибольшим приоритетом) или вернуть None"""
+        db = router.db_for_write(self.model)
+        now = timezone.now()
+        ready = self.using(db).filter(
+            status=Job.STATUS_QUEUED, run_at__lte=now
+        ).order_by('-priority', 'run_at', 'id')
+        claim_fields = {
+            'status': Job.STATUS_RUNNING,
+            'locked_by': worker_id,
+            'locked_at': now,
+            'attempts': F('attempts') + 1,
+        }
+
+        if connections[db].features.has_select_for_update_skip_locked:
+            # PostgreSQL: строки, захваченные другими воркерами, просто пропускаются
+            with transaction.atomic(using=db):
+                job_ids = list(ready.select_for_update(skip_locked=True).values_list('id', flat=True)[:1])
+                if not job_ids:
+                    return None
+                job_id = job_ids[0]
+                self.using(db).filter(pk=job_id).update(**claim_fields)
+        else:
+            # SQLite: блокировок строк нет, но запись сериализована - захват условным UPDATE,
+            # при гонке проигравший воркер переходит к следующему кандидату
+            for job_id in ready.values_list('id', flat=True)[:10]:
+                if self.using(db).filter(pk=job_id, status=Job.STATUS_QUEUED).update(**claim_fields):
+                    break
+            else:
+                return None
+        return self.using(db).get(pk=job_id)
+
+    def requeue_stale(self):
+        """Вернуть в очередь задачи, чей воркер пропал, не завершив их"""
+        stale_before = timezone.now() - timedelta(seconds=JOB_STALE_SECONDS)
+        requeued = 0
+        for job in self.filter(status=Job.STATUS_RUNNING, locked_at__lt=stale_before):
+            requeued += job.retry_or_fail('Воркер не завершил задачу за отведенное время')
+        return requeued
+
+    def purge_finished(self, days=7):
+        """Удалить выполненные задачи старше days дней (упавшие оставляем для разбора)"""
+        finished_before = timezone.now() - timedelta(days=days)
+        deleted, _ = self.filter(status=Job.STATUS_DONE, finished_at__lt=finished_before).delete()
+        return deleted
+
+
+class Job(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Выполнена'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    # Базовая задержка повтора в секундах, удваивается с каждой попыткой
+    RETRY_DELAY = getattr(settings, 'JOB_RETRY_DELAY', 30)
+
+    name = models.CharField(max_length=200, verbose_name="Задача")
+    kwargs = models.JSONField(default=dict, blank=True, verbose_name="Аргументы")
+    priority = models.SmallIntegerField(default=0, verbose_name="Приоритет")
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_QUEUED, verbose_name="Статус")
+    dedup_key = models.CharField(max_length=200, null=True, blank=True, verbose_name="Ключ дедупликации")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Попыток")
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name="Максимум попыток")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Выполнить не раньше")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Воркер")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Захвачена")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создана")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершена")
+
+    objects = JobManager()
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        ordering = ['-created_at']
+        indexes = [
+            # Выборка следующей задачи воркером
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_claim_idx'),
+        ]
+        constraints = [
+            # Не больше одной ожидающей задачи на ключ
+            models.UniqueConstraint(fields=['dedup_key'], condition=Q(status='queued'),
+                                    name='job_unique_queued_dedup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+    def mark_done(self):
+        Job.objects.filter(pk=self.pk).update(
+            status=Job.STATUS_DONE, finished_at=timezone.now(), locked_by='', locked_at=None
+        )
+
+    def retry_or_fail(self, error):
+        """После ошибки: повтор с экспоненциальной задержкой или статус "ошибка".
+        Возвращает True, если задача снова в очереди."""
+        now = timezone.now()
+        if self.attempts < self.max_attempts:
+            delay = self.RETRY_DELAY * 2 ** max(self.attempts - 1, 0)
+            try:
+                with transaction.atomic(using=router.db_for_write(Job)):
+                    Job.objects.filter(pk=self.pk).update(
+                        status=Job.STATUS_QUEUED, run_at=now + timedelta(seconds=delay),
+                        last_error=error, locked_by='', locked_at=None,
+                    )
+                return True
+            except IntegrityError:
+                # В очереди уже ждет задача с тем же ключом - она и выполнит работу
+                error += '\nПовтор не поставлен: в очереди есть задача с тем же ключом'
+        Job.objects.filter(pk=self.pk).update(
+            status=Job.STATUS_FAILED, finished_at=now, last_error=error, locked_by='', locked_at=None
+        )
+        return False
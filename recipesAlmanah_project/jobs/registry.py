@@ -0,0 +1,45 @@
+# jobs/registry.py
+"""Реестр фоновых задач.
+
+Задачи объявляются в модулях tasks.py приложений декоратором @task и
+ставятся в очередь через func.enqueue(kwargs, priority=..., dedup_key=...).
+
+Периодические задачи (@task(every=секунды)) ставит сам воркер: при запуске
+run_worker и после каждого выполнения, успешного или нет, - следующий запуск
+через every секунд с dedup_key, равным имени задачи.
+"""
+from functools import partial
+
+TASKS = {}
+# Имя периодической задачи -> интервал в секундах
+PERIODIC = {}
+
+
+def task(name=None, every=None):
+    def decorator(func):
+        from .models import Job
+
+        task_name = name or f"{func.__module__.split('.')[0]}.{func.__name__}"
+        TASKS[task_name] = func
+        if every:
+            PERIODIC[task_name] = every
+        func.task_name = task_name
+        func.enqueue = partial(Job.objects.enqueue, task_name)
+        return func
+
+    return decorator
+
+
+def enqueue(name, kwargs=None, **options):
+    from .models import Job
+    return Job.objects.enqueue(name, kwargs, **options)
+
+
+def schedule_periodic(name, delay=None):
+    """Поставить следующий запуск периодической задачи (если он еще не в очереди)"""
+    return enqueue(name, dedup_key=name, delay=delay)
+
+
+def schedule_all_periodic():
+    for name in PERIODIC:
+        schedule_periodic(name)
@@ -0,0 +1,75 @@
+# jobs/worker.py
+import logging
+import os
+import socket
+import time
+import traceback
+
+from django.db import close_old_connections
+
+from .models import Job
+from .registry import PERIODIC, TASKS, schedule_periodic
+
+logger = logging.getLogger(__name__)
+
+# Как часто (в секундах) воркер возвращает брошенные задачи и чистит старые
+MAINTENANCE_INTERVAL = 60
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_job(job):
+    """Выполнить захваченную задачу; True при успехе"""
+    func = TASKS.get(job.name)
+    try:
+        try:
+            if func is None:
+                raise LookupError(f"Неизвестная задача: {job.name}")
+            func(**job.kwargs)
+        except Exception:
+            logger.warning("Задача %s (#%s) завершилась ошибкой", job.name, job.pk, exc_info=True)
+            job.retry_or_fail(traceback.format_exc())
+            return False
+        job.mark_done()
+        return True
+    finally:
+        if job.name in PERIODIC:
+            # Если в очереди уже ждет повтор после ошибки, новый запуск не создается
+            schedule_periodic(job.name, delay=PERIODIC[job.name])
+
+
+def work(should_stop, poll_interval=1.0, max_jobs=None, burst=False, keep_days=7, on_job=None):
+    """Цикл воркера: захватить задачу, выполнить, повторить.
+
+    should_stop - функция без аргументов, True означает завершиться после текущей задачи;
+    burst - выйти, когда очередь опустела.
+    """
+    me = worker_id()
+    processed = 0
+    last_maintenance = 0
+    while not should_stop():
+        if time.monotonic() - last_maintenance > MAINTENANCE_INTERVAL:
+            Job.objects.requeue_stale()
+            Job.objects.purge_finished(keep_days)
+            last_maintenance = time.monotonic()
+
+        # Долгоживущий процесс: закрываем соединения, превысившие CONN_MAX_AGE или сломанные
+        close_old_connections()
+        job = Job.objects.claim(me)
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        started = time.perf_counter()
+        ok = run_job(job)
+        if on_job is not None:
+            on_job(job, ok, time.perf_counter() - started)
+
+        processed += 1
+        if max_jobs and processed >= max_jobs:
+            break
+    return processed
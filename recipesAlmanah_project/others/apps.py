@@ -5,3 +5,8 @@ class OthersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'others'
     verbose_name = 'Дополнительные функции'
+
+    def ready(self):
+        # Подключаем обработчики сигналов (сброс кэша страниц, настройка SQLite)
+        from . import signals  # noqa: F401
+        from . import db  # noqa: F401
@@ -0,0 +1,266 @@
+# others/cache.py
+"""Двухуровневый кэш: маленький LRU в памяти процесса поверх общего бэкенда.
+
+В локальный уровень попадают только ключи с префиксами LOCAL_PREFIXES
+(самые горячие: статистика сайта, словарь хештегов, версии тегов страниц)
+и живут там не дольше LOCAL_TIMEOUT секунд. Все остальные ключи идут прямо
+в общий кэш (settings.CACHES[SHARED]: Redis или файловый кэш локально).
+
+Запись локального ключа в одном процессе публикует сообщение об
+инвалидации в общем кэше: счетчик SEQ_KEY и ключ сообщения с номером.
+Остальные процессы раз в INVALIDATION_POLL_INTERVAL секунд сверяют счетчик
+и выбрасывают измененные ключи. Если сообщения потерялись, локальный уровень
+очищается целиком.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .metrics import CACHE_TIER_REQUESTS
+
+SEQ_KEY = 'tiered_cache_invalidation_seq'
+MESSAGE_PREFIX = 'tiered_cache_invalidation_'
+# Сколько сообщений разбирать за раз; при большем отставании проще очистить уровень
+MAX_MESSAGES = 100
+CLEAR_ALL = '*'
+
+_MISSING = object()
+
+
+class LocalTier:
+    """LRU с TTL в памяти процесса, общий для всех потоков"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Состояние инвалидации: последний разобранный номер и время следующей сверки
+        self.seen_seq = None
+        self.next_poll = 0.0
+        self.poll_lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            pickled, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+        return True, pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (pickled, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Один локальный уровень на процесс для каждого LOCATION (экземпляры кэша создаются на поток)
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_prefixes = tuple(options.get('LOCAL_PREFIXES', ()))
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 30)
+        self.poll_interval = options.get('INVALIDATION_POLL_INTERVAL', 1)
+        with _tiers_lock:
+            self.tier = _tiers.setdefault(location, LocalTier(options.get('LOCAL_MAX_ENTRIES', 1000)))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _is_local(self, key):
+        return bool(self.local_prefixes) and key.startswith(self.local_prefixes)
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(self.local_timeout, timeout)
+
+    # Инвалидация между процессами
+
+    def _publish(self, local_keys):
+        shared = self.shared
+        shared.add(SEQ_KEY, 0, None)
+        try:
+            seq = shared.incr(SEQ_KEY)
+        except ValueError:
+            # Счетчик вытеснен между add и incr
+            shared.set(SEQ_KEY, 1, None)
+            seq = 1
+        # Локальные значения живут не дольше local_timeout, дольше хранить сообщение незачем
+        shared.set(f'{MESSAGE_PREFIX}{seq}', list(local_keys), max(self.local_timeout, 60))
+
+    def _poll_due(self):
+        return time.monotonic() >= self.tier.next_poll
+
+    def _sync_invalidations(self):
+        tier = self.tier
+        if not self._poll_due() or not tier.poll_lock.acquire(blocking=False):
+            return
+        try:
+            tier.next_poll = time.monotonic() + self.poll_interval
+            seq = self.shared.get(SEQ_KEY, 0)
+            if seq == tier.seen_seq:
+                return
+            if tier.seen_seq is None or not 0 < seq - tier.seen_seq <= MAX_MESSAGES:
+                tier.clear()
+            else:
+                names = [f'{MESSAGE_PREFIX}{n}' for n in range(tier.seen_seq + 1, seq + 1)]
+                messages = self.shared.get_many(names)
+                if len(messages) < len(names):
+                    tier.clear()
+                else:
+                    for local_keys in messages.values():
+                        if CLEAR_ALL in local_keys:
+                            tier.clear()
+                            break
+                        for local_key in local_keys:
+                            tier.delete(local_key)
+            tier.seen_seq = seq
+        finally:
+            tier.poll_lock.release()
+
+    # Чтение
+
+    def _get_local(self, key, version):
+        found, value = self.tier.get(self.make_key(key, version=version))
+        CACHE_TIER_REQUESTS.inc(tier='local', result='hit' if found else 'miss')
+        return found, value
+
+    def _get_shared(self, key, version):
+        value = self.shared.get(key, _MISSING, version=version)
+        CACHE_TIER_REQUESTS.inc(tier='shared', result='miss' if value is _MISSING else 'hit')
+        return value
+
+    def get(self, key, default=None, version=None):
+        local = self._is_local(key)
+        if local:
+            self._sync_invalidations()
+            found, value = self._get_local(key, version)
+            if found:
+                return value
+        value = self._get_shared(key, version)
+        if value is _MISSING:
+            return default
+        if local:
+            self.tier.set(self.make_key(key, version=version), value, self.local_timeout)
+        return value
+
+    async def aget(self, key, default=None, version=None):
+        # Попадание в локальный уровень - без перехода в поток
+        if self._is_local(key) and not self._poll_due():
+            found, value = self.tier.get(self.make_key(key, version=version))
+            if found:
+                CACHE_TIER_REQUESTS.inc(tier='local', result='hit')
+                return value
+        return await sync_to_async(self.get, thread_sensitive=False)(key, default, version)
+
+    def get_many(self, keys, version=None):
+        result = {}
+        remaining = []
+        for key in keys:
+            if self._is_local(key):
+                self._sync_invalidations()
+                found, value = self._get_local(key, version)
+                if found:
+                    result[key] = value
+                    continue
+            remaining.append(key)
+        if remaining:
+            values = self.shared.get_many(remaining, version=version)
+            for key in remaining:
+                CACHE_TIER_REQUESTS.inc(tier='shared', result='hit' if key in values else 'miss')
+                if key in values and self._is_local(key):
+                    self.tier.set(self.make_key(key, version=version), values[key], self.local_timeout)
+            result.update(values)
+        return result
+
+    def has_key(self, key, version=None):
+        if self._is_local(key):
+            self._sync_invalidations()
+            if self.tier.get(self.make_key(key, version=version))[0]:
+                return True
+        return self.shared.has_key(key, version=version)
+
+    # Запись
+
+    def _after_write(self, keys, version, values=None, timeout=DEFAULT_TIMEOUT):
+        """Обновить локальный уровень и оповестить остальные процессы"""
+        local_keys = []
+        for key in keys:
+            if not self._is_local(key):
+                continue
+            local_key = self.make_key(key, version=version)
+            local_keys.append(local_key)
+            local_timeout = self._local_timeout(timeout)
+            if values is not None and local_timeout > 0:
+                self.tier.set(local_key, values[key], local_timeout)
+            else:
+                self.tier.delete(local_key)
+        if local_keys:
+            self._publish(local_keys)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._after_write([key], version, {key: value}, timeout)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._after_write([key], version, {key: value}, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._after_write([key for key in data if key not in failed], version, data, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._after_write([key], version, {key: value})
+        return value
+
+    def delete(self, key, version=None):
+        deleted = self.shared.delete(key, version=version)
+        self._after_write([key], version)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version=version)
+        self._after_write(keys, version)
+
+    def clear(self):
+        self.shared.clear()
+        self.tier.clear()
+        self._publish([CLEAR_ALL])
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,86 @@
+# others/counters.py
+"""Счетчики, которые не пишут в базу на каждый запрос.
+
+Приращения копятся в памяти процесса и раз в FLUSH_INTERVAL секунд
+уходят одной фоновой задачей flush_counters: при частых обращениях - из
+самого incr(), в затишье - по таймеру, который заводит первое приращение
+после сброса. При аварийном завершении процесса теряются приращения не
+больше чем за этот интервал.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+FLUSH_INTERVAL = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 30)
+
+
+class BufferedCounter:
+    def __init__(self, model, field, flush_interval=FLUSH_INTERVAL):
+        self.model = model
+        self.field = field
+        self.flush_interval = flush_interval
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+        self._pid = os.getpid()
+        atexit.register(self.flush)
+
+    def incr(self, pk, amount=1):
+        with self._lock:
+            if self._pid != os.getpid():
+                # После fork приращения родителя сбросит родитель, таймер в дочерний не переходит
+                self._pid = os.getpid()
+                self._counts = Counter()
+                self._timer = None
+            self._counts[pk] += amount
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                self._start_timer()
+                return
+            counts = self._take()
+        self._enqueue(counts)
+
+    def _start_timer(self):
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_interval, self._flush_by_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_by_timer(self):
+        with self._lock:
+            self._timer = None
+            counts = self._take()
+        try:
+            if counts:
+                self._enqueue(counts)
+        finally:
+            # Соединение этого потока больше не понадобится
+            connections.close_all()
+
+    def flush(self):
+        with self._lock:
+            counts = self._take()
+        if counts:
+            self._enqueue(counts)
+
+    def _take(self):
+        counts, self._counts = self._counts, Counter()
+        self._last_flush = time.monotonic()
+        return counts
+
+    def _enqueue(self, counts):
+        from .tasks import flush_counters
+        flush_counters.enqueue({
+            'model': self.model,
+            'field': self.field,
+            'counts': {str(pk): amount for pk, amount in counts.items()},
+        })
+
+
+article_views = BufferedCounter('others.Article', 'views_count')
@@ -0,0 +1,47 @@
+# others/db.py
+"""Настройка соединений с базой данных.
+
+Для SQLite при каждом новом соединении выставляются PRAGMA из
+settings.SQLITE_PRAGMAS (кэш, mmap, busy_timeout; WAL и synchronous=NORMAL -
+только в продакшен-профиле, см. SQLITE_WAL в настройках).
+Ко всем соединениям подключается счетчик запросов для метрик (others.metrics).
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import request_queries
+
+
+def production_sqlite_pragmas():
+    """PRAGMA продакшен-профиля (с WAL) независимо от SQLITE_WAL - для бенчмарков на временных файлах"""
+    return {**settings.SQLITE_WAL_PRAGMAS, **settings.SQLITE_PRAGMAS}
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    """Выполнить PRAGMA на курсоре (Django-курсор или sqlite3.Cursor)"""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+def count_query(execute, sql, params, many, context):
+    """execute_wrapper: считает запросы текущего HTTP-запроса по базам"""
+    queries = request_queries.get()
+    if queries is not None:
+        alias = context['connection'].alias
+        queries[alias] = queries.get(alias, 0) + 1
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
@@ -0,0 +1,61 @@
+# others/log.py
+"""Неблокирующий вывод логов.
+
+QueueStreamHandler только кладет запись в очередь, а форматирование и запись
+в поток (stdout под gunicorn - это pipe) выполняет фоновый поток QueueListener.
+Запрос не ждет, пока медленный потребитель stdout прочитает строку.
+
+Потоки не переживают fork: в дочернем процессе (run_worker --processes,
+gunicorn --preload) обработчики получают новую очередь и свой QueueListener.
+"""
+import logging
+import os
+import queue
+import weakref
+from logging.handlers import QueueHandler, QueueListener
+
+_handlers = weakref.WeakSet()
+
+
+class QueueStreamHandler(QueueHandler):
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self._start_listener()
+        _handlers.add(self)
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _restart_after_fork(self):
+        # Записи, оставшиеся в скопированной очереди, допишет родитель
+        self.queue = queue.SimpleQueue()
+        self._start_listener()
+
+    def close(self):
+        # logging.shutdown() при выходе закрывает обработчики: дописываем очередь
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
+
+    def setFormatter(self, fmt):
+        # Форматирует целевой обработчик, уже в фоновом потоке
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Аргументы подставляем сразу: объекты могут измениться, пока запись ждет в очереди.
+        # Остальное форматирование (время, traceback) остается фоновому потоку
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _restart_listeners_in_child():
+    for handler in list(_handlers):
+        if handler.listener._thread is not None:
+            handler._restart_after_fork()
+
+
+os.register_at_fork(after_in_child=_restart_listeners_in_child)
@@ -0,0 +1,105 @@
+import glob
+import json
+import os
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from others.profiling import PROFILING_DIR, read_profile, safe_view_name
+
+
+class Command(BaseCommand):
+    help = ('Сводит профили запросов (others.profiling) по именам URL: '
+            'самые затратные функции, collapsed stack для flamegraph.pl или файл speedscope')
+
+    def add_arguments(self, parser):
+        parser.add_argument('views', nargs='*', help='Имена URL (recipes:recipe_detail); по умолчанию все')
+        parser.add_argument('--dir', default=PROFILING_DIR, help='Каталог с профилями')
+        parser.add_argument('--format', choices=['top', 'collapsed', 'speedscope'], default='top')
+        parser.add_argument('--output', '-o', default='-', help='Файл результата или - для stdout')
+        parser.add_argument('--limit', type=int, default=20, help='Сколько функций показать в режиме top')
+
+    def handle(self, *args, **options):
+        profiles = self._load(options['dir'], options['views'])
+        if not profiles:
+            raise CommandError(f"Профилей не найдено в {options['dir']}")
+
+        out = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+        try:
+            if options['format'] == 'collapsed':
+                for view, (samples, _) in profiles.items():
+                    for stack, count in samples.most_common():
+                        out.write(f'{view};{stack} {count}\n')
+            elif options['format'] == 'speedscope':
+                json.dump(self._speedscope(profiles), out, ensure_ascii=False)
+            else:
+                self._write_top(out, profiles, options['limit'])
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+    def _load(self, directory, views):
+        """Имя каталога URL -> (Counter выборок, число запросов)"""
+        names = [safe_view_name(view) for view in views] or sorted(os.listdir(directory) if os.path.isdir(directory) else [])
+        profiles = {}
+        for name in names:
+            paths = glob.glob(os.path.join(directory, name, '*.collapsed'))
+            if not paths:
+                continue
+            samples = Counter()
+            for path in paths:
+                samples.update(read_profile(path))
+            profiles[name] = (samples, len(paths))
+        return profiles
+
+    def _write_top(self, out, profiles, limit):
+        for view, (samples, requests) in profiles.items():
+            total = sum(samples.values())
+            own = Counter()
+            inclusive = Counter()
+            for stack, count in samples.items():
+                frames = stack.split(';')
+                own[frames[-1]] += count
+                # Рекурсия не должна считать функцию дважды
+                for frame in set(frames):
+                    inclusive[frame] += count
+
+            out.write(f'\n{view}: запросов {requests}, выборок {total}\n')
+            out.write(f"{'собств.%':>9} {'всего%':>8}  функция\n")
+            for frame, count in own.most_common(limit):
+                out.write(f'{100 * count / total:9.1f} {100 * inclusive[frame] / total:8.1f}  {frame}\n')
+
+    def _speedscope(self, profiles):
+        """Формат https://www.speedscope.app/file-format-schema.json: профиль на каждое имя URL"""
+        frames = []
+        frame_index = {}
+        result = []
+        for view, (samples, requests) in profiles.items():
+            stacks = []
+            weights = []
+            for stack, count in samples.most_common():
+                indexes = []
+                for name in stack.split(';'):
+                    if name not in frame_index:
+                        frame_index[name] = len(frames)
+                        frames.append({'name': name})
+                    indexes.append(frame_index[name])
+                stacks.append(indexes)
+                weights.append(count)
+            result.append({
+                'type': 'sampled',
+                'name': f'{view} ({requests} запросов)',
+                'unit': 'none',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': stacks,
+                'weights': weights,
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': result,
+            'name': 'recipesAlmanah',
+            'exporter': 'aggregate_profiles',
+        }
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from others.db import apply_sqlite_pragmas, production_sqlite_pragmas
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест: запись в избранное при параллельной записи поисковой аналитики '
+            'в тот же файл SQLite и в отдельный')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--main-workers', type=int, default=4, help='Писателей в избранное')
+        parser.add_argument('--analytics-workers', type=int, default=8, help='Писателей поисковой аналитики')
+        parser.add_argument('--writes', type=int, default=300, help='Транзакций на писателя избранного')
+
+    def handle(self, *args, **options):
+        for name, separate in (('одна база', False), ('отдельная база', True)):
+            with tempfile.TemporaryDirectory() as tmp:
+                main_path = os.path.join(tmp, 'main.sqlite3')
+                analytics_path = os.path.join(tmp, 'analytics.sqlite3') if separate else main_path
+                self._prepare(main_path, analytics_path)
+                elapsed, latencies = self._run(main_path, analytics_path, options)
+
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[int(len(latencies) * 0.95)] * 1000
+            self.stdout.write(
+                f'{name:15} избранное: {len(latencies) / elapsed:9.1f} транзакций/с  '
+                f'p50 {p50:6.2f} мс  p95 {p95:6.2f} мс'
+            )
+
+    def _connect(self, path):
+        conn = sqlite3.connect(path, timeout=20, isolation_level=None)
+        apply_sqlite_pragmas(conn.cursor(), production_sqlite_pragmas())
+        return conn
+
+    def _prepare(self, main_path, analytics_path):
+        conn = self._connect(main_path)
+        conn.execute('CREATE TABLE favorite (id INTEGER PRIMARY KEY, user_id INTEGER, recipe_id INTEGER)')
+        conn.close()
+        conn = self._connect(analytics_path)
+        conn.execute('CREATE TABLE searchquery (id INTEGER PRIMARY KEY, query TEXT, created_at REAL)')
+        conn.close()
+
+    def _run(self, main_path, analytics_path, options):
+        stop = threading.Event()
+        latencies = []
+        lock = threading.Lock()
+
+        def favorite_writer(worker_id):
+            conn = self._connect(main_path)
+            own = []
+            for i in range(options['writes']):
+                started = time.perf_counter()
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('INSERT INTO favorite (user_id, recipe_id) VALUES (?, ?)', (worker_id, i))
+                conn.execute('COMMIT')
+                own.append(time.perf_counter() - started)
+            conn.close()
+            with lock:
+                latencies.extend(own)
+
+        def analytics_writer(worker_id):
+            conn = self._connect(analytics_path)
+            while not stop.is_set():
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('INSERT INTO searchquery (query, created_at) VALUES (?, ?)',
+                             (f'query {worker_id}', time.time()))
+                conn.execute('COMMIT')
+            conn.close()
+
+        background = [threading.Thread(target=analytics_writer, args=(n,))
+                      for n in range(options['analytics_workers'])]
+        writers = [threading.Thread(target=favorite_writer, args=(n,))
+                   for n in range(options['main_workers'])]
+        for thread in background:
+            thread.start()
+        started = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in background:
+            thread.join()
+        return elapsed, latencies
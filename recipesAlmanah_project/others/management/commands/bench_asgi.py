@@ -0,0 +1,116 @@
+import asyncio
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест страниц для чтения: WSGI (потоки) против ASGI (asyncio). '
+            'По умолчанию оба обработчика Django вызываются в процессе, '
+            'с --wsgi-url/--asgi-url запросы идут на запущенные серверы')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на каждую страницу')
+        parser.add_argument('--concurrency', type=int, default=16, help='Одновременных запросов')
+        parser.add_argument('--paths', nargs='+', help='Страницы для теста (по умолчанию лента, рецепт, статистика)')
+        parser.add_argument('--login', help='Имя пользователя: запросы от его имени (в обход кэша страниц)')
+        parser.add_argument('--wsgi-url', help='Адрес WSGI-сервера, например http://127.0.0.1:8000')
+        parser.add_argument('--asgi-url', help='Адрес ASGI-сервера, например http://127.0.0.1:8001')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['login']:
+            user = User.objects.filter(username=options['login']).first()
+            if user is None:
+                raise CommandError(f'Пользователь "{options["login"]}" не найден')
+        paths = options['paths'] or self._default_paths(user)
+
+        # Одна сессия на все клиенты, чтобы не замерять создание сессий
+        cookies = None
+        if user is not None:
+            login_client = Client()
+            login_client.force_login(user)
+            cookies = login_client.cookies
+
+        for path in paths:
+            self.stdout.write(path)
+            if options['wsgi_url'] or options['asgi_url']:
+                for name in ('wsgi', 'asgi'):
+                    base_url = options[f'{name}_url']
+                    if base_url:
+                        result = self._run_http(base_url + path, options['requests'], options['concurrency'])
+                        self._report(name.upper(), *result)
+            else:
+                self._report('WSGI', *self._run_wsgi(path, cookies, options['requests'], options['concurrency']))
+                self._report('ASGI', *asyncio.run(
+                    self._run_asgi(path, cookies, options['requests'], options['concurrency'])
+                ))
+
+    def _default_paths(self, user):
+        paths = ['/', '/others/statistics/public/']
+        recipe_id = Recipe.objects.order_by('-created_at').values_list('id', flat=True).first()
+        if recipe_id:
+            paths.insert(1, f'/recipe/{recipe_id}/')
+        if user is not None:
+            paths.append('/others/recommendations/')
+        return paths
+
+    def _report(self, name, elapsed, statuses):
+        ok = statuses.count(200)
+        self.stdout.write(
+            f'  {name}: {len(statuses) / elapsed:8.1f} запросов/с  '
+            f'200: {ok}/{len(statuses)}  время: {elapsed:.2f}с'
+        )
+
+    def _run_wsgi(self, path, cookies, total, concurrency):
+        """Синхронный обработчик: каждый запрос занимает поток, как в gunicorn --threads"""
+        def worker(count):
+            client = Client()
+            if cookies is not None:
+                client.cookies.update(cookies)
+            return [client.get(path).status_code for _ in range(count)]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = pool.map(worker, self._split(total, concurrency))
+            statuses = [status for chunk in results for status in chunk]
+        return time.perf_counter() - started, statuses
+
+    async def _run_asgi(self, path, cookies, total, concurrency):
+        """Асинхронный обработчик: все запросы в одном цикле событий"""
+        async def worker(count):
+            client = AsyncClient()
+            if cookies is not None:
+                client.cookies.update(cookies)
+            return [(await client.get(path)).status_code for _ in range(count)]
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(worker(count) for count in self._split(total, concurrency)))
+        statuses = [status for chunk in results for status in chunk]
+        return time.perf_counter() - started, statuses
+
+    def _run_http(self, url, total, concurrency):
+        def fetch(_):
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            statuses = list(pool.map(fetch, range(total)))
+        return time.perf_counter() - started, statuses
+
+    @staticmethod
+    def _split(total, parts):
+        """Разбить total запросов на parts почти равных частей"""
+        sizes = [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+        return [size for size in sizes if size]
@@ -0,0 +1,113 @@
+import logging
+import os
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from others.log import QueueStreamHandler
+from others.models import Recommendation
+
+FORMAT = '%(asctime)s %(levelname)s %(name)s [%(process)d] %(message)s'
+
+
+class SlowStream:
+    """Поток, запись в который занимает latency секунд (переполненный pipe)"""
+
+    def __init__(self, stream, latency):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, data):
+        self.stream.write(data)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class Command(BaseCommand):
+    help = 'Стоимость вывода логов на запрос: print() против logging (синхронно, через очередь, выключенный уровень)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=20000, help='Сообщений в микротесте')
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Сколько раз генерировать рекомендации в тесте на запрос')
+        parser.add_argument('--user', help='Пользователь для теста рекомендаций (по умолчанию первый)')
+        parser.add_argument('--write-latency', type=float, default=50,
+                            help='Задержка записи в мкс: stdout-pipe, который не успевает читать сборщик логов')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'Микротест, мкс на сообщение в вызывающем потоке '
+            f'(запись в файл с задержкой {options["write_latency"]:g} мкс):'
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, setup in [
+                ('print() с f-строкой (было)', self._print_mode),
+                ('logging, StreamHandler', self._stream_mode),
+                ('logging, QueueStreamHandler', self._queue_mode),
+                ('logging, уровень выключен', self._disabled_mode),
+            ]:
+                path = os.path.join(tmp, 'log.txt')
+                with open(path, 'w') as file:
+                    emit, teardown = setup(SlowStream(file, options['write_latency'] / 1e6))
+                    started = time.perf_counter()
+                    for i in range(options['messages']):
+                        emit(i)
+                    elapsed = time.perf_counter() - started
+                    teardown()
+                self.stdout.write(f'  {name:32} {elapsed / options["messages"] * 1e6:8.2f}')
+
+        user = User.objects.filter(username=options['user']).first() if options['user'] else User.objects.first()
+        if user is None:
+            self.stdout.write('Нет пользователей - тест рекомендаций пропущен')
+            return
+
+        self.stdout.write(f'Генерация рекомендаций для {user.username}:')
+        model_logger = logging.getLogger('others.models')
+        old_level = model_logger.level
+        try:
+            for name, level in [('уровень DEBUG', logging.DEBUG), ('уровень INFO', logging.INFO)]:
+                model_logger.setLevel(level)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(options['iterations']):
+                        Recommendation.objects.generate_recommendations(user)
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'  {name:14} {elapsed / options["iterations"] * 1000:8.2f} мс  '
+                    f'запросов: {len(queries) // options["iterations"]}'
+                )
+        finally:
+            model_logger.setLevel(old_level)
+
+    def _logger(self, handler, level=logging.INFO):
+        logger = logging.Logger('bench_logging')
+        logger.setLevel(level)
+        handler.setFormatter(logging.Formatter(FORMAT))
+        logger.addHandler(handler)
+        return logger
+
+    def _print_mode(self, stream):
+        def emit(i):
+            print(f'Найдено рекомендованных рецептов: {i}', file=stream, flush=True)
+        return emit, lambda: None
+
+    def _stream_mode(self, stream):
+        logger = self._logger(logging.StreamHandler(stream))
+        return (lambda i: logger.info('Найдено рекомендованных рецептов: %d', i)), lambda: None
+
+    def _queue_mode(self, stream):
+        handler = QueueStreamHandler(stream)
+        logger = self._logger(handler)
+        # Время дописывания очереди фоновым потоком в замер не входит - в этом и смысл
+        return (lambda i: logger.info('Найдено рекомендованных рецептов: %d', i)), handler.close
+
+    def _disabled_mode(self, stream):
+        logger = self._logger(logging.StreamHandler(stream), level=logging.INFO)
+        return (lambda i: logger.debug('Найдено рекомендованных рецептов: %d', i)), lambda: None
@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from users.backends import invalidate_cached_user
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+BACKENDS = {
+    'ModelBackend': 'django.contrib.auth.backends.ModelBackend',
+    'CachedModelBackend': 'users.backends.CachedModelBackend',
+}
+# Таблицы горячего пути сессии и аутентификации
+TABLES = ['django_session', 'auth_user', 'users_profile']
+
+
+class Command(BaseCommand):
+    help = ('Запросы к базе на один запрос вошедшего пользователя: хранилища сессий '
+            '(db, cached_db, signed_cookies) с обычным и кэширующим бэкендом аутентификации')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Запросов на каждую страницу')
+        parser.add_argument('--paths', nargs='+', default=['/', '/users/profile/', '/users/timeline/'],
+                            help='Страницы для теста')
+        parser.add_argument('--user', help='Пользователь (по умолчанию первый)')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['user']).first() if options['user'] else User.objects.first()
+        if user is None:
+            raise CommandError('Нет пользователей для теста')
+
+        self.stdout.write(f'Запросов к базе на запрос ({options["requests"]} запросов на страницу, '
+                          f'пользователь {user.username}):')
+        self.stdout.write(f'  {"сессии":15} {"бэкенд":19} {"всего":>7} ' + ' '.join(f'{t:>15}' for t in TABLES))
+        for engine_name, engine in SESSION_ENGINES.items():
+            for backend_name, backend in BACKENDS.items():
+                with override_settings(SESSION_ENGINE=engine, AUTHENTICATION_BACKENDS=[backend]):
+                    total, by_table = self._measure(user, backend, options['paths'], options['requests'])
+                self.stdout.write(
+                    f'  {engine_name:15} {backend_name:19} {total:7.2f} '
+                    + ' '.join(f'{by_table[t]:15.2f}' for t in TABLES)
+                )
+
+    def _measure(self, user, backend, paths, count):
+        invalidate_cached_user(user.pk)
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user, backend=backend)
+        # Первый запрос прогревает кэши и не учитывается
+        for path in paths:
+            client.get(path)
+
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                for path in paths:
+                    client.get(path)
+        requests = count * len(paths)
+        by_table = {
+            table: sum(self._touches(query['sql'], table) for query in queries.captured_queries) / requests
+            for table in TABLES
+        }
+        return len(queries.captured_queries) / requests, by_table
+
+    @staticmethod
+    def _touches(sql, table):
+        # Только запросы к самой таблице, а не JOIN автора рецепта и т.п.
+        return any(f'{verb} "{table}"' in sql for verb in ('FROM', 'UPDATE', 'INTO'))
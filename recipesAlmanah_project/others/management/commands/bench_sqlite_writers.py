@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from others.db import apply_sqlite_pragmas, production_sqlite_pragmas
+
+
+# Профили: стандартный (rollback journal, BEGIN DEFERRED) и настроенный (продакшен-профиль с WAL)
+PROFILES = {
+    'default': {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 0.1},
+    'tuned': {'pragmas': None, 'begin': 'BEGIN IMMEDIATE', 'timeout': 20},
+}
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест SQLite с параллельными писателями: стандартный профиль против настроенного'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Количество параллельных писателей')
+        parser.add_argument('--writes', type=int, default=200, help='Транзакций записи на писателя')
+
+    def handle(self, *args, **options):
+        for name, profile in PROFILES.items():
+            pragmas = profile['pragmas'] if profile['pragmas'] is not None else production_sqlite_pragmas()
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'bench.sqlite3')
+                self._prepare(path, pragmas)
+                elapsed, done, errors = self._run(path, pragmas, profile, options['workers'], options['writes'])
+
+            self.stdout.write(
+                f'{name:8} {done / elapsed:10.1f} транзакций/с  '
+                f'успешно: {done}  ошибок блокировки: {errors}  время: {elapsed:.2f}с'
+            )
+
+    def _prepare(self, path, pragmas):
+        conn = sqlite3.connect(path)
+        apply_sqlite_pragmas(conn.cursor(), pragmas)
+        # Таблица, похожая на журнал поисковых запросов: чтение + вставка в одной транзакции
+        conn.execute('CREATE TABLE search (id INTEGER PRIMARY KEY, query TEXT, counter INTEGER)')
+        conn.execute("INSERT INTO search (query, counter) VALUES ('seed', 0)")
+        conn.commit()
+        conn.close()
+
+    def _run(self, path, pragmas, profile, workers, writes):
+        lock = threading.Lock()
+        stats = {'done': 0, 'errors': 0}
+
+        def writer(worker_id):
+            conn = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None)
+            apply_sqlite_pragmas(conn.cursor(), pragmas)
+            done = errors = 0
+            for i in range(writes):
+                try:
+                    conn.execute(profile['begin'])
+                    # Чтение перед записью - типичный get_or_create / инкремент счетчика
+                    conn.execute('SELECT counter FROM search WHERE id = 1').fetchone()
+                    conn.execute('INSERT INTO search (query, counter) VALUES (?, ?)', (f'w{worker_id}-{i}', i))
+                    conn.execute('UPDATE search SET counter = counter + 1 WHERE id = 1')
+                    conn.execute('COMMIT')
+                    done += 1
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    errors += 1
+            conn.close()
+            with lock:
+                stats['done'] += done
+                stats['errors'] += errors
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, stats['done'], stats['errors']
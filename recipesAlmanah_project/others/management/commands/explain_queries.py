@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from comments.models import Comment
+from others.models import SearchQuery, HashtagSearch
+from recipes.models import Recipe, Favorite
+
+
+class Command(BaseCommand):
+    help = 'Показать планы выполнения основных запросов (проверка использования индексов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help='EXPLAIN ANALYZE (только PostgreSQL, запросы реально выполняются)')
+
+    def handle(self, *args, **options):
+        week_ago = timezone.now() - timedelta(days=7)
+        recipe = Recipe.objects.order_by('pk').first()
+        recipe_id = recipe.pk if recipe else 0
+        author_id = recipe.author_id if recipe else 0
+
+        queries = {
+            'Лента (created_at DESC)': Recipe.objects.order_by('-created_at', 'id')[:9],
+            'Рецепты автора': Recipe.objects.filter(author_id=author_id).order_by('-created_at'),
+            'Избранное рецепта': Favorite.objects.filter(recipe_id=recipe_id),
+            'Комментарии рецепта': Comment.objects.filter(recipe_id=recipe_id).order_by('-created_at', '-id')[:20],
+            'Поисковые запросы за неделю': SearchQuery.objects.filter(created_at__gte=week_ago),
+            'Статистика хештега': HashtagSearch.objects.filter(hashtag_id=1),
+            'Поиск по названию/ингредиенту': Recipe.objects.filter(
+                Q(title__icontains='суп') | Q(ingredients__name__icontains='суп')
+            ).distinct(),
+        }
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        for title, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from others.models import SearchQuery, HashtagSearch, Statistic
+from others.routers import ANALYTICS_DATABASE
+
+
+class Command(BaseCommand):
+    help = 'Перенести аналитические таблицы (SearchQuery, HashtagSearch, Statistic) из основной базы в базу аналитики'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--keep-source', action='store_true',
+                            help='Не очищать таблицы в основной базе после переноса')
+
+    def handle(self, *args, **options):
+        if ANALYTICS_DATABASE not in connections.databases:
+            raise CommandError(f'База "{ANALYTICS_DATABASE}" не настроена в DATABASES')
+
+        source = connections[DEFAULT_DB_ALIAS]
+        target = connections[ANALYTICS_DATABASE]
+        for model in (SearchQuery, HashtagSearch, Statistic):
+            if model.objects.using(ANALYTICS_DATABASE).exists():
+                self.stdout.write(self.style.WARNING(f'{model.__name__}: в базе аналитики уже есть данные, пропускаем'))
+                continue
+
+            # Копируем "как есть" через INSERT: bulk_create перезаписал бы auto_now-поля
+            fields = model._meta.concrete_fields
+            columns = ', '.join(target.ops.quote_name(field.column) for field in fields)
+            placeholders = ', '.join(['%s'] * len(fields))
+            sql = f'INSERT INTO {target.ops.quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+
+            copied = 0
+            rows = model.objects.using(DEFAULT_DB_ALIAS).values_list(
+                *[field.attname for field in fields]
+            ).iterator(chunk_size=options['batch_size'])
+            with transaction.atomic(using=ANALYTICS_DATABASE), target.cursor() as cursor:
+                batch = []
+                for row in rows:
+                    batch.append([
+                        field.get_db_prep_save(value, connection=target)
+                        for field, value in zip(fields, row)
+                    ])
+                    if len(batch) >= options['batch_size']:
+                        cursor.executemany(sql, batch)
+                        copied += len(batch)
+                        batch = []
+                if batch:
+                    cursor.executemany(sql, batch)
+                    copied += len(batch)
+
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: перенесено {copied} записей'))
+
+            # Старые строки в основной базе держат ограничения FK на пользователей
+            # и хештеги (каскад теперь выполняют сигналы), поэтому очищаем их
+            if not options['keep_source']:
+                with source.cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {source.ops.quote_name(model._meta.db_table)}')
@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from others.routers import REPLICA_DATABASES
+
+
+class Command(BaseCommand):
+    help = ('Заменитель репликации для локальной разработки: копирует основную базу SQLite '
+            'в файлы реплик через backup API')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые N секунд (0 - один раз)')
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS].settings_dict
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Команда работает только с SQLite')
+        if not REPLICA_DATABASES:
+            raise CommandError('Реплики не настроены (REPLICA_DATABASES пуст, см. SQLITE_REPLICA)')
+
+        while True:
+            started = time.perf_counter()
+            for alias in REPLICA_DATABASES:
+                # Закрываем соединение Django с репликой, чтобы не держать старый снимок
+                connections[alias].close()
+                src = sqlite3.connect(source['NAME'])
+                dst = sqlite3.connect(connections[alias].settings_dict['NAME'])
+                try:
+                    src.backup(dst)
+                finally:
+                    dst.close()
+                    src.close()
+            self.stdout.write(f'Реплики обновлены за {time.perf_counter() - started:.3f}с')
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
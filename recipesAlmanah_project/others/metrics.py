@@ -0,0 +1,320 @@
+# others/metrics.py
+"""Метрики приложения в формате Prometheus.
+
+Счетчики (Counter), измерители (Gauge) и гистограммы (Histogram) хранят
+значения в памяти процесса. Если задан settings.METRICS_DIR, каждый процесс
+(воркер gunicorn) пишет значения в свой файл, отображенный в память, а
+/metrics суммирует файлы всех процессов. Запись в mmap - это запись в память,
+без системных вызовов на горячем пути.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+
+METRICS_DIR = getattr(settings, 'METRICS_DIR', None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MmapedValues:
+    """Словарь "ключ -> float" в файле, отображенном в память.
+
+    Формат: 8 байт заголовка (занятый объем), затем записи
+    [длина ключа: int32][ключ, дополненный до кратности 8][значение: float64].
+    """
+    INITIAL_SIZE = 1 << 16
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        capacity = os.fstat(self._file.fileno()).st_size
+        if capacity == 0:
+            capacity = self.INITIAL_SIZE
+            self._file.truncate(capacity)
+        self._capacity = capacity
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+        self._used = struct.unpack_from('i', self._map, 0)[0] or 8
+        self._positions = {key: position for key, _, position in self._entries(self._map, self._used)}
+
+    @staticmethod
+    def _entries(data, used):
+        position = 8
+        while position < used:
+            length = struct.unpack_from('i', data, position)[0]
+            key = bytes(data[position + 4:position + 4 + length]).decode('utf-8')
+            position += 4 + length + (-(4 + length) % 8)
+            yield key, struct.unpack_from('d', data, position)[0], position
+            position += 8
+
+    @classmethod
+    def read_file(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < 8:
+            return []
+        used = struct.unpack_from('i', data, 0)[0]
+        return [(key, value) for key, value, _ in cls._entries(data, used)]
+
+    def _add_key(self, key):
+        encoded = key.encode('utf-8')
+        padding = -(4 + len(encoded)) % 8
+        entry = struct.pack(f'i{len(encoded) + padding}sd', len(encoded), encoded + b' ' * padding, 0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        struct.pack_into('i', self._map, 0, self._used)
+        self._positions[key] = self._used - 8
+
+    def get(self, key):
+        position = self._positions.get(key)
+        return struct.unpack_from('d', self._map, position)[0] if position is not None else 0.0
+
+    def set(self, key, value):
+        if key not in self._positions:
+            self._add_key(key)
+        struct.pack_into('d', self._map, self._positions[key], value)
+
+    def items(self):
+        return [(key, self.get(key)) for key in self._positions]
+
+
+class MemoryValues(dict):
+    """Значения только в памяти процесса (METRICS_DIR не задан)"""
+
+    def get(self, key):
+        return super().get(key, 0.0)
+
+    def set(self, key, value):
+        self[key] = value
+
+
+class Registry:
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._values = None
+        self._pid = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    @property
+    def values(self):
+        # После fork (воркеры gunicorn) у каждого процесса свой файл
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+                self._values = MmapedValues(os.path.join(self.directory, f'metrics_{self._pid}.db'))
+            else:
+                self._values = MemoryValues()
+        return self._values
+
+    def add(self, key, amount):
+        with self._lock:
+            values = self.values
+            values.set(key, values.get(key) + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            self.values.set(key, value)
+
+    def collect(self):
+        """Значения всех процессов: ключ -> сумма (измерители - только живых процессов)"""
+        if not self.directory:
+            with self._lock:
+                return dict(self.values.items())
+
+        totals = {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.db')):
+            alive = _pid_alive(int(os.path.basename(path)[len('metrics_'):-len('.db')]))
+            for key, value in MmapedValues.read_file(path):
+                metric = self.metrics.get(json.loads(key)[0])
+                if metric is None or (metric.type == 'gauge' and not alive):
+                    continue
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def exposition(self):
+        """Текст в формате Prometheus text exposition 0.0.4"""
+        samples = {}
+        for key, value in self.collect().items():
+            name, suffix, labels = json.loads(key)
+            samples.setdefault(name, []).append((suffix, labels, value))
+
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {metric.family_name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.family_name} {metric.type}')
+            lines.extend(metric.render(samples.get(name, [])))
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self._keys = {}
+        self.registry.register(self)
+
+    @property
+    def family_name(self):
+        """Имя в строках HELP/TYPE: в формате 0.0.4 оно совпадает с именем сэмплов"""
+        return self.name
+
+    def _key(self, suffix, labels):
+        cache_key = (suffix, tuple(labels.get(name, '') for name in self.labelnames))
+        key = self._keys.get(cache_key)
+        if key is None:
+            if set(labels) != set(self.labelnames):
+                raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}, получены {tuple(labels)}")
+            key = json.dumps([self.name, suffix, [[name, str(labels[name])] for name in self.labelnames]])
+            self._keys[cache_key] = key
+        return key
+
+    def render(self, samples):
+        return [
+            f'{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}'
+            for suffix, labels, value in sorted(samples, key=lambda sample: (sample[1], sample[0]))
+        ]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    @property
+    def family_name(self):
+        return f'{self.name}_total'
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self._key('_total', labels), amount)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        self.registry.set(self._key('', labels), value)
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self._key('', labels), amount)
+
+    def dec(self, amount=1, **labels):
+        self.registry.add(self._key('', labels), -amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        # В хранилище - количество попаданий в каждый интервал, накопительные суммы считаются при выводе
+        bucket = self.buckets[bisect_left(self.buckets, value)]
+        self.registry.add(self._key(f'_bucket:{bucket}', labels), 1)
+        self.registry.add(self._key('_sum', labels), value)
+        self.registry.add(self._key('_count', labels), 1)
+
+    def render(self, samples):
+        series = {}
+        for suffix, labels, value in samples:
+            series.setdefault(tuple(map(tuple, labels)), {})[suffix] = value
+
+        lines = []
+        for labels, values in sorted(series.items()):
+            cumulative = 0.0
+            for bucket in self.buckets:
+                cumulative += values.get(f'_bucket:{bucket}', 0.0)
+                le = '+Inf' if bucket == float('inf') else repr(bucket)
+                lines.append(f'{self.name}_bucket{_format_labels(labels + (("le", le),))} {_format_value(cumulative)}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(values.get("_sum", 0.0))}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {_format_value(values.get("_count", 0.0))}')
+        return lines
+
+
+REGISTRY = Registry(METRICS_DIR)
+
+# Запросы текущего HTTP-запроса к базе (заполняет обертка из others.db, читает MetricsMiddleware)
+request_queries = ContextVar('metrics_request_queries', default=None)
+
+
+# Метрики приложения
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки запроса по имени URL', ['view', 'method'],
+)
+REQUESTS = Counter(
+    'http_requests', 'Количество запросов по имени URL и коду ответа', ['view', 'method', 'status'],
+)
+DB_QUERIES = Counter(
+    'db_queries', 'Запросы к базе данных по имени URL и базе', ['view', 'database'],
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests', 'Обращения к кэшу по семейству ключей: hit/miss', ['family', 'result'],
+)
+CACHE_TIER_REQUESTS = Counter(
+    'cache_tier_requests', 'Обращения к уровням кэша others.cache.TieredCache: hit/miss', ['tier', 'result'],
+)
+RECOMMENDATIONS_GENERATION = Histogram(
+    'recommendations_generation_seconds', 'Время генерации рекомендаций для пользователя',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+FAVORITE_TOGGLES = Counter(
+    'favorite_toggles', 'Добавления и удаления рецептов в избранное', ['action'],
+)
+SEARCHES = Counter(
+    'search_requests', 'Поисковые запросы по типу поиска', ['kind'],
+)
+RATE_LIMITED = Counter(
+    'rate_limited_requests', 'Запросы, отклоненные ограничением частоты (others.ratelimit)', ['scope'],
+)
+
+
+def record_cache_lookup(family, value):
+    """Учесть обращение к кэшу (value is None - промах) и вернуть value"""
+    CACHE_REQUESTS.inc(family=family, result='miss' if value is None else 'hit')
+    return value
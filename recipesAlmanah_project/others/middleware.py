@@ -0,0 +1,189 @@
+# others/middleware.py
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+from .metrics import DB_QUERIES, REQUESTS, REQUEST_LATENCY, request_queries
+from .profiling import sampler, write_profile
+
+from .routers import REPLICA_DATABASES, allow_replica_reads, end_request, request_wrote, start_request
+
+REPLICA_PIN_COOKIE = 'db_primary_pin'
+REPLICA_PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+REPLICA_READ_VIEWS = set(getattr(settings, 'REPLICA_READ_VIEWS', []))
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает чтение с реплик для REPLICA_READ_VIEWS.
+
+    Пользователь, который только что что-то записал, получает cookie и
+    следующие REPLICA_PIN_SECONDS читает из основной базы.
+    Работает и под WSGI, и под ASGI без переключения потоков.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = start_request()
+        try:
+            response = self.get_response(request)
+            self._pin_if_wrote(response)
+        finally:
+            end_request(token)
+        return response
+
+    async def __acall__(self, request):
+        token = start_request()
+        try:
+            response = await self.get_response(request)
+            self._pin_if_wrote(response)
+        finally:
+            end_request(token)
+        return response
+
+    def _pin_if_wrote(self, response):
+        if request_wrote():
+            response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not REPLICA_DATABASES or request.method not in ('GET', 'HEAD'):
+            return None
+        if REPLICA_PIN_COOKIE in request.COOKIES:
+            return None
+        match = request.resolver_match
+        if match and match.view_name in REPLICA_READ_VIEWS:
+            allow_replica_reads()
+        return None
+
+
+class MetricsMiddleware:
+    """Время ответа, коды ответов и число запросов к базе по имени URL"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        token = request_queries.set({})
+        try:
+            response = self.get_response(request)
+            self._record(request, response, started)
+        finally:
+            request_queries.reset(token)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        # Словарь общий для потоков sync_to_async: контекст копируется, объект тот же
+        token = request_queries.set({})
+        try:
+            response = await self.get_response(request)
+            self._record(request, response, started)
+        finally:
+            request_queries.reset(token)
+        return response
+
+    def _record(self, request, response, started):
+        match = request.resolver_match
+        # Без имени URL (404, статика) - одна общая метка, чтобы не плодить ряды
+        view = match.view_name if match and match.view_name else '<unresolved>'
+        REQUEST_LATENCY.observe(time.perf_counter() - started, view=view, method=request.method)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        for alias, count in request_queries.get().items():
+            DB_QUERIES.inc(count, view=view, database=alias)
+
+
+class ProfilingMiddleware:
+    """Профилирует долю запросов PROFILING_SAMPLE_RATE и запросы персонала
+    с заголовком X-Profile: 1 (others.profiling).
+
+    Без PROFILING_ENABLED middleware отключается целиком. Для async view
+    снимаются стеки всех потоков процесса, поэтому при параллельных запросах
+    в их профиль попадают и соседние.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        requested = self._requested(request, request.user)
+        if not requested and not self._sampled():
+            return self.get_response(request)
+        thread_id = threading.get_ident()
+        # Async view под WSGI выполняется в другом потоке, а этот только ждет
+        sampler.start(thread_id, all_threads=self._is_async_view(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            samples = sampler.stop(thread_id)
+        return self._save(request, response, samples, requested)
+
+    async def __acall__(self, request):
+        # Пользователь нужен только для заголовка - без него сессию не читаем
+        user = await request.auser() if PROFILE_HEADER in request.META else None
+        requested = self._requested(request, user)
+        if not requested and not self._sampled():
+            return await self.get_response(request)
+        thread_id = threading.get_ident()
+        # Часть работы (шаблоны, sync_to_async) идет в потоках пула, а не в цикле событий
+        sampler.start(thread_id, all_threads=True)
+        try:
+            response = await self.get_response(request)
+        finally:
+            samples = sampler.stop(thread_id)
+        return self._save(request, response, samples, requested)
+
+    def _is_async_view(self, request):
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return False
+        return iscoroutinefunction(match.func)
+
+    def _requested(self, request, user):
+        return request.META.get(PROFILE_HEADER) == '1' and user is not None and user.is_staff
+
+    def _sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _save(self, request, response, samples, requested):
+        if samples:
+            match = request.resolver_match
+            path = write_profile(match.view_name if match else None, samples)
+            logger.debug("Профиль %s %s: %s", request.method, request.path, path)
+            if requested:
+                response['X-Profile-Samples'] = str(sum(samples.values()))
+        return response
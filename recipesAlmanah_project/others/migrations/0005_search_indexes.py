@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def merge_duplicate_hashtag_searches(apps, schema_editor):
+    """Перед уникальным ограничением сливаем дубли статистики по одному хештегу"""
+    HashtagSearch = apps.get_model('others', 'HashtagSearch')
+    duplicates = HashtagSearch.objects.values('hashtag_id').annotate(
+        rows=Count('id'), total=Sum('search_count'), last=Max('last_searched'), keep_id=Max('id')
+    ).filter(rows__gt=1)
+
+    for row in duplicates:
+        HashtagSearch.objects.filter(pk=row['keep_id']).update(
+            search_count=row['total'], last_searched=row['last']
+        )
+        HashtagSearch.objects.filter(hashtag_id=row['hashtag_id']).exclude(pk=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('others', '0004_alter_statistic_statistic_type'),
+        ('recipes', '0003_recipe_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchquery',
+            index=models.Index(fields=['created_at'], name='searchquery_created_idx'),
+        ),
+        migrations.RunPython(
+            merge_duplicate_hashtag_searches, migrations.RunPython.noop,
+            hints={'model_name': 'hashtagsearch'},
+        ),
+        migrations.AddConstraint(
+            model_name='hashtagsearch',
+            constraint=models.UniqueConstraint(fields=('hashtag',), name='hashtagsearch_unique_hashtag'),
+        ),
+    ]
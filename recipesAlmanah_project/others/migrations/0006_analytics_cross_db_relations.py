@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('others', '0005_search_indexes'),
+        ('recipes', '0003_recipe_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hashtagsearch',
+            name='hashtag',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='search_stats', to='recipes.hashtag', verbose_name='Хештег'),
+        ),
+        migrations.AlterField(
+            model_name='searchquery',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+    ]
@@ -1,24 +1,62 @@
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
 from django.db import models
 from django.contrib.auth.models import User
 from recipes.models import Hashtag, Recipe
 from django.core.cache import cache
 from django.db.models import Count, Q
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from .metrics import RECOMMENDATIONS_GENERATION, record_cache_lookup
+
+logger = logging.getLogger(__name__)
 
 
 class StatisticsManager(models.Manager):
     def get_site_statistics(self):
         """Получить общую статистику сайта"""
         cache_key = "site_statistics"
-        statistics = cache.get(cache_key)
+        statistics = record_cache_lookup('site_statistics', cache.get(cache_key))
 
         if statistics is None:
             statistics = self._generate_site_statistics()
             cache.set(cache_key, statistics, 300)  # Кэшируем на 5 минут
         return statistics
 
+    async def aget_site_statistics(self):
+        """Асинхронный вариант get_site_statistics: запросы выполняются через asyncio.gather"""
+        cache_key = "site_statistics"
+        statistics = record_cache_lookup('site_statistics', await cache.aget(cache_key))
+
+        if statistics is None:
+            statistics = await self._agenerate_site_statistics()
+            await cache.aset(cache_key, statistics, 300)  # Кэшируем на 5 минут
+        return statistics
+
     def _generate_site_statistics(self):
         """Сгенерировать статистику сайта"""
+        lists, counts = self._site_statistics_querysets()
+        statistics = {name: list(queryset) for name, queryset in lists.items()}
+        statistics.update({name: queryset.count() for name, queryset in counts.items()})
+        return statistics
+
+    async def _agenerate_site_statistics(self):
+        lists, counts = self._site_statistics_querysets()
+
+        async def fetch(queryset):
+            return [obj async for obj in queryset]
+
+        results = await asyncio.gather(
+            *(fetch(queryset) for queryset in lists.values()),
+            *(queryset.acount() for queryset in counts.values()),
+        )
+        return dict(zip([*lists, *counts], results))
+
+    def _site_statistics_querysets(self):
+        """Запросы статистики сайта (еще не выполненные): списки объектов и счетчики"""
         # Импортируем здесь, чтобы избежать циклических импортов
         from recipes.models import Favorite
 
@@ -48,27 +86,43 @@ class StatisticsManager(models.Manager):
             recipe_count__gt=0
         ).order_by('-total_favorites', '-recipe_count')[:3]
 
-        # Дополнительная статистика
-        total_recipes = Recipe.objects.count()
-        total_users = User.objects.count()
-        total_favorites = Favorite.objects.count()
-
         # Статистика за последнюю неделю
         week_ago = datetime.now() - timedelta(days=7)
-        new_recipes_week = Recipe.objects.filter(created_at__gte=week_ago).count()
-        new_users_week = User.objects.filter(date_joined__gte=week_ago).count()
 
-        return {
-            'popular_recipes': list(popular_recipes),
-            'new_recipes': list(new_recipes),
-            'popular_hashtags': list(popular_hashtags),
-            'popular_authors': list(popular_authors),
-            'total_recipes': total_recipes,
-            'total_users': total_users,
-            'total_favorites': total_favorites,
-            'new_recipes_week': new_recipes_week,
-            'new_users_week': new_users_week,
+        lists = {
+            'popular_recipes': popular_recipes,
+            'new_recipes': new_recipes,
+            'popular_hashtags': popular_hashtags,
+            'popular_authors': popular_authors,
+        }
+        counts = {
+            'total_recipes': Recipe.objects.all(),
+            'total_users': User.objects.all(),
+            'total_favorites': Favorite.objects.all(),
+            'new_recipes_week': Recipe.objects.filter(created_at__gte=week_ago),
+            'new_users_week': User.objects.filter(date_joined__gte=week_ago),
         }
+        return lists, counts
+
+    @staticmethod
+    def to_json_data(statistics):
+        """Подготовить статистику к сохранению в JSONField.
+
+        Statistic живет в базе аналитики, поэтому объекты основной базы
+        сохраняются ссылками (id и название), а даты - строками.
+        """
+        def convert(value):
+            if isinstance(value, models.Model):
+                return {'id': value.pk, 'name': str(value)}
+            if isinstance(value, dict):
+                return {key: convert(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [convert(item) for item in value]
+            if isinstance(value, (date, datetime)):
+                return value.isoformat()
+            return value
+
+        return convert(statistics)
 
     def get_detailed_statistics(self):
         """Получить детальную статистику для админ-панели"""
@@ -131,31 +185,91 @@ class Article(models.Model):
         return self.title
 
 
+# Рекомендации свежие час; после этого еще сутки отдаются из кэша, пока воркер их пересчитывает
+RECOMMENDATIONS_FRESH_SECONDS = 3600
+RECOMMENDATIONS_KEEP_SECONDS = 24 * 3600
+
+
 class RecommendationManager(models.Manager):
     def get_recommendations_for_user(self, user):
         """Получить рекомендации для пользователя"""
         cache_key = f"user_recommendations_{user.id}"
-        recommendations = cache.get(cache_key)
+        cached = record_cache_lookup('user_recommendations', cache.get(cache_key))
 
-        if recommendations is None:
-            print(f"Генерация рекомендаций для пользователя {user.username}")
+        if cached is None:
             recommendations = self.generate_recommendations(user)
-            cache.set(cache_key, recommendations, 3600)
-            print(f"Сгенерировано рекомендаций: {len(recommendations)}")
+            self.store_recommendations(user, recommendations)
         else:
-            print(f"Рекомендации загружены из кэша: {len(recommendations)}")
+            recommendations, fresh_until = cached
+            logger.debug("Рекомендации пользователя %s из кэша: %d блоков", user.pk, len(recommendations))
+            if fresh_until < time.time():
+                self._schedule_recompute(user)
 
         return recommendations
 
-    def generate_recommendations(self, user):
-        """Сгенерировать рекомендации для пользователя"""
-        recommendations = []
+    async def aget_recommendations_for_user(self, user):
+        """Асинхронный вариант get_recommendations_for_user"""
+        cache_key = f"user_recommendations_{user.id}"
+        cached = record_cache_lookup('user_recommendations', await cache.aget(cache_key))
+
+        if cached is None:
+            recommendations = await self.agenerate_recommendations(user)
+            await cache.aset(cache_key, self._cache_entry(recommendations), RECOMMENDATIONS_KEEP_SECONDS)
+        else:
+            recommendations, fresh_until = cached
+            if fresh_until < time.time():
+                await sync_to_async(self._schedule_recompute)(user)
+        return recommendations
 
-        print(f"=== ГЕНЕРАЦИЯ РЕКОМЕНДАЦИЙ ДЛЯ {user.username} ===")
+    def store_recommendations(self, user, recommendations):
+        cache.set(f"user_recommendations_{user.id}", self._cache_entry(recommendations), RECOMMENDATIONS_KEEP_SECONDS)
 
+    @staticmethod
+    def _cache_entry(recommendations):
+        return recommendations, time.time() + RECOMMENDATIONS_FRESH_SECONDS
+
+    @staticmethod
+    def _schedule_recompute(user):
+        """Устаревшие рекомендации уже отданы, пересчет - в фоновой задаче"""
+        from .tasks import recompute_recommendations
+        recompute_recommendations.enqueue({'user_id': user.id}, dedup_key=f"recommendations:{user.id}")
+
+    def generate_recommendations(self, user):
+        """Сгенерировать рекомендации для пользователя"""
+        started = time.perf_counter()
         # 1. Рекомендации по хештегам из избранного
         favorite_hashtag_recipes = self.get_recommendations_by_favorite_hashtags(user)
-        print(f"Рекомендаций по хештегам: {len(favorite_hashtag_recipes) if favorite_hashtag_recipes else 0}")
+
+        # 2. Популярные рецепты (по количеству в избранном)
+        popular_recipes = self.get_popular_recipes()
+
+        # 3. Трендовые рецепты (по популярным хештегам поиска)
+        trending_recipes = self.get_trending_recipes()
+
+        recommendations = self._build_recommendations(favorite_hashtag_recipes, popular_recipes, trending_recipes)
+        RECOMMENDATIONS_GENERATION.observe(time.perf_counter() - started)
+        logger.debug(
+            "Рекомендации для пользователя %s: по хештегам %d, популярных %d, трендовых %d",
+            user.pk, len(favorite_hashtag_recipes or []), len(popular_recipes or []), len(trending_recipes or []),
+        )
+        return recommendations
+
+    async def agenerate_recommendations(self, user):
+        """Сгенерировать рекомендации: три блока считаются одновременно"""
+        started = time.perf_counter()
+        favorite_hashtag_recipes, popular_recipes, trending_recipes = await asyncio.gather(
+            self.aget_recommendations_by_favorite_hashtags(user),
+            self.aget_popular_recipes(),
+            self.aget_trending_recipes(),
+        )
+        recommendations = self._build_recommendations(favorite_hashtag_recipes, popular_recipes, trending_recipes)
+        RECOMMENDATIONS_GENERATION.observe(time.perf_counter() - started)
+        return recommendations
+
+    @staticmethod
+    def _build_recommendations(favorite_hashtag_recipes, popular_recipes, trending_recipes):
+        """Собрать непустые блоки рекомендаций в порядке показа"""
+        recommendations = []
 
         if favorite_hashtag_recipes:
             recommendations.append({
@@ -165,10 +279,6 @@ class RecommendationManager(models.Manager):
                 'recipes': favorite_hashtag_recipes
             })
 
-        # 2. Популярные рецепты (по количеству в избранном)
-        popular_recipes = self.get_popular_recipes()
-        print(f"Популярных рецептов: {len(popular_recipes)}")
-
         if popular_recipes:
             recommendations.append({
                 'type': 'popular',
@@ -177,10 +287,6 @@ class RecommendationManager(models.Manager):
                 'recipes': popular_recipes
             })
 
-        # 3. Трендовые рецепты (по популярным хештегам поиска)
-        trending_recipes = self.get_trending_recipes()
-        print(f"Трендовых рецептов: {len(trending_recipes) if trending_recipes else 0}")
-
         if trending_recipes:
             recommendations.append({
                 'type': 'trending',
@@ -189,115 +295,126 @@ class RecommendationManager(models.Manager):
                 'recipes': trending_recipes
             })
 
-        print(f"Итого рекомендаций: {len(recommendations)} категорий")
         return recommendations
 
     def get_recommendations_by_favorite_hashtags(self, user):
         """Рекомендации на основе хештегов из избранных рецептов"""
-        print("Поиск рекомендаций по хештегам из избранного...")
-
-        # Импортируем здесь, чтобы избежать циклических импортов
-        from recipes.models import Favorite
-
-        favorite_recipes = user.favorite_set.all()
-        print(f"Найдено избранных рецептов: {favorite_recipes.count()}")
-
-        if not favorite_recipes:
-            print("Нет избранных рецептов")
+        favorite_recipe_ids = list(user.favorite_set.values_list('recipe_id', flat=True))
+        if not favorite_recipe_ids:
+            logger.debug("У пользователя %s нет избранных рецептов", user.pk)
             return None
 
-        favorite_recipe_ids = [fav.recipe.id for fav in favorite_recipes]
-        print(f"ID избранных рецептов: {favorite_recipe_ids}")
-
         # Находим популярные хештеги в избранном
-        favorite_hashtags = Hashtag.objects.filter(
-            recipe__in=favorite_recipe_ids
-        ).annotate(
-            count=Count('recipe')
-        ).order_by('-count')[:5]
-
-        print(f"Найдено хештегов в избранном: {favorite_hashtags.count()}")
-        for hashtag in favorite_hashtags:
-            print(f" - {hashtag.name}: {hashtag.count} рецептов")
-
+        favorite_hashtags = list(self._favorite_hashtags(favorite_recipe_ids))
         if not favorite_hashtags:
-            print("Нет хештегов в избранных рецептах")
+            logger.debug("В избранном пользователя %s нет хештегов", user.pk)
             return None
 
         # Ищем рецепты с этими хештегами, исключая уже избранные
-        recommended_recipes = Recipe.objects.filter(
-            hashtags__in=favorite_hashtags
-        ).exclude(
+        recommended_recipes = self._recipes_with_hashtags(favorite_hashtags).exclude(
             id__in=favorite_recipe_ids
-        ).distinct().order_by('-created_at')[:8]
-
-        print(f"Найдено рекомендованных рецептов: {recommended_recipes.count()}")
+        )[:8]
         return list(recommended_recipes)
 
-    def get_popular_recipes(self):
-        """Самые популярные рецепты (по количеству добавлений в избранное)"""
-        print("Поиск популярных рецептов по избранному...")
+    async def aget_recommendations_by_favorite_hashtags(self, user):
+        favorite_recipe_ids = [
+            recipe_id async for recipe_id in user.favorite_set.values_list('recipe_id', flat=True)
+        ]
+        if not favorite_recipe_ids:
+            return None
 
-        # Используем то же имя для consistency
-        popular_recipes = Recipe.objects.annotate(
-            fav_count_annotated=Count('favorite')
-        ).filter(
-            fav_count_annotated__gt=0
-        ).order_by('-fav_count_annotated', '-created_at')[:8]
+        favorite_hashtags = [hashtag async for hashtag in self._favorite_hashtags(favorite_recipe_ids)]
+        if not favorite_hashtags:
+            return None
+
+        recommended_recipes = self._recipes_with_hashtags(favorite_hashtags).exclude(
+            id__in=favorite_recipe_ids
+        )[:8]
+        return [recipe async for recipe in recommended_recipes]
 
-        print(f"Найдено популярных рецептов: {popular_recipes.count()}")
-        for recipe in popular_recipes:
-            # Получаем количество избранных через аннотацию
-            fav_count = getattr(recipe, 'fav_count_annotated', 0)
-            print(f" - {recipe.title}: {fav_count} избранных")
+    def get_popular_recipes(self):
+        """Самые популярные рецепты (по количеству добавлений в избранное)"""
+        return list(self._popular_recipes())
 
-        return list(popular_recipes)
+    async def aget_popular_recipes(self):
+        return [recipe async for recipe in self._popular_recipes()]
 
     def get_trending_recipes(self):
         """Трендовые рецепты (по популярным хештегам поиска)"""
-        print("Поиск трендовых рецептов по хештегам поиска...")
-
         try:
-            # Используем статистику поиска по хештегам
-            trending_hashtags = Hashtag.objects.filter(
-                search_stats__search_count__gt=0
-            ).annotate(
-                search_count=Count('search_stats__search_count')
-            ).order_by('-search_stats__search_count', '-search_stats__last_searched')[:3]
+            # Статистика поиска хранится в базе аналитики, поэтому без JOIN:
+            # сначала id хештегов оттуда, затем сами хештеги из основной базы
+            trending_ids = list(self._trending_hashtag_ids())
+            trending_hashtags = list(Hashtag.objects.filter(id__in=trending_ids))
 
             # Если нет данных о поиске, используем популярные хештеги как fallback
             if not trending_hashtags:
-                print("Нет данных о поиске, используем популярные хештеги...")
-                trending_hashtags = Hashtag.objects.annotate(
-                    recipe_count=Count('recipe')
-                ).filter(
-                    recipe_count__gt=0
-                ).order_by('-recipe_count')[:3]
-
-        except Exception as e:
-            print(f"Ошибка при получении трендовых хештегов: {e}")
-            # Fallback на популярные хештеги
-            trending_hashtags = Hashtag.objects.annotate(
-                recipe_count=Count('recipe')
-            ).filter(
-                recipe_count__gt=0
-            ).order_by('-recipe_count')[:3]
+                logger.debug("Нет данных о поиске хештегов, используем популярные хештеги")
+                trending_hashtags = list(self._top_hashtags())
 
-        print(f"Найдено трендовых хештегов: {trending_hashtags.count()}")
-        for hashtag in trending_hashtags:
-            print(f" - {hashtag.name}")
+        except Exception:
+            logger.warning("Ошибка при получении трендовых хештегов", exc_info=True)
+            # Fallback на популярные хештеги
+            trending_hashtags = list(self._top_hashtags())
 
         if not trending_hashtags:
-            print("Нет трендовых хештегов")
             return None
 
         # Ищем рецепты с этими хештегами
-        trending_recipes = Recipe.objects.filter(
-            hashtags__in=trending_hashtags
-        ).distinct().order_by('-created_at')[:8]
+        return list(self._recipes_with_hashtags(trending_hashtags)[:8])
+
+    async def aget_trending_recipes(self):
+        try:
+            trending_ids = [hashtag_id async for hashtag_id in self._trending_hashtag_ids()]
+            trending_hashtags = [hashtag async for hashtag in Hashtag.objects.filter(id__in=trending_ids)]
+            if not trending_hashtags:
+                trending_hashtags = [hashtag async for hashtag in self._top_hashtags()]
+        except Exception:
+            logger.warning("Ошибка при получении трендовых хештегов", exc_info=True)
+            trending_hashtags = [hashtag async for hashtag in self._top_hashtags()]
+
+        if not trending_hashtags:
+            return None
+        return [recipe async for recipe in self._recipes_with_hashtags(trending_hashtags)[:8]]
+
+    # Запросы, общие для синхронных и асинхронных методов
+
+    @staticmethod
+    def _favorite_hashtags(favorite_recipe_ids):
+        return Hashtag.objects.filter(
+            recipe__in=favorite_recipe_ids
+        ).annotate(
+            count=Count('recipe')
+        ).order_by('-count')[:5]
+
+    @staticmethod
+    def _recipes_with_hashtags(hashtags):
+        return Recipe.objects.filter(
+            hashtags__in=hashtags
+        ).distinct().order_by('-created_at')
 
-        print(f"Найдено трендовых рецептов: {trending_recipes.count()}")
-        return list(trending_recipes)
+    @staticmethod
+    def _popular_recipes():
+        # Используем то же имя для consistency
+        return Recipe.objects.annotate(
+            fav_count_annotated=Count('favorite')
+        ).filter(
+            fav_count_annotated__gt=0
+        ).order_by('-fav_count_annotated', '-created_at')[:8]
+
+    @staticmethod
+    def _trending_hashtag_ids():
+        return HashtagSearch.objects.filter(
+            search_count__gt=0
+        ).order_by('-search_count', '-last_searched').values_list('hashtag_id', flat=True)[:3]
+
+    @staticmethod
+    def _top_hashtags():
+        return Hashtag.objects.annotate(
+            recipe_count=Count('recipe')
+        ).filter(
+            recipe_count__gt=0
+        ).order_by('-recipe_count')[:3]
 
 
 class Recommendation(models.Model):
@@ -368,7 +485,7 @@ class Statistic(models.Model):
             statistic_type='site_overview',
             period_start=week_ago,
             period_end=today,
-            defaults={'data': site_stats}
+            defaults={'data': stats_manager.to_json_data(site_stats)}
         )
 
         # Сохраняем детальную статистику
@@ -376,15 +493,17 @@ class Statistic(models.Model):
             statistic_type='user_activity',
             period_start=week_ago,
             period_end=today,
-            defaults={'data': detailed_stats}
+            defaults={'data': stats_manager.to_json_data(detailed_stats)}
         )
 
 
 class SearchQuery(models.Model):
     """Модель для отслеживания поисковых запросов пользователей"""
     query = models.CharField(max_length=255, verbose_name="Поисковый запрос")
-    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
-                             verbose_name="Пользователь")
+    # Модель живет в базе аналитики: ограничение FK между базами невозможно,
+    # каскадное удаление выполняется сигналом (others.signals)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, blank=True,
+                             db_constraint=False, verbose_name="Пользователь")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата запроса")
     results_count = models.PositiveIntegerField(default=0, verbose_name="Количество результатов")
 
@@ -392,6 +511,9 @@ class SearchQuery(models.Model):
         verbose_name = "Поисковый запрос"
         verbose_name_plural = "Поисковые запросы"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='searchquery_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.query} ({self.created_at})"
@@ -399,7 +521,8 @@ class SearchQuery(models.Model):
 
 class HashtagSearch(models.Model):
     """Статистика использования хештегов в поиске"""
-    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE,
+    # См. SearchQuery.user: связь между базами без ограничения FK
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.DO_NOTHING, db_constraint=False,
                                 verbose_name="Хештег", related_name='search_stats')
     search_count = models.PositiveIntegerField(default=0, verbose_name="Количество поисков")
     last_searched = models.DateTimeField(auto_now=True, verbose_name="Последний поиск")
@@ -407,6 +530,9 @@ class HashtagSearch(models.Model):
     class Meta:
         verbose_name = "Статистика хештега в поиске"
         verbose_name_plural = "Статистика хештегов в поиске"
+        constraints = [
+            models.UniqueConstraint(fields=['hashtag'], name='hashtagsearch_unique_hashtag'),
+        ]
 
     def __str__(self):
         return f"{self.hashtag.name}: {self.search_count} поисков"
\ No newline at end of file
@@ -0,0 +1,196 @@
+# others/page_cache.py
+"""Кэш целых страниц для анонимных посетителей.
+
+Ключ строится из пути и нормализованной строки запроса, плюс версии тегов
+страницы ('recipes', 'hashtags', 'articles'). Сброс тега - это увеличение его
+версии, после чего все ключи со старой версией просто перестают находиться.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .metrics import record_cache_lookup
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+
+TAG_VERSION_PREFIX = 'page_cache_tag_'
+PAGE_KEY_PREFIX = 'page_cache_page_'
+
+
+def normalize_query(query_dict):
+    """Нормализованная строка запроса: ключи и значения отсортированы,
+    пустые значения и page=1 отброшены"""
+    parts = []
+    for key in sorted(query_dict.keys()):
+        values = sorted(v.strip() for v in query_dict.getlist(key) if v.strip())
+        if key == 'page' and values == ['1']:
+            continue
+        for value in values:
+            parts.append(f"{key}={value}")
+    return '&'.join(parts)
+
+
+def get_tag_versions(tags):
+    """Текущие версии тегов (одним запросом к кэшу)"""
+    keys = [TAG_VERSION_PREFIX + tag for tag in tags]
+    versions = cache.get_many(keys)
+    return [versions.get(key, 0) for key in keys]
+
+
+def invalidate_tags(*tags):
+    """Сбросить все страницы, помеченные любым из тегов"""
+    for tag in tags:
+        key = TAG_VERSION_PREFIX + tag
+        # add не перезапишет существующую версию, incr атомарен в общих бэкендах
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+async def aget_tag_versions(tags):
+    keys = [TAG_VERSION_PREFIX + tag for tag in tags]
+    versions = await cache.aget_many(keys)
+    return [versions.get(key, 0) for key in keys]
+
+
+def _page_key(request, tags, versions):
+    raw = '|'.join([
+        request.path,
+        normalize_query(request.GET),
+        ','.join(f"{tag}:{version}" for tag, version in zip(tags, versions)),
+    ])
+    return PAGE_KEY_PREFIX + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def make_page_key(request, tags):
+    return _page_key(request, tags, get_tag_versions(tags))
+
+
+async def amake_page_key(request, tags):
+    return _page_key(request, tags, await aget_tag_versions(tags))
+
+
+def is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Страница с flash-сообщениями персональна
+    if len(get_messages(request)):
+        return False
+    return True
+
+
+async def ais_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Пользователь и сообщения лежат в сессии - читаем их без блокировки цикла событий
+    request.user = await request.auser()
+    if request.user.is_authenticated:
+        return False
+    if await sync_to_async(len)(get_messages(request)):
+        return False
+    return True
+
+
+def is_cacheable_response(request, response):
+    if response.status_code != 200 or response.streaming:
+        return False
+    if response.cookies:
+        return False
+    # В шаблоне использовался csrf_token - такой ответ нельзя отдавать другим
+    if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+        return False
+    return True
+
+
+def anonymous_page_cache(*tags, timeout=None):
+    """Декоратор view: кэширует ответ для анонимных пользователей.
+
+    В ответ добавляются заголовки X-Cache (HIT/MISS/BYPASS) и Age.
+    Подходит и для async view.
+    """
+    if timeout is None:
+        timeout = PAGE_CACHE_TIMEOUT
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            return _async_wrapper(view_func, tags, timeout)
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                response = view_func(request, *args, **kwargs)
+                response['X-Cache'] = 'BYPASS'
+                return response
+
+            key = make_page_key(request, tags)
+            cached = record_cache_lookup('page', cache.get(key))
+            if cached is not None:
+                return _cached_response(cached)
+
+            response = view_func(request, *args, **kwargs)
+            # TemplateResponse (ListView) рендерится лениво
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+
+            if is_cacheable_response(request, response):
+                cache.set(key, _cache_entry(response), timeout)
+                _mark_miss(response)
+            else:
+                response['X-Cache'] = 'BYPASS'
+            return response
+
+        return _wrapped_view
+
+    return decorator
+
+
+def _async_wrapper(view_func, tags, timeout):
+    """Тот же кэш для async view: обращения к кэшу через aget/aset"""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        if not await ais_cacheable_request(request):
+            response = await view_func(request, *args, **kwargs)
+            response['X-Cache'] = 'BYPASS'
+            return response
+
+        key = await amake_page_key(request, tags)
+        cached = record_cache_lookup('page', await cache.aget(key))
+        if cached is not None:
+            return _cached_response(cached)
+
+        response = await view_func(request, *args, **kwargs)
+        if is_cacheable_response(request, response):
+            await cache.aset(key, _cache_entry(response), timeout)
+            _mark_miss(response)
+        else:
+            response['X-Cache'] = 'BYPASS'
+        return response
+
+    return _wrapped_view
+
+
+def _cache_entry(response):
+    return response.content, response['Content-Type'], time.time()
+
+
+def _cached_response(cached):
+    content, content_type, created = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Cache'] = 'HIT'
+    response['Age'] = str(int(time.time() - created))
+    return response
+
+
+def _mark_miss(response):
+    response['X-Cache'] = 'MISS'
+    response['Age'] = '0'
@@ -0,0 +1,131 @@
+# others/profiling.py
+"""Выборочный (sampling) профилировщик запросов.
+
+Пока запрос профилируется, фоновый поток каждые PROFILING_INTERVAL секунд
+снимает стек потока, обрабатывающего запрос (sys._current_frames), и считает
+одинаковые стеки. Результат - файл в формате collapsed stack
+("a;b;c <число выборок>") в PROFILING_DIR/<имя URL>/, который читают
+flamegraph.pl, speedscope и команда aggregate_profiles.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+PROFILING_DIR = str(getattr(settings, 'PROFILING_DIR', 'profiles'))
+PROFILING_INTERVAL = getattr(settings, 'PROFILING_INTERVAL', 0.005)
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse_stack(frame):
+    """Стек от корня к текущей функции одной строкой через ';'"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+# Функции, в которых поток простаивает: такие стеки в профиль всех потоков не идут
+IDLE_FUNCTIONS = (
+    'threading.Condition.wait', 'threading.Event.wait', 'selectors.', 'queue.',
+    'concurrent.futures.thread._worker', 'socketserver.BaseServer.serve_forever',
+    'logging.handlers.QueueListener.dequeue',
+)
+
+
+def is_idle(stack):
+    return stack.rpartition(';')[2].startswith(IDLE_FUNCTIONS)
+
+
+class Sampler:
+    """Один фоновый поток на процесс, снимает стеки всех профилируемых потоков.
+
+    Профиль, запущенный с all_threads=True, собирает стеки всех занятых потоков
+    процесса - так видна работа async view, которые asgiref выполняет в потоке
+    цикла событий и пуле sync_to_async.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id, all_threads=False):
+        samples = Counter()
+        samples.all_threads = all_threads
+        with self._lock:
+            self._profiles[thread_id] = samples
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return samples
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._profiles.pop(thread_id, Counter())
+
+    def _run(self):
+        sampler_id = threading.get_ident()
+        while True:
+            # Пока никто не профилируется, поток спит и не тратит GIL
+            self._wakeup.wait()
+            with self._lock:
+                profiles = dict(self._profiles)
+                if not profiles:
+                    self._wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            for thread_id, samples in profiles.items():
+                if samples.all_threads:
+                    for other_id, frame in frames.items():
+                        if other_id != sampler_id:
+                            stack = collapse_stack(frame)
+                            if not is_idle(stack):
+                                samples[stack] += 1
+                elif thread_id in frames:
+                    samples[collapse_stack(frames[thread_id])] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler(PROFILING_INTERVAL)
+
+
+def safe_view_name(view_name):
+    """Имя URL как имя каталога: 'recipes:recipe_detail' -> 'recipes-recipe_detail'"""
+    return re.sub(r'[^\w.-]+', '-', view_name or 'unresolved').strip('-') or 'unresolved'
+
+
+def write_profile(view_name, samples, directory=None):
+    """Записать выборки в PROFILING_DIR/<имя URL>/<время>-<pid>-<поток>.collapsed"""
+    directory = os.path.join(directory or PROFILING_DIR, safe_view_name(view_name))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{time.time():.6f}-{os.getpid()}-{threading.get_ident()}.collapsed')
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in samples.most_common():
+            f.write(f'{stack} {count}\n')
+    return path
+
+
+def read_profile(path):
+    """Выборки из collapsed-файла: Counter стек -> число выборок"""
+    samples = Counter()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                samples[stack] += int(count)
+    return samples
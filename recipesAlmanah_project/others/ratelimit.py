@@ -0,0 +1,127 @@
+# others/ratelimit.py
+"""Ограничение частоты запросов к записывающим и поисковым view.
+
+Скользящее окно на двух счетчиках в кэше: число запросов в текущем окне
+плюс число в предыдущем с весом оставшейся доли окна. Счетчики
+увеличиваются через add + incr - в общем кэше (Redis) это атомарно для всех
+воркеров; файловый кэш для локальной разработки атомарности не дает.
+
+Лимиты задаются в settings.RATE_LIMITS по имени области: "<число>/<период>",
+период - s, m, h или d (например "30/m"). Ключ - пользователь, для анонимов
+IP-адрес. Отклоненный запрос получает 429 с заголовком Retry-After и
+учитывается в метрике rate_limited_requests.
+"""
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+from .metrics import RATE_LIMITED
+
+KEY_PREFIX = 'ratelimit_'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'30/m' -> (30, 60)"""
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period.strip().lower()]
+
+
+def client_key(request, key_by='user'):
+    """Пользователь (если key_by='user' и он вошел) или IP-адрес"""
+    if key_by == 'user' and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _incr(key, timeout):
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Счетчик вытеснен между add и incr
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def _retry_after(limit, period, previous, current, elapsed):
+    """Через сколько секунд следующий запрос уложится в лимит"""
+    if current < limit:
+        # Ждем, пока вес предыдущего окна уменьшится
+        wait = period * (1 - (limit - current - 1) / previous) - elapsed
+    else:
+        # В текущем окне места нет: ждем следующего, где текущее станет предыдущим
+        wait = period - elapsed + period * (1 - (limit - 1) / max(current, 1))
+    return max(1, math.ceil(wait))
+
+
+def check(scope, ident, limit, period):
+    """Учесть запрос; None, если он разрешен, иначе Retry-After в секундах"""
+    now = time.time()
+    window = int(now // period)
+    elapsed = now - window * period
+    key = f'{KEY_PREFIX}{scope}_{ident}_'
+    current = _incr(f'{key}{window}', period * 2)
+    previous = cache.get(f'{key}{window - 1}', 0)
+    if previous * (1 - elapsed / period) + current <= limit:
+        return None
+    # Отклоненный запрос не должен продлевать блокировку
+    cache.decr(f'{key}{window}')
+    return _retry_after(limit, period, previous, current - 1, elapsed)
+
+
+def _throttled(request, scope, retry_after):
+    RATE_LIMITED.inc(scope=scope)
+    response = render(request, 'others/rate_limited.html', {'retry_after': retry_after}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(scope, methods=('POST',), key_by='user'):
+    """Декоратор view: не больше settings.RATE_LIMITS[scope] запросов на клиента.
+
+    methods - какие методы считать (None - все), key_by - 'user' или 'ip'.
+    Области без лимита в настройках и RATE_LIMIT_ENABLED=False не ограничиваются.
+    Подходит и для async view.
+    """
+    def applies(request):
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+            return None
+        rate = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+        if not rate or (methods is not None and request.method not in methods):
+            return None
+        return parse_rate(rate)
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                rate = applies(request)
+                if rate:
+                    request.user = await request.auser()
+                    retry_after = await sync_to_async(check, thread_sensitive=False)(
+                        scope, client_key(request, key_by), *rate,
+                    )
+                    if retry_after is not None:
+                        return await sync_to_async(_throttled)(request, scope, retry_after)
+                return await view_func(request, *args, **kwargs)
+
+            return _wrapped_async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            rate = applies(request)
+            if rate:
+                retry_after = check(scope, client_key(request, key_by), *rate)
+                if retry_after is not None:
+                    return _throttled(request, scope, retry_after)
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
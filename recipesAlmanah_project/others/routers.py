@@ -0,0 +1,113 @@
+# others/routers.py
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+ANALYTICS_DATABASE = getattr(settings, 'ANALYTICS_DATABASE', 'analytics')
+
+# Аналитические таблицы с интенсивной записью (others)
+ANALYTICS_MODELS = {'searchquery', 'hashtagsearch', 'statistic'}
+
+
+def is_analytics_model(app_label, model_name):
+    return app_label == 'others' and model_name in ANALYTICS_MODELS
+
+
+class AnalyticsRouter:
+    """Размещает аналитические модели others в отдельной базе ANALYTICS_DATABASE.
+
+    Если такой базы нет в settings.DATABASES, роутер ничего не делает.
+    """
+
+    def _analytics_db(self, model):
+        if ANALYTICS_DATABASE not in settings.DATABASES:
+            return None
+        if is_analytics_model(model._meta.app_label, model._meta.model_name):
+            return ANALYTICS_DATABASE
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._analytics_db(model)
+
+    def db_for_write(self, model, **hints):
+        return self._analytics_db(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Связи аналитики с пользователями и хештегами хранятся без ограничений FK
+        if any(is_analytics_model(obj._meta.app_label, obj._meta.model_name) for obj in (obj1, obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if ANALYTICS_DATABASE not in settings.DATABASES:
+            return None
+        if is_analytics_model(app_label, model_name):
+            return db == ANALYTICS_DATABASE
+        if db == ANALYTICS_DATABASE:
+            return False
+        return None
+
+
+# Реплики для чтения и признак "этот запрос может читать с реплики"
+REPLICA_DATABASES = getattr(settings, 'REPLICA_DATABASES', [])
+
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+def start_request():
+    """Начать учет запроса (вызывается ReplicaRoutingMiddleware)"""
+    return _request_state.set({'use_replica': False, 'wrote': False})
+
+
+def end_request(token):
+    _request_state.reset(token)
+
+
+def allow_replica_reads():
+    state = _request_state.get()
+    if state is not None:
+        state['use_replica'] = True
+
+
+def request_wrote():
+    state = _request_state.get()
+    return bool(state and state['wrote'])
+
+
+class ReplicaRouter:
+    """Чтение с реплик для разрешенных представлений, запись - в основную базу.
+
+    После записи запрос помечается, и middleware закрепляет чтение пользователя
+    за основной базой на REPLICA_PIN_SECONDS (read-your-writes).
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        # Сессии всегда читаем из основной базы: свежий вход еще мог не дойти до реплики
+        if model._meta.app_label == 'sessions':
+            return None
+        if REPLICA_DATABASES and state and state['use_replica'] and not state['wrote']:
+            return random.choice(REPLICA_DATABASES)
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        # Запись аналитики, сессий и очереди задач не влияет на то, что пользователь видит в ленте
+        if state is not None and model._meta.app_label not in ('sessions', 'jobs') and \
+                not is_analytics_model(model._meta.app_label, model._meta.model_name):
+            state['wrote'] = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема на реплики приходит репликацией
+        if db in REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,94 @@
+# others/signals.py
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from django.contrib.auth.models import User
+
+from recipes.models import Recipe, Hashtag, Ingredient, Favorite
+from recipes.popularity import favorite_added, favorite_removed
+from recipes.tasks import update_recipe_similarity
+from recipes.vocabulary import invalidate_vocabulary
+from users.tasks import fan_out_publication
+from .models import Article, SearchQuery, HashtagSearch
+from .page_cache import invalidate_tags
+
+
+#Сброс кэша страниц при изменении рецептов (ингредиенты участвуют в поиске ленты)
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver(m2m_changed, sender=Recipe.hashtags.through)
+def purge_recipe_pages(sender, **kwargs):
+    invalidate_tags('recipes')
+
+
+#Индекс похожих рецептов обновляет воркер; задержка собирает сохранения всей формы в одну задачу
+SIMILARITY_DELAY = 5
+
+
+@receiver(post_save, sender=Recipe)
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver(m2m_changed, sender=Recipe.hashtags.through)
+def schedule_similarity_update(sender, instance, **kwargs):
+    if not kwargs.get('action', 'post_').startswith('post_') or kwargs.get('raw'):
+        return
+    # Для m2m со стороны хештега instance - хештег, такие изменения идут через Recipe.hashtags
+    recipe_id = instance.pk if isinstance(instance, Recipe) else getattr(instance, 'recipe_id', None)
+    if recipe_id is not None:
+        update_recipe_similarity.enqueue(
+            {'recipe_id': recipe_id}, dedup_key=f"similarity:{recipe_id}", delay=SIMILARITY_DELAY
+        )
+
+
+#Счетчики популярности рецепта для сортировок ленты
+@receiver(post_save, sender=Favorite)
+def count_favorite_added(sender, instance, created, **kwargs):
+    if created:
+        favorite_added(instance.recipe_id)
+
+
+@receiver(post_delete, sender=Favorite)
+def count_favorite_removed(sender, instance, **kwargs):
+    favorite_removed(instance.recipe_id)
+
+
+#Новые публикации - в ленты подписчиков автора (users.timeline)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Article)
+def schedule_timeline_fan_out(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        kind = 'recipe' if sender is Recipe else 'article'
+        fan_out_publication.enqueue(
+            {'kind': kind, 'object_id': instance.pk}, dedup_key=f"fan_out:{kind}:{instance.pk}"
+        )
+
+
+#Сброс кэша страниц при изменении хештегов
+@receiver([post_save, post_delete], sender=Hashtag)
+def purge_hashtag_pages(sender, **kwargs):
+    invalidate_tags('hashtags')
+
+
+#Словарь хештегов хранит и число рецептов с тегом
+@receiver([post_save, post_delete], sender=Hashtag)
+@receiver(m2m_changed, sender=Recipe.hashtags.through)
+def purge_hashtag_vocabulary(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        invalidate_vocabulary()
+
+
+#Сброс кэша страниц при изменении статей
+@receiver([post_save, post_delete], sender=Article)
+@receiver(m2m_changed, sender=Article.hashtags.through)
+def purge_article_pages(sender, **kwargs):
+    invalidate_tags('articles')
+
+
+#Аналитика в отдельной базе: каскадное удаление вместо ограничений FK
+@receiver(post_delete, sender=User)
+def delete_user_search_queries(sender, instance, **kwargs):
+    SearchQuery.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Hashtag)
+def delete_hashtag_search_stats(sender, instance, **kwargs):
+    HashtagSearch.objects.filter(hashtag_id=instance.pk).delete()
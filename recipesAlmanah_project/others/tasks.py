@@ -0,0 +1,29 @@
+# others/tasks.py
+"""Фоновые задачи (выполняются воркером jobs: manage.py run_worker)"""
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db.models import F
+
+from jobs.registry import task
+from .models import Recommendation, Statistic
+
+
+@task()
+def refresh_site_statistics():
+    Statistic.update_site_statistics()
+
+
+@task()
+def recompute_recommendations(user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    Recommendation.objects.store_recommendations(user, Recommendation.objects.generate_recommendations(user))
+
+
+@task()
+def flush_counters(model, field, counts):
+    """Прибавить накопленные счетчики: counts - {pk: прирост}"""
+    model_class = apps.get_model(model)
+    for pk, amount in counts.items():
+        model_class.objects.filter(pk=pk).update(**{field: F(field) + amount})
@@ -1,3 +1,123 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import ratelimit
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit-tests'},
+}
+
+
+class ParseRateTests(SimpleTestCase):
+    def test_periods(self):
+        self.assertEqual(ratelimit.parse_rate('30/m'), (30, 60))
+        self.assertEqual(ratelimit.parse_rate('5/s'), (5, 1))
+        self.assertEqual(ratelimit.parse_rate('20/H'), (20, 3600))
+        self.assertEqual(ratelimit.parse_rate('100/d'), (100, 86400))
+
+    def test_unknown_period(self):
+        with self.assertRaises(KeyError):
+            ratelimit.parse_rate('10/w')
+
+
+class RetryAfterTests(SimpleTestCase):
+    def test_waits_for_previous_window_to_decay(self):
+        # 9 в текущем окне, 10 в предыдущем, прошло полокна: вес предыдущего должен упасть до 0
+        self.assertEqual(ratelimit._retry_after(10, 60, 10, 9, 30), 30)
+
+    def test_waits_for_next_window_when_current_is_full(self):
+        # Следующее окно: 10 * (1 - s / 60) + 1 <= 10 при s >= 6
+        self.assertEqual(ratelimit._retry_after(10, 60, 0, 10, 30), 36)
+
+    def test_at_least_one_second(self):
+        self.assertEqual(ratelimit._retry_after(10, 60, 10, 0, 59.9), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CheckTests(SimpleTestCase):
+    def setUp(self):
+        ratelimit.cache.clear()
+        self.now = 6000.0
+        patcher = mock.patch.object(ratelimit.time, 'time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check(self, ident='user:1'):
+        return ratelimit.check('test', ident, 3, 60)
+
+    def test_limit_within_window(self):
+        self.assertEqual([self.check() for _ in range(3)], [None, None, None])
+        self.assertIsNotNone(self.check())
+
+    def test_clients_counted_separately(self):
+        for _ in range(3):
+            self.check('user:1')
+        self.assertIsNone(self.check('user:2'))
+
+    def test_rejected_requests_not_counted(self):
+        for _ in range(3):
+            self.check()
+        first = self.check()
+        second = self.check()
+        self.assertEqual(first, second)
+
+    def test_previous_window_weighted(self):
+        for _ in range(3):
+            self.check()
+        # Начало следующего окна: предыдущее весит почти полностью
+        self.now += 60
+        self.assertIsNotNone(self.check())
+        # Через 2/3 окна вес 3 * 1/3 = 1 - есть место еще для двух запросов
+        self.now += 40
+        self.assertEqual([self.check(), self.check()], [None, None])
+        self.assertIsNotNone(self.check())
+
+    def test_window_expiry(self):
+        for _ in range(3):
+            self.check()
+        self.now += 120
+        self.assertEqual([self.check() for _ in range(3)], [None, None, None])
+
+    def test_retry_after_is_honest(self):
+        for _ in range(3):
+            self.check()
+        retry_after = self.check()
+        self.now += retry_after - 1
+        self.assertIsNotNone(self.check())
+        self.now += 1
+        self.assertIsNone(self.check())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RATE_LIMIT_ENABLED=True, RATE_LIMITS={'test': '1/m'})
+class RateLimitDecoratorTests(SimpleTestCase):
+    def setUp(self):
+        ratelimit.cache.clear()
+        self.factory = RequestFactory()
+        self.view = ratelimit.rate_limit('test')(lambda request: HttpResponse('ok'))
+
+    def request(self, method='post', ip='10.0.0.1'):
+        request = getattr(self.factory, method)('/', REMOTE_ADDR=ip)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_throttled_response(self):
+        self.assertEqual(self.request().status_code, 200)
+        response = self.request()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_other_methods_not_counted(self):
+        self.assertEqual(self.request().status_code, 200)
+        self.assertEqual(self.request('get').status_code, 200)
+
+    def test_keyed_by_ip_for_anonymous(self):
+        self.assertEqual(self.request(ip='10.0.0.1').status_code, 200)
+        self.assertEqual(self.request(ip='10.0.0.2').status_code, 200)
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.request().status_code, 200)
+        self.assertEqual(self.request().status_code, 200)
@@ -1,24 +1,42 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils import timezone
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from .models import Article, Recommendation, Statistic
 from .forms import ArticleForm
-from recipes.models import Hashtag, Recipe
-from django.db.models import Count, Q
+from .page_cache import anonymous_page_cache
+from .counters import article_views
+from .metrics import REGISTRY, SEARCHES
+from .tasks import refresh_site_statistics
+from recipes.models import Hashtag, Recipe, normalize_hashtag
+from django.db.models import Count, Q, F
 import json
 from datetime import datetime, timedelta
 
 
+@anonymous_page_cache('articles')
 def articles_list(request):
     articles = Article.objects.filter(is_published=True).order_by('-published_at')
     return render(request, 'others/articles_list.html', {'articles': articles})
 
 
 def article_detail(request, pk):
+    response = _render_article_detail(request, pk)
+    # Просмотр считаем и при отдаче из кэша страниц; в базу счетчик
+    # попадает пачкой через фоновую задачу, а не UPDATE на каждый просмотр
+    article_views.incr(pk)
+    return response
+
+
+@anonymous_page_cache('articles')
+def _render_article_detail(request, pk):
     article = get_object_or_404(Article, pk=pk, is_published=True)
-    # Увеличиваем счетчик просмотров
-    article.views_count += 1
-    article.save()
     return render(request, 'others/article_detail.html', {'article': article})
 
 
@@ -53,19 +71,25 @@ def edit_article(request, pk):
 
 
 @login_required
-def recommendations_list(request):
+async def recommendations_list(request):
     """Страница с рекомендациями для пользователя"""
-    # ... существующий код рекомендаций ...
-    recommendations = Recommendation.objects.get_recommendations_for_user(request.user)
+    user = await request.auser()
+    recommendations = await Recommendation.objects.aget_recommendations_for_user(user)
 
     if not recommendations:
+        favorite_recipe_ids = [
+            recipe_id async for recipe_id in user.favorite_set.values_list('recipe_id', flat=True)
+        ]
+        favorite_count, hashtag_count = await asyncio.gather(
+            user.favorite_set.acount(),
+            Hashtag.objects.filter(recipe__in=favorite_recipe_ids).distinct().acount(),
+        )
         context = {
             'recommendations': [],
             'message': 'Пока недостаточно данных для формирования рекомендаций. Добавьте рецепты в избранное!',
             'debug_info': {
-                'favorite_count': request.user.favorite_set.count(),
-                'hashtag_count': Hashtag.objects.filter(
-                    recipe__in=[fav.recipe for fav in request.user.favorite_set.all()]).distinct().count(),
+                'favorite_count': favorite_count,
+                'hashtag_count': hashtag_count,
             }
         }
     else:
@@ -75,7 +99,8 @@ def recommendations_list(request):
             'debug_info': None
         }
 
-    return render(request, 'others/recommendations_list.html', context)
+    # Шаблон может обращаться к ленивым связям, поэтому рендерим в потоке
+    return await sync_to_async(render)(request, 'others/recommendations_list.html', context)
 
 
 def get_quick_recommendations(user, limit=3):
@@ -105,14 +130,15 @@ def statistics_view(request):
     return render(request, 'others/statistics.html', context)
 
 
-def public_statistics_view(request):
+@anonymous_page_cache('recipes', 'hashtags')
+async def public_statistics_view(request):
     """Публичная страница статистики для всех пользователей"""
-    statistics = Statistic.objects.get_site_statistics()
+    statistics = await Statistic.objects.aget_site_statistics()
 
     context = {
         'statistics': statistics,
     }
-    return render(request, 'others/public_statistics.html', context)
+    return await sync_to_async(render)(request, 'others/public_statistics.html', context)
 
 
 def update_statistics(request):
@@ -121,11 +147,9 @@ def update_statistics(request):
         messages.error(request, 'У вас нет прав для выполнения этого действия.')
         return redirect('others:statistics')
 
-    try:
-        Statistic.update_site_statistics()
-        messages.success(request, 'Статистика успешно обновлена!')
-    except Exception as e:
-        messages.error(request, f'Ошибка при обновлении статистики: {str(e)}')
+    # Пересчет тяжелый - выполняет воркер, страница не ждет
+    refresh_site_statistics.enqueue(dedup_key='refresh_site_statistics', priority=10)
+    messages.success(request, 'Обновление статистики запущено, данные обновятся в течение минуты.')
 
     return redirect('others:statistics')
 
@@ -141,6 +165,7 @@ def search_recipes(request):
     search_results = []
 
     if query:
+        SEARCHES.inc(kind='text')
         # Сохраняем поисковый запрос
         SearchQuery.objects.create(
             query=query,
@@ -152,25 +177,27 @@ def search_recipes(request):
             Q(title__icontains=query) |
             Q(description__icontains=query) |
             Q(ingredients__name__icontains=query)
-        ).filter(is_published=True)
+        ).filter(is_published=True).sort_by(request.GET.get('sort'))
 
     elif hashtag_query:
+        SEARCHES.inc(kind='hashtag')
         # Обработка поиска по хештегам
-        hashtag_name = hashtag_query.lower().replace('#', '')
-
         try:
-            hashtag = Hashtag.objects.get(name=hashtag_name)
+            hashtag = Hashtag.objects.get(slug=normalize_hashtag(hashtag_query))
             # Обновляем статистику поиска по хештегу
             hashtag_search, created = HashtagSearch.objects.get_or_create(
                 hashtag=hashtag
             )
-            hashtag_search.search_count += 1
-            hashtag_search.save()
+            # Атомарный инкремент одним UPDATE в базе аналитики
+            HashtagSearch.objects.filter(pk=hashtag_search.pk).update(
+                search_count=F('search_count') + 1,
+                last_searched=timezone.now(),
+            )
 
             search_results = Recipe.objects.filter(
                 hashtags=hashtag,
                 is_published=True
-            )
+            ).sort_by(request.GET.get('sort'))
 
         except Hashtag.DoesNotExist:
             search_results = Recipe.objects.none()
@@ -181,4 +208,12 @@ def search_recipes(request):
         'hashtag_query': hashtag_query,
     }
 
-    return render(request, 'others/search_results.html', context)
\ No newline at end of file
+    return render(request, 'others/search_results.html', context)
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus (для сборщика с METRICS_ALLOWED_IPS или персонала)"""
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1'])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips and not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(REGISTRY.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Recipe, Ingredient, CookingStep, Hashtag, Favorite
+from django.utils import timezone
+
+from .models import (
+    Recipe, Ingredient, CookingStep, Hashtag, Favorite, NutritionFact, DuplicateCluster, DuplicateClusterMember,
+)
 
 class IngredientInline(admin.TabularInline):
     model = Ingredient
@@ -17,4 +21,54 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = [IngredientInline, CookingStepInline]
 
 admin.site.register(Hashtag)
-admin.site.register(Favorite)
\ No newline at end of file
+admin.site.register(Favorite)
+
+
+@admin.register(NutritionFact)
+class NutritionFactAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kcal', 'protein', 'fat', 'carbs', 'grams_per_piece']
+    search_fields = ['name']
+
+
+class DuplicateClusterMemberInline(admin.TabularInline):
+    model = DuplicateClusterMember
+    fields = ['recipe', 'recipe_author', 'recipe_created_at', 'text_similarity', 'photo_distance']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    @admin.display(description='Автор')
+    def recipe_author(self, member):
+        return member.recipe.author
+
+    @admin.display(description='Создан')
+    def recipe_created_at(self, member):
+        return member.recipe.created_at
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('recipe__author')
+
+
+@admin.register(DuplicateCluster)
+class DuplicateClusterAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'status', 'member_count', 'created_at', 'reviewed_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'reviewed_at']
+    inlines = [DuplicateClusterMemberInline]
+    actions = ['mark_confirmed', 'mark_dismissed']
+
+    @admin.display(description='Рецептов')
+    def member_count(self, cluster):
+        return cluster.members.count()
+
+    def _review(self, request, queryset, status):
+        updated = queryset.update(status=status, reviewed_at=timezone.now())
+        self.message_user(request, f"Отмечено групп: {updated}")
+
+    @admin.action(description='Отметить как дубликаты')
+    def mark_confirmed(self, request, queryset):
+        self._review(request, queryset, DuplicateCluster.STATUS_CONFIRMED)
+
+    @admin.action(description='Отметить как не дубликаты')
+    def mark_dismissed(self, request, queryset):
+        self._review(request, queryset, DuplicateCluster.STATUS_DISMISSED)
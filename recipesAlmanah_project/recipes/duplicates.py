@@ -0,0 +1,193 @@
+# recipes/duplicates.py
+"""Поиск повторно опубликованных рецептов (почти-дубликатов).
+
+Два признака:
+  * текст - шинглы из SHINGLE_SIZE слов названия, описания и шагов, сжатые
+    в MinHash-подпись (recipes.similarity); кандидаты - рецепты с общей
+    LSH-корзиной, дубликатом считается оценка сходства от TEXT_THRESHOLD;
+  * главное фото - 64-битный dHash; подпись режется на PHOTO_MAX_DISTANCE + 1
+    полос, поэтому хэши на расстоянии Хэмминга не больше PHOTO_MAX_DISTANCE
+    обязательно совпадают хотя бы в одной полосе.
+
+Пары объединяются в группы (система непересекающихся множеств) и пишутся в
+DuplicateCluster для проверки в админке. Группы, уже проверенные модератором,
+повторно не создаются.
+"""
+import hashlib
+import logging
+import re
+
+from django.db import transaction
+from PIL import Image
+
+from .models import CookingStep, DuplicateCluster, DuplicateClusterMember, Recipe
+from .similarity import buckets, minhash, similarity
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3
+TEXT_THRESHOLD = 0.8
+
+HASH_SIZE = 8
+PHOTO_MAX_DISTANCE = 4
+_PHOTO_BITS = HASH_SIZE * HASH_SIZE
+_PHOTO_MASK = (1 << _PHOTO_BITS) - 1
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def photo_hash(image):
+    """dHash: знаки разностей соседних пикселей уменьшенного серого изображения (знаковое 64-битное число)"""
+    small = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            value = (value << 1) | (left > pixels[row * (HASH_SIZE + 1) + col + 1])
+    # BigIntegerField знаковый
+    return value - (1 << _PHOTO_BITS) if value >= 1 << (_PHOTO_BITS - 1) else value
+
+
+def photo_distance(first, second):
+    return ((first ^ second) & _PHOTO_MASK).bit_count()
+
+
+def _photo_buckets(value):
+    value &= _PHOTO_MASK
+    bands = PHOTO_MAX_DISTANCE + 1
+    width = -(-_PHOTO_BITS // bands)
+    return [(band, (value >> (band * width)) & ((1 << width) - 1)) for band in range(bands)]
+
+
+def text_shingles(*texts):
+    words = _WORD_RE.findall(' '.join(texts).lower().replace('ё', 'е'))
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def fill_photo_hashes(batch_size=200):
+    """Посчитать хэши фото, которых еще нет (обычно их считает задача превью)"""
+    queryset = Recipe.objects.exclude(main_photo='').filter(main_photo_hash__isnull=True).only('id', 'main_photo')
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        hashed = []
+        for recipe in batch:
+            try:
+                with recipe.main_photo.open('rb') as source:
+                    recipe.main_photo_hash = photo_hash(Image.open(source))
+            except (OSError, ValueError):
+                logger.warning("Не удалось прочитать фото рецепта %s", recipe.pk)
+                continue
+            hashed.append(recipe)
+        Recipe.objects.bulk_update(hashed, ['main_photo_hash'])
+        last_id = batch[-1].id
+
+
+class _Groups:
+    """Система непересекающихся множеств по id рецептов"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first, second):
+        self.parent[self.find(first)] = self.find(second)
+
+    def groups(self):
+        result = {}
+        for item in self.parent:
+            result.setdefault(self.find(item), []).append(item)
+        return [sorted(group) for group in result.values() if len(group) > 1]
+
+
+def _signatures(batch_size):
+    """Текстовые подписи и хэши фото всего каталога (пачками по первичному ключу)"""
+    signatures, photos = {}, {}
+    last_id = 0
+    while True:
+        batch = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'title', 'description', 'main_photo', 'main_photo_hash')[:batch_size]
+        )
+        if not batch:
+            return signatures, photos
+        steps = {}
+        step_rows = CookingStep.objects.filter(recipe_id__in=[row[0] for row in batch]).order_by('step_number')
+        for recipe_id, description in step_rows.values_list('recipe_id', 'description'):
+            steps.setdefault(recipe_id, []).append(description)
+        for recipe_id, title, description, main_photo, main_photo_hash in batch:
+            shingles = text_shingles(title, description, *steps.get(recipe_id, ()))
+            if shingles:
+                signatures[recipe_id] = minhash(shingles)
+            if main_photo and main_photo_hash is not None:
+                photos[recipe_id] = main_photo_hash
+        last_id = batch[-1][0]
+
+
+def _candidate_pairs(keys_by_recipe):
+    """Пары рецептов с хотя бы одной общей корзиной"""
+    members = {}
+    for recipe_id, keys in keys_by_recipe.items():
+        for key in keys:
+            members.setdefault(key, []).append(recipe_id)
+    pairs = set()
+    for recipe_ids in members.values():
+        for i, first in enumerate(recipe_ids):
+            for second in recipe_ids[i + 1:]:
+                pairs.add((first, second))
+    return pairs
+
+
+def find_duplicates(batch_size=500):
+    """Пересобрать группы дубликатов. Возвращает (найдено групп, из них новых)"""
+    fill_photo_hashes()
+    signatures, photos = _signatures(batch_size)
+
+    groups = _Groups()
+    text_pairs = _candidate_pairs({recipe_id: buckets(sig) for recipe_id, sig in signatures.items()})
+    for first, second in text_pairs:
+        if similarity(signatures[first], signatures[second]) >= TEXT_THRESHOLD:
+            groups.union(first, second)
+    photo_pairs = _candidate_pairs({recipe_id: _photo_buckets(value) for recipe_id, value in photos.items()})
+    for first, second in photo_pairs:
+        if photo_distance(photos[first], photos[second]) <= PHOTO_MAX_DISTANCE:
+            groups.union(first, second)
+
+    found = groups.groups()
+    keys = {hashlib.sha1(','.join(map(str, group)).encode()).hexdigest(): group for group in found}
+    with transaction.atomic():
+        existing = set(
+            DuplicateCluster.objects.filter(members_key__in=list(keys)).values_list('members_key', flat=True)
+        )
+        # Непроверенные группы, которых больше нет (рецепт удален или исправлен), убираем
+        stale = DuplicateCluster.objects.filter(status=DuplicateCluster.STATUS_NEW).exclude(members_key__in=list(keys))
+        stale.delete()
+        created = DuplicateCluster.objects.bulk_create([
+            DuplicateCluster(members_key=key) for key in keys if key not in existing
+        ])
+        members = []
+        for cluster in DuplicateCluster.objects.filter(members_key__in=[cluster.members_key for cluster in created]):
+            group = keys[cluster.members_key]
+            origin = group[0]
+            for recipe_id in group:
+                text = photo = None
+                if recipe_id in signatures and origin in signatures:
+                    text = similarity(signatures[origin], signatures[recipe_id])
+                if recipe_id in photos and origin in photos:
+                    photo = photo_distance(photos[origin], photos[recipe_id])
+                members.append(DuplicateClusterMember(
+                    cluster=cluster, recipe_id=recipe_id, text_similarity=text, photo_distance=photo,
+                ))
+        DuplicateClusterMember.objects.bulk_create(members, batch_size=1000)
+    return len(found), len(created)
@@ -1,7 +1,7 @@
 # recipes/forms.py
 from django import forms
 from django.forms import inlineformset_factory
-from .models import Recipe, Ingredient, CookingStep, Hashtag
+from .models import HASHTAG_MAX_LENGTH, Recipe, Ingredient, CookingStep, Hashtag
 
 
 class RecipeForm(forms.ModelForm):
@@ -62,6 +62,10 @@ class RecipeForm(forms.ModelForm):
         for tag in hashtag_list:
             if not tag.startswith('#'):
                 tag = '#' + tag
+            if len(tag) - 1 > HASHTAG_MAX_LENGTH:
+                raise forms.ValidationError(
+                    f'Хештег {tag[:20]}... длиннее {HASHTAG_MAX_LENGTH} символов'
+                )
             cleaned_hashtags.append(tag)
 
         return ', '.join(cleaned_hashtags)
@@ -77,13 +81,8 @@ class RecipeForm(forms.ModelForm):
             if hashtags_text:
                 hashtag_list = [tag.strip() for tag in hashtags_text.split(',') if tag.strip()]
 
-                # Очищаем текущие хештеги
-                recipe.hashtags.clear()
-
-                # Добавляем новые хештеги
-                for tag_name in hashtag_list:
-                    hashtag, created = Hashtag.objects.get_or_create(name=tag_name)
-                    recipe.hashtags.add(hashtag)
+                # Все теги (и новые, и существующие) - одним запросом, '#Завтрак' и '#завтрак' - один тег
+                recipe.hashtags.set(set(Hashtag.objects.resolve(hashtag_list).values()))
 
         return recipe
 
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.similarity import index_recipes
+
+
+class Command(BaseCommand):
+    help = 'Перестроить индекс похожих рецептов (MinHash + LSH) для всего каталога'
+
+    def add_arguments(self, parser):
+        # Каждый рецепт дает BANDS корзин в одном запросе IN - пачки держим умеренными
+        parser.add_argument('--batch-size', type=int, default=200, help='Рецептов в одной транзакции')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        processed = 0
+        last_id = 0
+        while True:
+            batch = list(Recipe.objects.filter(id__gt=last_id).order_by('id')
+                         .values_list('id', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            index_recipes(batch)
+            processed += len(batch)
+            last_id = batch[-1]
+            self.stderr.write(f'\rОбработано: {processed}', ending='')
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов в индексе: {processed} за {elapsed:.2f}с '
+            f'({processed / elapsed if elapsed else 0:.0f} рецептов/с)'
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.nutrition import Catalogue, compute_nutrition, np
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать калорийность и БЖУ рецептов по каталогу продуктов (NutritionFact)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('recipe_ids', nargs='*', type=int, help='Только эти рецепты (по умолчанию все)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Рецептов в одной матрице и транзакции')
+
+    def handle(self, *args, **options):
+        catalogue = Catalogue.load()
+        if not len(catalogue):
+            self.stdout.write(self.style.WARNING('Каталог продуктов пуст - будет использована калорийность авторов'))
+
+        started = time.perf_counter()
+        processed = compute_nutrition(options['recipe_ids'] or None, options['batch_size'], catalogue)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов: {processed}, продуктов в каталоге: {len(catalogue)}, '
+            f'{"numpy" if np is not None else "без numpy"}: {elapsed:.2f}с '
+            f'({processed / elapsed if elapsed else 0:.0f} рецептов/с)'
+        ))
@@ -0,0 +1,75 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from recipes.models import Recipe
+
+
+def recipe_to_dict(recipe):
+    """Рецепт со всеми связями в виде словаря для одной строки NDJSON"""
+    return {
+        'id': recipe.id,
+        'title': recipe.title,
+        'description': recipe.description,
+        'author': recipe.author.username,
+        'cooking_time': recipe.cooking_time,
+        'servings': recipe.servings,
+        'calories_per_100g': recipe.calories_per_100g,
+        'difficulty': recipe.difficulty,
+        'created_at': recipe.created_at,
+        'updated_at': recipe.updated_at,
+        # Медиафайлы экспортируются ссылками (путь в хранилище), сами файлы переносятся отдельно
+        'main_photo': recipe.main_photo.name or None,
+        'video': recipe.video.name or None,
+        'hashtags': [hashtag.name for hashtag in recipe.hashtags.all()],
+        'ingredients': [
+            {'name': ingredient.name, 'quantity': ingredient.quantity}
+            for ingredient in recipe.ingredients.all()
+        ],
+        'cooking_steps': [
+            {'step_number': step.step_number, 'description': step.description, 'photo': step.photo.name or None}
+            for step in recipe.cooking_steps.all()
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Потоковый экспорт каталога рецептов в NDJSON (одна строка - один рецепт со связями)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help='Файл для записи ("-" - stdout)')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Сколько рецептов читать из базы за раз')
+
+    def handle(self, *args, **options):
+        # iterator() с chunk_size не держит весь каталог в памяти,
+        # prefetch_related выполняется отдельно для каждой пачки
+        recipes = (
+            Recipe.objects
+            .select_related('author')
+            .prefetch_related('hashtags', 'ingredients', 'cooking_steps')
+            .order_by('id')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+        started = time.perf_counter()
+        exported = 0
+        try:
+            for recipe in recipes:
+                output.write(json.dumps(recipe_to_dict(recipe), cls=DjangoJSONEncoder, ensure_ascii=False))
+                output.write('\n')
+                exported += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        elapsed = time.perf_counter() - started
+        # Отчет в stderr, чтобы не смешивать его с данными при выводе в stdout
+        self.stderr.write(self.style.SUCCESS(
+            f'Экспортировано рецептов: {exported} за {elapsed:.2f}с '
+            f'({exported / elapsed if elapsed else 0:.1f} рецептов/с)'
+        ))
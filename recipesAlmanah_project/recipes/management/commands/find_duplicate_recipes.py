@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.duplicates import find_duplicates
+from recipes.tasks import find_duplicate_recipes
+
+
+class Command(BaseCommand):
+    help = 'Найти почти-дубликаты рецептов (текст и главное фото) и записать группы для проверки в админке'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Рецептов в одной выборке')
+        parser.add_argument('--enqueue', action='store_true', help='Поставить задачу воркеру вместо запуска здесь')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            find_duplicate_recipes.enqueue(dedup_key='find_duplicate_recipes')
+            self.stdout.write(self.style.SUCCESS('Задача поставлена в очередь'))
+            return
+
+        started = time.perf_counter()
+        found, created = find_duplicates(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Групп дубликатов: {found}, новых для проверки: {created} за {time.perf_counter() - started:.2f}с'
+        ))
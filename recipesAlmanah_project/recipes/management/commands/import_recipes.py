@@ -0,0 +1,160 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from recipes.models import Recipe, Hashtag, Ingredient, CookingStep
+from recipes.nutrition import Catalogue, compute_batch, RECIPE_FIELDS
+from recipes.similarity import index_recipes
+from recipes.vocabulary import invalidate_vocabulary
+from others.page_cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = 'Импорт каталога рецептов из NDJSON (формат export_recipes) пачками через bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='NDJSON-файл, созданный export_recipes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Рецептов в одной транзакции')
+        parser.add_argument('--checkpoint', help='Файл контрольной точки (по умолчанию <input>.checkpoint)')
+        parser.add_argument('--restart', action='store_true',
+                            help='Игнорировать контрольную точку и начать с начала файла')
+        parser.add_argument('--default-author',
+                            help='Пользователь для рецептов, чей автор не найден в базе (иначе рецепт пропускается)')
+
+    def handle(self, *args, **options):
+        checkpoint_path = options['checkpoint'] or options['input'] + '.checkpoint'
+        done_lines = 0 if options['restart'] else self._read_checkpoint(checkpoint_path)
+
+        default_author = None
+        if options['default_author']:
+            default_author = User.objects.filter(username=options['default_author']).first()
+            if default_author is None:
+                raise CommandError(f'Пользователь "{options["default_author"]}" не найден')
+
+        # Каталог продуктов загружается один раз на весь импорт
+        self.catalogue = Catalogue.load()
+
+        started = time.perf_counter()
+        imported = skipped = 0
+        with open(options['input'], encoding='utf-8') as source:
+            # Уже импортированные строки пропускаем, не разбирая JSON
+            lines = islice(source, done_lines, None)
+            if done_lines:
+                self.stdout.write(f'Продолжаем с контрольной точки: строка {done_lines + 1}')
+
+            while True:
+                batch = list(islice(lines, options['batch_size']))
+                if not batch:
+                    break
+                try:
+                    records = [json.loads(line) for line in batch if line.strip()]
+                except json.JSONDecodeError as e:
+                    raise CommandError(f'Некорректная строка NDJSON после строки {done_lines}: {e}')
+
+                with transaction.atomic():
+                    created, missing = self._import_batch(records, default_author)
+                # bulk_create не вызывает сигналы: словарь хештегов (счетчики использования)
+                # и кэш страниц сбрасываем сами, после коммита пачки
+                invalidate_vocabulary()
+                invalidate_tags('recipes', 'hashtags')
+                done_lines += len(batch)
+                # Контрольная точка пишется после коммита пачки
+                self._write_checkpoint(checkpoint_path, done_lines)
+
+                imported += created
+                skipped += missing
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'  строк: {done_lines}, импортировано: {imported} '
+                                  f'({imported / elapsed if elapsed else 0:.1f} рецептов/с)')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано рецептов: {imported}, пропущено: {skipped} за {elapsed:.2f}с '
+            f'({imported / elapsed if elapsed else 0:.1f} рецептов/с)'
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                'Часть рецептов пропущена: автор не найден (используйте --default-author)'
+            ))
+        # Файл полностью импортирован - контрольная точка больше не нужна
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    def _import_batch(self, records, default_author):
+        """Одна пачка: авторы и хештеги разрешаются одним запросом на пачку"""
+        usernames = {record['author'] for record in records}
+        authors = {user.username: user for user in User.objects.filter(username__in=usernames)}
+
+        hashtag_names = {name for record in records for name in record.get('hashtags', [])}
+        hashtags = Hashtag.objects.resolve(hashtag_names)
+
+        recipes, kept = [], []
+        for record in records:
+            author = authors.get(record['author'], default_author)
+            if author is None:
+                continue
+            recipes.append(Recipe(
+                title=record['title'],
+                description=record['description'],
+                author=author,
+                cooking_time=record['cooking_time'],
+                servings=record['servings'],
+                calories_per_100g=record['calories_per_100g'],
+                difficulty=record['difficulty'],
+                main_photo=record.get('main_photo') or '',
+                video=record.get('video'),
+            ))
+            kept.append(record)
+
+        # SQLite и PostgreSQL возвращают id после bulk_create
+        Recipe.objects.bulk_create(recipes)
+
+        # auto_now/auto_now_add перезаписали даты при вставке - возвращаем исходные
+        for recipe, record in zip(recipes, kept):
+            recipe.created_at = parse_datetime(record['created_at'])
+            recipe.updated_at = parse_datetime(record['updated_at'])
+        Recipe.objects.bulk_update(recipes, ['created_at', 'updated_at'])
+
+        ingredients, steps, links = [], [], []
+        Through = Recipe.hashtags.through
+        for recipe, record in zip(recipes, kept):
+            for item in record.get('ingredients', []):
+                ingredient = Ingredient(recipe=recipe, name=item['name'], quantity=item['quantity'])
+                # bulk_create не вызывает save() - разбираем количество сами
+                ingredient.parse_quantity()
+                ingredients.append(ingredient)
+            for item in record.get('cooking_steps', []):
+                steps.append(CookingStep(recipe=recipe, step_number=item['step_number'],
+                                         description=item['description'], photo=item.get('photo')))
+            for hashtag_id in {hashtags[name] for name in record.get('hashtags', []) if name in hashtags}:
+                links.append(Through(recipe_id=recipe.id, hashtag_id=hashtag_id))
+        Ingredient.objects.bulk_create(ingredients)
+        CookingStep.objects.bulk_create(steps)
+        Through.objects.bulk_create(links)
+
+        # КБЖУ пачки - одним матричным расчетом по только что созданным ингредиентам
+        compute_batch(recipes, self.catalogue)
+        Recipe.objects.bulk_update(recipes, RECIPE_FIELDS)
+        # bulk_create не вызывает сигналы - индекс похожих рецептов обновляем сами
+        index_recipes([recipe.id for recipe in recipes])
+
+        return len(recipes), len(records) - len(recipes)
+
+    def _read_checkpoint(self, path):
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+
+    def _write_checkpoint(self, path, lines):
+        # Запись через временный файл, чтобы не оставить обрезанную контрольную точку
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(lines))
+        os.replace(tmp_path, path)
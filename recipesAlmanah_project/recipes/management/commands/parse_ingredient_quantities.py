@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Заполнить amount/unit/note ингредиентов из текстового quantity (пачками по первичному ключу)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Строк в одной транзакции')
+        parser.add_argument('--missing', action='store_true',
+                            help='Только строки, которые еще не разбирались (amount, unit и note пустые)')
+
+    def handle(self, *args, **options):
+        queryset = Ingredient.objects.only('id', 'quantity', 'amount', 'unit', 'note').order_by('id')
+        if options['missing']:
+            queryset = queryset.filter(amount__isnull=True, unit='', note='')
+
+        started = time.perf_counter()
+        processed = parsed = 0
+        last_id = 0
+        while True:
+            # Пагинация по ключу: каждая пачка - индексный диапазон, без OFFSET
+            batch = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            for ingredient in batch:
+                ingredient.parse_quantity()
+                parsed += ingredient.amount is not None
+            with transaction.atomic():
+                Ingredient.objects.bulk_update(batch, ['amount', 'unit', 'note'])
+            processed += len(batch)
+            last_id = batch[-1].id
+            self.stderr.write(f'\rОбработано: {processed}', ending='')
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиентов: {processed}, с числовым количеством: {parsed} '
+            f'({processed / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
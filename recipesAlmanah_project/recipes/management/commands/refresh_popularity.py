@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import TRENDING_REFRESH_INTERVAL, recount_favorites, refresh_trending_scores
+from jobs.registry import schedule_periodic
+from recipes.tasks import refresh_trending_scores as refresh_task
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать популярность рецептов (избранное и тренд) и запустить периодический пересчет тренда'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help='Также сверить favorites_count с таблицей избранного')
+        parser.add_argument('--no-schedule', action='store_true',
+                            help='Не ставить следующий пересчет воркеру (его поставит и сам run_worker)')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f'Рецептов со сверенным счетчиком избранного: {recount_favorites()}')
+        trending = refresh_trending_scores()
+        self.stdout.write(self.style.SUCCESS(f'Рецептов с ненулевым трендом: {trending}'))
+        if not options['no_schedule']:
+            schedule_periodic(refresh_task.task_name, delay=TRENDING_REFRESH_INTERVAL)
+            self.stdout.write('Периодический пересчет тренда поставлен в очередь')
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Триграммные GIN-индексы только для PostgreSQL: icontains там выполняется как
+# UPPER(col) LIKE UPPER(%s), поэтому индексируем именно UPPER(col)
+TRIGRAM_INDEXES = [
+    ('recipe_title_trgm_idx', 'recipes_recipe', 'title'),
+    ('ingredient_name_trgm_idx', 'recipes_ingredient', 'name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '002_dd_default_hashtags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-created_at', 'id'], name='recipe_created_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', 'created_at'], name='recipe_author_created_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='main_photo_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='recipes/thumbnails/'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+from django.db import connections, migrations, models, router
+
+
+def normalize_hashtag(name):
+    # Копия recipes.models.normalize_hashtag на момент миграции
+    return '_'.join(name.strip().lstrip('#').casefold().split())
+
+
+# (приложение, модель, поле) - все связи многие-ко-многим с хештегами
+HASHTAG_M2M = [
+    ('recipes', 'Recipe', 'hashtags'),
+    ('others', 'Article', 'hashtags'),
+    ('comments', 'CommentArticle', 'hashtags'),
+]
+
+
+def merge_duplicate_hashtags(apps, schema_editor):
+    """Заполнить slug и слить хештеги, отличающиеся только регистром или '#'.
+
+    Остается хештег с наименьшим id, связи дубликатов переносятся на него
+    массовыми запросами, статистика поиска суммируется.
+    """
+    db = schema_editor.connection.alias
+    Hashtag = apps.get_model('recipes', 'Hashtag')
+
+    canonical = {}
+    duplicates = {}
+    hashtags = list(Hashtag.objects.using(db).order_by('id'))
+    for hashtag in hashtags:
+        hashtag.slug = normalize_hashtag(hashtag.name)
+        if hashtag.slug in canonical:
+            duplicates[hashtag.id] = canonical[hashtag.slug]
+        else:
+            canonical[hashtag.slug] = hashtag.id
+
+    if duplicates:
+        for app_label, model_name, field_name in HASHTAG_M2M:
+            through = apps.get_model(app_label, model_name)._meta.get_field(field_name).remote_field.through
+            owner = next(f.attname for f in through._meta.fields if f.name not in ('id', 'hashtag'))
+            rows = through.objects.using(db).filter(hashtag_id__in=duplicates).values_list(owner, 'hashtag_id')
+            # Объект мог быть связан и с дубликатом, и с основным тегом - такие строки пропускаются
+            through.objects.using(db).bulk_create(
+                [through(**{owner: owner_id, 'hashtag_id': duplicates[hashtag_id]}) for owner_id, hashtag_id in rows],
+                ignore_conflicts=True,
+                batch_size=1000,
+            )
+            through.objects.using(db).filter(hashtag_id__in=duplicates).delete()
+
+        _merge_search_stats(apps, db, duplicates)
+        Hashtag.objects.using(db).filter(id__in=duplicates).delete()
+
+    Hashtag.objects.using(db).bulk_update(
+        [hashtag for hashtag in hashtags if hashtag.id not in duplicates], ['slug'], batch_size=1000,
+    )
+
+
+def _merge_search_stats(apps, db, duplicates):
+    """Статистика поиска может жить в базе аналитики (others.routers.AnalyticsRouter)"""
+    HashtagSearch = apps.get_model('others', 'HashtagSearch')
+    stats_db = router.db_for_write(HashtagSearch) or db
+    if HashtagSearch._meta.db_table not in connections[stats_db].introspection.table_names():
+        return
+
+    stats = HashtagSearch.objects.using(stats_db)
+    totals = {}
+    for hashtag_id, search_count in stats.filter(hashtag_id__in=duplicates).values_list('hashtag_id', 'search_count'):
+        target = duplicates[hashtag_id]
+        totals[target] = totals.get(target, 0) + search_count
+    existing = {row.hashtag_id: row for row in stats.filter(hashtag_id__in=totals)}
+    for hashtag_id, search_count in totals.items():
+        if hashtag_id in existing:
+            existing[hashtag_id].search_count += search_count
+        else:
+            existing[hashtag_id] = HashtagSearch(hashtag_id=hashtag_id, search_count=search_count)
+    stats.filter(hashtag_id__in=duplicates).delete()
+    for row in existing.values():
+        row.save(using=stats_db)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_main_photo_thumbnail'),
+        ('others', '0006_analytics_cross_db_relations'),
+        ('comments', '0005_comment_recipe_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hashtag',
+            name='slug',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_hashtags, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='hashtag',
+            name='slug',
+            field=models.CharField(editable=False, max_length=50, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_hashtag_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='amount',
+            field=models.DecimalField(blank=True, decimal_places=3, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='note',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='unit',
+            field=models.CharField(blank=True, choices=[('g', 'г'), ('ml', 'мл'), ('pcs', 'шт'), ('tbsp', 'ст. л.'), ('tsp', 'ч. л.'), ('cup', 'стакан'), ('pinch', 'щепотка'), ('clove', 'зубчик'), ('bunch', 'пучок'), ('pack', 'уп.'), ('slice', 'ломтик'), ('can', 'банка')], editable=False, max_length=10),
+        ),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+# Базовый каталог: название -> (ккал, белки, жиры, углеводы на 100 г, вес штуки в г)
+CATALOGUE = {
+    'мука': (342, 10.3, 1.1, 69.9, None),
+    'мука пшеничная': (342, 10.3, 1.1, 69.9, None),
+    'сахар': (398, 0, 0, 99.7, None),
+    'соль': (0, 0, 0, 0, None),
+    'яйцо': (157, 12.7, 11.5, 0.7, 55),
+    'яйца': (157, 12.7, 11.5, 0.7, 55),
+    'молоко': (60, 3.2, 3.2, 4.7, None),
+    'кефир': (51, 2.8, 2.5, 4.0, None),
+    'сметана': (206, 2.8, 20.0, 3.2, None),
+    'сливки': (205, 2.5, 20.0, 3.4, None),
+    'творог': (156, 18.0, 9.0, 2.0, None),
+    'сыр': (364, 24.0, 29.5, 0.3, None),
+    'масло сливочное': (748, 0.5, 82.5, 0.8, None),
+    'масло растительное': (899, 0, 99.9, 0, None),
+    'масло подсолнечное': (899, 0, 99.9, 0, None),
+    'масло оливковое': (898, 0, 99.8, 0, None),
+    'рис': (344, 6.7, 0.7, 78.9, None),
+    'гречка': (313, 12.6, 3.3, 62.1, None),
+    'крупа гречневая': (313, 12.6, 3.3, 62.1, None),
+    'овсяные хлопья': (352, 12.3, 6.2, 61.8, None),
+    'макароны': (337, 10.4, 1.1, 69.7, None),
+    'картофель': (77, 2.0, 0.4, 16.3, 100),
+    'морковь': (35, 1.3, 0.1, 6.9, 80),
+    'лук': (41, 1.4, 0, 8.2, 80),
+    'лук репчатый': (41, 1.4, 0, 8.2, 80),
+    'чеснок': (143, 6.5, 0.5, 29.9, None),
+    'капуста': (27, 1.8, 0.1, 4.7, None),
+    'свекла': (40, 1.5, 0.1, 8.8, 200),
+    'помидор': (20, 0.6, 0.2, 4.2, 120),
+    'помидоры': (20, 0.6, 0.2, 4.2, 120),
+    'огурец': (14, 0.8, 0.1, 2.5, 100),
+    'огурцы': (14, 0.8, 0.1, 2.5, 100),
+    'перец болгарский': (26, 1.3, 0, 5.3, 150),
+    'яблоко': (47, 0.4, 0.4, 9.8, 150),
+    'яблоки': (47, 0.4, 0.4, 9.8, 150),
+    'банан': (96, 1.5, 0.2, 21.8, 120),
+    'бананы': (96, 1.5, 0.2, 21.8, 120),
+    'лимон': (34, 0.9, 0.1, 3.0, 100),
+    'куриное филе': (113, 23.6, 1.9, 0.4, None),
+    'курица': (190, 16.0, 14.0, 0, None),
+    'говядина': (187, 18.9, 12.4, 0, None),
+    'свинина': (259, 16.0, 21.6, 0, None),
+    'фарш': (254, 17.0, 20.0, 0, None),
+    'рыба': (100, 18.0, 3.0, 0, None),
+    'мед': (329, 0.8, 0, 80.3, None),
+    'вода': (0, 0, 0, 0, None),
+}
+
+
+def seed_catalogue(apps, schema_editor):
+    db = schema_editor.connection.alias
+    NutritionFact = apps.get_model('recipes', 'NutritionFact')
+    NutritionFact.objects.using(db).bulk_create([
+        NutritionFact(name=name, kcal=kcal, protein=protein, fat=fat, carbs=carbs, grams_per_piece=piece)
+        for name, (kcal, protein, fat, carbs, piece) in CATALOGUE.items()
+    ], ignore_conflicts=True)
+
+
+def copy_author_calories(apps, schema_editor):
+    """До первого пересчета (manage.py compute_nutrition) фильтры работают по калорийности авторов"""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.using(schema_editor.connection.alias).update(kcal_per_100g=F('calories_per_100g'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_ingredient_structured_quantity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NutritionFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('kcal', models.DecimalField(decimal_places=1, max_digits=6)),
+                ('protein', models.DecimalField(decimal_places=1, max_digits=6)),
+                ('fat', models.DecimalField(decimal_places=1, max_digits=6)),
+                ('carbs', models.DecimalField(decimal_places=1, max_digits=6)),
+                ('grams_per_piece', models.DecimalField(blank=True, decimal_places=1, help_text='Вес одной штуки в граммах (для количеств в шт)', max_digits=7, null=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='carbs_per_100g',
+            field=models.DecimalField(blank=True, decimal_places=1, editable=False, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='fat_per_100g',
+            field=models.DecimalField(blank=True, decimal_places=1, editable=False, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='kcal_per_100g',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='kcal_per_serving',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='protein_per_100g',
+            field=models.DecimalField(blank=True, decimal_places=1, editable=False, max_digits=6, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['kcal_per_100g'], name='recipe_kcal_100g_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['kcal_per_serving'], name='recipe_kcal_serving_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['protein_per_100g'], name='recipe_protein_100g_idx'),
+        ),
+        migrations.RunPython(seed_catalogue, migrations.RunPython.noop),
+        migrations.RunPython(copy_author_calories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_similarity_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('new', 'Ожидает проверки'), ('confirmed', 'Дубликаты'), ('dismissed', 'Не дубликаты')], db_index=True, default='new', max_length=10)),
+                ('members_key', models.CharField(editable=False, max_length=40, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='main_photo_hash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='DuplicateClusterMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text_similarity', models.FloatField(blank=True, null=True)),
+                ('photo_distance', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('cluster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='recipes.duplicatecluster')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe')),
+            ],
+            options={
+                'ordering': ['recipe_id'],
+                'constraints': [models.UniqueConstraint(fields=('cluster', 'recipe'), name='duplicate_member_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:56
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    """Начальное значение favorites_count; тренд считает manage.py refresh_popularity"""
+    db = schema_editor.connection.alias
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    counts = Favorite.objects.using(db).filter(recipe=OuterRef('pk')).values('recipe').annotate(
+        total=Count('id')
+    ).values('total')
+    Recipe.objects.using(db).update(favorites_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_duplicate_clusters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_kcal_100g_idx',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['added_at'], name='favorite_added_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-created_at'], name='recipe_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-created_at'], name='recipe_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', '-created_at'], name='recipe_fastest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['kcal_per_100g', '-created_at'], name='recipe_kcal_100g_idx'),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+    ]
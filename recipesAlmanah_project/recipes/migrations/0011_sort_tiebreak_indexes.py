@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_popularity_sorts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_popular_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_trending_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_fastest_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_kcal_100g_idx',
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-created_at', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-created_at', '-id'], name='recipe_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', '-created_at', '-id'], name='recipe_fastest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['kcal_per_100g', '-created_at', '-id'], name='recipe_kcal_100g_idx'),
+        ),
+    ]
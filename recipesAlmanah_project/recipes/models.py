@@ -1,15 +1,163 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.urls import reverse
 
+from .quantities import UNIT_CHOICES, format_quantity, normalize_ingredient_name, parse_quantity
+
+
+# Длина хештега без '#': вместе с ним имя укладывается в Hashtag.name (max_length=50)
+HASHTAG_MAX_LENGTH = 49
+
+
+def normalize_hashtag(name):
+    """Каноническое имя хештега: без '#', в нижнем регистре, пробелы заменены на '_',
+    не длиннее HASHTAG_MAX_LENGTH"""
+    return '_'.join(name.strip().lstrip('#').casefold().split())[:HASHTAG_MAX_LENGTH]
+
+
+class HashtagManager(models.Manager):
+    def resolve(self, names, create=True):
+        """Сопоставить строкам ('#Завтрак', 'завтрак ') id хештегов одним запросом.
+
+        Возвращает словарь "строка -> id"; строки с одинаковым каноническим
+        именем получают один id. Недостающие хештеги создаются (create=True),
+        пустые строки пропускаются.
+        """
+        slugs = {name: normalize_hashtag(name) for name in names}
+        slugs = {name: slug for name, slug in slugs.items() if slug}
+        if not slugs:
+            return {}
+        ids = dict(self.filter(slug__in=set(slugs.values())).values_list('slug', 'id'))
+
+        missing = {}
+        for name, slug in slugs.items():
+            if slug not in ids:
+                missing.setdefault(slug, name)
+        if missing and create:
+            # bulk_create не отправляет сигналы: кэши сбрасывает вызывающий код (recipe.hashtags.set()
+            # через m2m_changed или import_recipes после каждой пачки)
+            # ignore_conflicts - на случай параллельного создания того же хештега
+            self.bulk_create(
+                [Hashtag(name='#' + '_'.join(name.strip().lstrip('#').split())[:HASHTAG_MAX_LENGTH], slug=slug)
+                 for slug, name in missing.items()],
+                ignore_conflicts=True,
+            )
+            ids.update(self.filter(slug__in=missing).values_list('slug', 'id'))
+        return {name: ids[slug] for name, slug in slugs.items() if slug in ids}
+
 
 #Описание хештегов
 class Hashtag(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    # Каноническое имя (normalize_hashtag) - по нему ищутся и не дублируются теги
+    slug = models.CharField(max_length=50, unique=True, editable=False)
+
+    objects = HashtagManager()
+
+    def clean(self):
+        self.slug = normalize_hashtag(self.name)
+        if Hashtag.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': 'Такой хештег уже есть (без учета регистра и #)'})
+
+    def save(self, *args, **kwargs):
+        self.slug = normalize_hashtag(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
+# GET-параметр -> условие на рассчитанную пищевую ценность (recipes.nutrition)
+NUTRITION_FILTERS = {
+    'max_calories': ('kcal_per_100g__lte', int),
+    'max_calories_per_serving': ('kcal_per_serving__lte', int),
+    'min_protein': ('protein_per_100g__gte', Decimal),
+    'max_fat': ('fat_per_100g__lte', Decimal),
+    'max_carbs': ('carbs_per_100g__lte', Decimal),
+}
+# Верхняя граница значений фильтров (больше не бывает и не влезает в колонки)
+NUTRITION_FILTER_MAX = 100000
+
+
+def parse_nutrition_filter(param, value):
+    """Значение фильтра NUTRITION_FILTERS из строки, ValueError при неверном"""
+    _, convert = NUTRITION_FILTERS[param]
+    try:
+        parsed = convert(value.strip())
+    except (ValueError, ArithmeticError):
+        raise ValueError(f"Неверное значение {param}: {value}")
+    if isinstance(parsed, Decimal) and not parsed.is_finite():
+        raise ValueError(f"Неверное значение {param}: {value}")
+    if not 0 <= parsed <= NUTRITION_FILTER_MAX:
+        raise ValueError(f"Значение {param} должно быть от 0 до {NUTRITION_FILTER_MAX}")
+    return parsed
+
+
+# GET-параметр sort -> порядок ленты; у каждого порядка есть индекс в Recipe.Meta.
+# id в конце делает порядок однозначным: иначе при OFFSET-пагинации равные значения
+# могут повториться или пропасть между страницами
+SORT_ORDERS = {
+    'new': ('-created_at', '-id'),
+    'popular': ('-favorites_count', '-created_at', '-id'),
+    'trending': ('-trending_score', '-created_at', '-id'),
+    'fastest': ('cooking_time', '-created_at', '-id'),
+    'lowest_calories': ('kcal_per_100g', '-created_at', '-id'),
+}
+SORT_CHOICES = [
+    ('new', 'Новые'),
+    ('popular', 'Популярные'),
+    ('trending', 'В тренде'),
+    ('fastest', 'Быстрые'),
+    ('lowest_calories', 'Наименее калорийные'),
+]
+DEFAULT_SORT = 'new'
+
+
+class RecipeQuerySet(models.QuerySet):
+    def filter_by_params(self, params, strict=False):
+        """Фильтры ленты и поиска из GET-параметров: q, hashtags (несколько), NUTRITION_FILTERS
+
+        Неверное значение фильтра пропускается, а при strict=True - ValueError (API отдает 400).
+        """
+        queryset = self
+
+        # Поиск по ключевым словам
+        query = params.get('q')
+        if query:
+            queryset = queryset.filter(
+                Q(title__icontains=query) |
+                Q(description__icontains=query) |
+                Q(ingredients__name__icontains=query)
+            ).distinct()
+
+        # Фильтрация по нескольким хештегам
+        selected_hashtags = params.getlist('hashtags')
+        if selected_hashtags:
+            for hashtag in selected_hashtags:
+                queryset = queryset.filter(hashtags__slug=normalize_hashtag(hashtag))
+            queryset = queryset.distinct()
+
+        # Фильтрация по калорийности и БЖУ - по рассчитанным индексированным колонкам
+        for param, (lookup, _) in NUTRITION_FILTERS.items():
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: parse_nutrition_filter(param, value)})
+            except ValueError:
+                if strict:
+                    raise
+
+        return queryset
+
+    def sort_by(self, sort):
+        """Порядок из SORT_ORDERS (неизвестное значение - новые сверху)"""
+        return self.order_by(*SORT_ORDERS.get(sort) or SORT_ORDERS[DEFAULT_SORT])
+
+
 #Описание рецептов
 class Recipe(models.Model):
     #Поле "сложность" со сразу готовыми вариантами
@@ -29,8 +177,48 @@ class Recipe(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     main_photo = models.ImageField(upload_to='recipes/main_photos/')
+    # Уменьшенная копия для ленты, создается фоновой задачей make_recipe_thumbnail
+    main_photo_thumbnail = models.ImageField(upload_to='recipes/thumbnails/', blank=True, null=True, editable=False)
     video = models.FileField(upload_to='recipes/videos/', null=True, blank=True)
     hashtags = models.ManyToManyField(Hashtag, blank=True)
+    # Пищевая ценность, рассчитанная по ингредиентам (recipes.nutrition). Пока ингредиенты
+    # не распознаны, kcal_per_100g берется из calories_per_100g, указанного автором
+    kcal_per_100g = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    protein_per_100g = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True, editable=False)
+    fat_per_100g = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True, editable=False)
+    carbs_per_100g = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True, editable=False)
+    kcal_per_serving = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Перцептивный хэш главного фото (recipes.duplicates.photo_hash), считается вместе с превью
+    main_photo_hash = models.BigIntegerField(null=True, blank=True, editable=False)
+    # Денормализованная популярность для сортировок ленты (recipes.popularity):
+    # число добавлений в избранное и их сумма с затуханием по времени
+    favorites_count = models.PositiveIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Лента: ORDER BY created_at DESC с пагинацией
+            models.Index(fields=['-created_at', 'id'], name='recipe_created_desc_idx'),
+            # Рецепты автора в профиле и статистике
+            models.Index(fields=['author', 'created_at'], name='recipe_author_created_idx'),
+            # Сортировки ленты (SORT_ORDERS): ORDER BY ... LIMIT идет по индексу без сортировки таблицы
+            models.Index(fields=['-favorites_count', '-created_at', '-id'], name='recipe_popular_idx'),
+            models.Index(fields=['-trending_score', '-created_at', '-id'], name='recipe_trending_idx'),
+            models.Index(fields=['cooking_time', '-created_at', '-id'], name='recipe_fastest_idx'),
+            # Сортировка и фильтр по калорийности, фильтр по белкам - по индексу
+            models.Index(fields=['kcal_per_100g', '-created_at', '-id'], name='recipe_kcal_100g_idx'),
+            models.Index(fields=['kcal_per_serving'], name='recipe_kcal_serving_idx'),
+            models.Index(fields=['protein_per_100g'], name='recipe_protein_100g_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Пока по каталогу ничего не рассчитано (макронутриентов нет, см. apply_nutrition),
+        # kcal_per_100g следует за calories_per_100g автора, в том числе при его правке
+        if self.protein_per_100g is None:
+            self.kcal_per_100g = self.calories_per_100g
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -38,9 +226,14 @@ class Recipe(models.Model):
     def get_absolute_url(self):
         return reverse('recipe-detail', kwargs={'pk': self.pk})
 
+    def scaled_ingredients(self, servings):
+        """Ингредиенты, пересчитанные на servings порций: [(ингредиент, количество для показа)]"""
+        factor = Decimal(servings) / Decimal(self.servings or 1)
+        return [(ingredient, ingredient.scaled_quantity(factor)) for ingredient in self.ingredients.all()]
+
     @property
     def favorite_count(self):
-        return self.favorite_set.count()
+        return self.favorites_count
 
     def is_favorite_for_user(self, user):
         if not user.is_authenticated:
@@ -52,10 +245,50 @@ class Ingredient(models.Model):
     recipe = models.ForeignKey(Recipe, related_name='ingredients', on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     quantity = models.CharField(max_length=50)  # Например: "2 шт", "100 г", "по вкусу"
+    # Разобранное quantity (recipes.quantities): количество в базовой единице, единица, остаток текста
+    amount = models.DecimalField(max_digits=12, decimal_places=3, null=True, blank=True, editable=False)
+    unit = models.CharField(max_length=10, choices=UNIT_CHOICES, blank=True, editable=False)
+    note = models.CharField(max_length=50, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.name} - {self.quantity}"
 
+    def parse_quantity(self):
+        """Заполнить amount, unit и note из quantity"""
+        self.amount, self.unit, self.note = parse_quantity(self.quantity)
+        self.note = self.note[:50]
+
+    def save(self, *args, **kwargs):
+        self.parse_quantity()
+        super().save(*args, **kwargs)
+
+    def scaled_quantity(self, factor):
+        """Количество, умноженное на factor, для показа (без разбора строки)"""
+        if self.amount is None or factor == 1:
+            return self.quantity
+        return format_quantity(self.amount * factor, self.unit, self.note)
+
+#Пищевая ценность продукта из каталога (на 100 г)
+class NutritionFact(models.Model):
+    # Нормализованное название (normalize_ingredient_name), например "мука пшеничная"
+    name = models.CharField(max_length=100, unique=True)
+    kcal = models.DecimalField(max_digits=6, decimal_places=1)
+    protein = models.DecimalField(max_digits=6, decimal_places=1)
+    fat = models.DecimalField(max_digits=6, decimal_places=1)
+    carbs = models.DecimalField(max_digits=6, decimal_places=1)
+    grams_per_piece = models.DecimalField(max_digits=7, decimal_places=1, null=True, blank=True,
+                                          help_text="Вес одной штуки в граммах (для количеств в шт)")
+
+    class Meta:
+        ordering = ['name']
+
+    def save(self, *args, **kwargs):
+        self.name = normalize_ingredient_name(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
 #Описание шагов готовки
 class CookingStep(models.Model):
     recipe = models.ForeignKey(Recipe, related_name='cooking_steps', on_delete=models.CASCADE)
@@ -78,7 +311,79 @@ class Favorite(models.Model):
 
     class Meta:
         unique_together = ('user', 'recipe')
+        indexes = [
+            # Окно свежих добавлений для пересчета тренда (recipes.popularity)
+            models.Index(fields=['added_at'], name='favorite_added_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.recipe.title}"
 
+
+#MinHash-подпись рецепта по ингредиентам и хештегам (recipes.similarity)
+class RecipeSignature(models.Model):
+    recipe = models.OneToOneField(Recipe, primary_key=True, related_name='signature', on_delete=models.CASCADE)
+    minhash = models.BinaryField()
+
+#LSH-корзина рецепта: рецепты с общей корзиной - кандидаты в похожие
+class RecipeBucket(models.Model):
+    recipe = models.ForeignKey(Recipe, related_name='buckets', on_delete=models.CASCADE)
+    bucket = models.BigIntegerField(db_index=True)
+
+#Предрассчитанные похожие рецепты для блока "Похожие рецепты"
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(Recipe, related_name='similar_links', on_delete=models.CASCADE)
+    similar = models.ForeignKey(Recipe, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'similar'], name='similar_recipe_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['recipe', '-score'], name='similar_recipe_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} ~ {self.similar_id} ({self.score:.2f})"
+
+#Группа возможных дубликатов рецепта для проверки модератором (recipes.duplicates)
+class DuplicateCluster(models.Model):
+    STATUS_NEW = 'new'
+    STATUS_CONFIRMED = 'confirmed'
+    STATUS_DISMISSED = 'dismissed'
+    STATUS_CHOICES = [
+        (STATUS_NEW, 'Ожидает проверки'),
+        (STATUS_CONFIRMED, 'Дубликаты'),
+        (STATUS_DISMISSED, 'Не дубликаты'),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_NEW, db_index=True)
+    # sha1 отсортированных id рецептов: повторный запуск не создает уже проверенную группу заново
+    members_key = models.CharField(max_length=40, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Дубликаты #{self.pk} ({self.get_status_display()})"
+
+
+class DuplicateClusterMember(models.Model):
+    cluster = models.ForeignKey(DuplicateCluster, related_name='members', on_delete=models.CASCADE)
+    recipe = models.ForeignKey(Recipe, related_name='+', on_delete=models.CASCADE)
+    # Сходство с самым ранним рецептом группы: доля общих шинглов текста и расстояние Хэмминга фото
+    text_similarity = models.FloatField(null=True, blank=True)
+    photo_distance = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['recipe_id']
+        constraints = [
+            models.UniqueConstraint(fields=['cluster', 'recipe'], name='duplicate_member_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.cluster_id}: {self.recipe_id}"
@@ -0,0 +1,169 @@
+# recipes/nutrition.py
+"""Расчет пищевой ценности рецептов по каталогу продуктов (NutritionFact).
+
+Вес каждого ингредиента берется из разобранного количества (amount/unit,
+см. recipes.quantities), для штук - из grams_per_piece продукта. Пачка
+рецептов превращается в матрицу весов W (рецепты x продукты каталога), и
+КБЖУ всей пачки считается одним произведением W @ N, где N - ккал, белки,
+жиры и углеводы на грамм каждого продукта.
+
+Значения на 100 г считаются по весу распознанных ингредиентов. Если в
+рецепте не распознан ни один ингредиент, калорийность остается указанной
+автором (calories_per_100g), а БЖУ - пустыми.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+
+from .models import Ingredient, NutritionFact, Recipe
+from .quantities import grams, normalize_ingredient_name
+
+try:
+    import numpy as np
+except ImportError:  # numpy не обязателен, без него считается циклом
+    np = None
+
+NUTRIENTS = ('kcal', 'protein', 'fat', 'carbs')
+RECIPE_FIELDS = ['kcal_per_100g', 'protein_per_100g', 'fat_per_100g', 'carbs_per_100g', 'kcal_per_serving']
+
+MACRO_QUANT = Decimal('0.1')
+
+
+class Catalogue:
+    """Каталог продуктов: индекс по названию и таблица КБЖУ на грамм"""
+
+    def __init__(self, facts):
+        self.index = {}
+        self.per_gram = []
+        self.grams_per_piece = []
+        for position, fact in enumerate(facts):
+            self.index[fact.name] = position
+            self.per_gram.append([float(getattr(fact, nutrient)) / 100 for nutrient in NUTRIENTS])
+            self.grams_per_piece.append(float(fact.grams_per_piece) if fact.grams_per_piece else None)
+        self.matrix = np.array(self.per_gram, dtype=float).reshape(-1, len(NUTRIENTS)) if np else None
+        self._matches = {}
+
+    @classmethod
+    def load(cls):
+        return cls(NutritionFact.objects.order_by('id'))
+
+    def __len__(self):
+        return len(self.per_gram)
+
+    def match(self, name):
+        """Позиция продукта для названия ингредиента или None.
+
+        "Мука пшеничная высшего сорта" ищется как есть, затем без последних
+        слов: "мука пшеничная высшего", "мука пшеничная", "мука".
+        """
+        name = normalize_ingredient_name(name)
+        if name not in self._matches:
+            words = name.split()
+            position = None
+            for length in range(len(words), 0, -1):
+                position = self.index.get(' '.join(words[:length]))
+                if position is not None:
+                    break
+            self._matches[name] = position
+        return self._matches[name]
+
+    def weight(self, position, amount, unit):
+        """Вес ингредиента в граммах или None, если его не из чего посчитать"""
+        weight = grams(amount, unit)
+        if weight is not None:
+            return float(weight)
+        if amount is not None and unit in ('', 'pcs') and self.grams_per_piece[position]:
+            return float(amount) * self.grams_per_piece[position]
+        return None
+
+
+def _weights(catalogue, rows, positions):
+    """Тройки (строка рецепта, позиция продукта, граммы) для ингредиентов пачки"""
+    weights = []
+    for recipe_id, name, amount, unit in rows:
+        product = catalogue.match(name)
+        if product is None:
+            continue
+        weight = catalogue.weight(product, amount, unit)
+        if weight:
+            weights.append((positions[recipe_id], product, weight))
+    return weights
+
+
+def _totals_numpy(catalogue, weights, size):
+    matrix = np.zeros((size, len(catalogue)))
+    if weights:
+        rows, products, values = zip(*weights)
+        # add.at суммирует повторы: один продукт может встретиться в рецепте дважды
+        np.add.at(matrix, (np.array(rows), np.array(products)), np.array(values))
+    return matrix.sum(axis=1).tolist(), (matrix @ catalogue.matrix).tolist()
+
+
+def _totals_python(catalogue, weights, size):
+    total_weight = [0.0] * size
+    totals = [[0.0] * len(NUTRIENTS) for _ in range(size)]
+    for row, product, weight in weights:
+        total_weight[row] += weight
+        for i, per_gram in enumerate(catalogue.per_gram[product]):
+            totals[row][i] += per_gram * weight
+    return total_weight, totals
+
+
+def _decimal(value):
+    return Decimal(value).quantize(MACRO_QUANT, ROUND_HALF_UP)
+
+
+def apply_nutrition(recipe, weight, totals):
+    """Записать в рецепт значения на 100 г и на порцию"""
+    if weight <= 0:
+        recipe.kcal_per_100g = recipe.calories_per_100g
+        recipe.protein_per_100g = recipe.fat_per_100g = recipe.carbs_per_100g = None
+        recipe.kcal_per_serving = None
+        return
+    kcal, protein, fat, carbs = (value * 100 / weight for value in totals)
+    recipe.kcal_per_100g = round(kcal)
+    recipe.protein_per_100g = _decimal(protein)
+    recipe.fat_per_100g = _decimal(fat)
+    recipe.carbs_per_100g = _decimal(carbs)
+    recipe.kcal_per_serving = round(totals[0] / (recipe.servings or 1))
+
+
+def compute_batch(recipes, catalogue):
+    """Пересчитать пачку рецептов в памяти (без сохранения)"""
+    positions = {recipe.id: row for row, recipe in enumerate(recipes)}
+    rows = Ingredient.objects.filter(recipe_id__in=positions).values_list('recipe_id', 'name', 'amount', 'unit')
+    weights = _weights(catalogue, rows, positions)
+    compute = _totals_numpy if np is not None and len(catalogue) else _totals_python
+    total_weight, totals = compute(catalogue, weights, len(recipes))
+    for row, recipe in enumerate(recipes):
+        apply_nutrition(recipe, total_weight[row], totals[row])
+
+
+def compute_nutrition(recipe_ids=None, batch_size=500, catalogue=None):
+    """Пересчитать и сохранить пищевую ценность рецептов (всех или recipe_ids).
+
+    Возвращает число обработанных рецептов.
+    """
+    catalogue = catalogue or Catalogue.load()
+    queryset = Recipe.objects.only('id', 'servings', 'calories_per_100g', *RECIPE_FIELDS).order_by('id')
+    if recipe_ids is not None:
+        queryset = queryset.filter(id__in=recipe_ids)
+
+    processed = 0
+    last_id = 0
+    while True:
+        # Пагинация по ключу, как в parse_ingredient_quantities
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        compute_batch(batch, catalogue)
+        with transaction.atomic():
+            Recipe.objects.bulk_update(batch, RECIPE_FIELDS)
+        processed += len(batch)
+        last_id = batch[-1].id
+
+    if processed:
+        # bulk_update не вызывает сигналы - сбрасываем кэш страниц сами
+        from others.page_cache import invalidate_tags
+        invalidate_tags('recipes')
+    return processed
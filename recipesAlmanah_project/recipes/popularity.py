@@ -0,0 +1,61 @@
+# recipes/popularity.py
+"""Популярность рецептов для сортировок ленты.
+
+favorites_count меняется вместе с избранным (сигналы в others.signals).
+trending_score - сумма добавлений в избранное, каждое с весом
+2 ** (-возраст / TRENDING_HALF_LIFE): вчерашнее добавление весит почти 1,
+недельное - 1/2. Между пересчетами новое добавление прибавляет 1, а
+периодическая фоновая задача refresh_trending_scores раз в
+TRENDING_REFRESH_INTERVAL пересчитывает все оценки заново.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Favorite, Recipe
+
+TRENDING_HALF_LIFE = timedelta(days=7)
+# Добавления старше восьми периодов полураспада весят меньше 1/256 - их не учитываем
+TRENDING_WINDOW = TRENDING_HALF_LIFE * 8
+TRENDING_REFRESH_INTERVAL = getattr(settings, 'TRENDING_REFRESH_INTERVAL', 60 * 60)
+
+
+def favorite_added(recipe_id):
+    Recipe.objects.filter(pk=recipe_id).update(
+        favorites_count=F('favorites_count') + 1, trending_score=F('trending_score') + 1,
+    )
+
+
+def favorite_removed(recipe_id):
+    # Оценка тренда поправится при следующем пересчете
+    Recipe.objects.filter(pk=recipe_id, favorites_count__gt=0).update(favorites_count=F('favorites_count') - 1)
+
+
+def refresh_trending_scores(batch_size=1000):
+    """Пересчитать trending_score всех рецептов с недавними добавлениями в избранное"""
+    now = timezone.now()
+    half_life = TRENDING_HALF_LIFE.total_seconds()
+    scores = {}
+    recent = Favorite.objects.filter(added_at__gte=now - TRENDING_WINDOW).values_list('recipe_id', 'added_at')
+    for recipe_id, added_at in recent.iterator(chunk_size=5000):
+        age = max((now - added_at).total_seconds(), 0)
+        scores[recipe_id] = scores.get(recipe_id, 0) + 2 ** (-age / half_life)
+
+    with transaction.atomic():
+        # Рецепты, выпавшие из окна, обнуляются; внутри транзакции читатели нулей не увидят
+        Recipe.objects.filter(trending_score__gt=0).update(trending_score=0)
+        Recipe.objects.bulk_update(
+            [Recipe(id=recipe_id, trending_score=score) for recipe_id, score in scores.items()],
+            ['trending_score'], batch_size=batch_size,
+        )
+    return len(scores)
+
+
+def recount_favorites():
+    """Сверить favorites_count с таблицей избранного (после массовых правок в обход сигналов)"""
+    counts = Favorite.objects.filter(recipe=OuterRef('pk')).values('recipe').annotate(total=Count('id')).values('total')
+    return Recipe.objects.update(favorites_count=Coalesce(Subquery(counts), 0))
@@ -0,0 +1,190 @@
+# recipes/quantities.py
+"""Разбор количества ингредиента: "2 шт", "100 г", "1,5 ст. л.", "по вкусу".
+
+parse_quantity превращает строку в (amount, unit, note): число (Decimal или
+None), код единицы из UNITS (или '') и остаток текста. Единицы приводятся
+к базовым: килограммы - в граммы, литры - в миллилитры.
+"""
+import re
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+
+ParsedQuantity = namedtuple('ParsedQuantity', ['amount', 'unit', 'note'])
+
+# Код единицы -> (краткое обозначение или формы для 1/2/5, грамм в единице или None)
+UNITS = {
+    'g': ('г', Decimal(1)),
+    'ml': ('мл', Decimal(1)),
+    'pcs': ('шт', None),
+    'tbsp': ('ст. л.', Decimal(15)),
+    'tsp': ('ч. л.', Decimal(5)),
+    'cup': (('стакан', 'стакана', 'стаканов'), Decimal(200)),
+    'pinch': (('щепотка', 'щепотки', 'щепоток'), Decimal(1)),
+    'clove': (('зубчик', 'зубчика', 'зубчиков'), Decimal(5)),
+    'bunch': (('пучок', 'пучка', 'пучков'), None),
+    'pack': ('уп.', None),
+    'slice': (('ломтик', 'ломтика', 'ломтиков'), None),
+    'can': (('банка', 'банки', 'банок'), None),
+}
+
+UNIT_CHOICES = [
+    (code, label if isinstance(label, str) else label[0]) for code, (label, _) in UNITS.items()
+]
+
+# Написание -> (код единицы, множитель к базовой единице)
+UNIT_ALIASES = {
+    'г': ('g', 1), 'гр': ('g', 1), 'грамм': ('g', 1), 'грамма': ('g', 1), 'граммов': ('g', 1),
+    'мг': ('g', Decimal('0.001')),
+    'кг': ('g', 1000), 'килограмм': ('g', 1000), 'килограмма': ('g', 1000), 'килограммов': ('g', 1000),
+    'мл': ('ml', 1), 'миллилитр': ('ml', 1), 'миллилитра': ('ml', 1), 'миллилитров': ('ml', 1),
+    'л': ('ml', 1000), 'литр': ('ml', 1000), 'литра': ('ml', 1000), 'литров': ('ml', 1000),
+    'шт': ('pcs', 1), 'штук': ('pcs', 1), 'штука': ('pcs', 1), 'штуки': ('pcs', 1),
+    'ст л': ('tbsp', 1), 'стл': ('tbsp', 1), 'ст ложка': ('tbsp', 1), 'ст ложки': ('tbsp', 1),
+    'столовая ложка': ('tbsp', 1), 'столовые ложки': ('tbsp', 1), 'столовых ложек': ('tbsp', 1),
+    'ч л': ('tsp', 1), 'чл': ('tsp', 1), 'ч ложка': ('tsp', 1), 'ч ложки': ('tsp', 1),
+    'чайная ложка': ('tsp', 1), 'чайные ложки': ('tsp', 1), 'чайных ложек': ('tsp', 1),
+    'стакан': ('cup', 1), 'стакана': ('cup', 1), 'стаканов': ('cup', 1), 'ст': ('cup', 1),
+    'щепотка': ('pinch', 1), 'щепотки': ('pinch', 1), 'щепоток': ('pinch', 1), 'щепотку': ('pinch', 1),
+    'зубчик': ('clove', 1), 'зубчика': ('clove', 1), 'зубчиков': ('clove', 1),
+    'пучок': ('bunch', 1), 'пучка': ('bunch', 1), 'пучков': ('bunch', 1),
+    'упаковка': ('pack', 1), 'упаковки': ('pack', 1), 'упаковок': ('pack', 1), 'уп': ('pack', 1),
+    'пачка': ('pack', 1), 'пачки': ('pack', 1), 'пачек': ('pack', 1),
+    'ломтик': ('slice', 1), 'ломтика': ('slice', 1), 'ломтиков': ('slice', 1),
+    'банка': ('can', 1), 'банки': ('can', 1), 'банок': ('can', 1),
+}
+# Самые длинные написания проверяются первыми ("ст л" раньше "ст")
+_ALIASES = sorted(
+    ((tuple(alias.split()), unit) for alias, unit in UNIT_ALIASES.items()),
+    key=lambda item: -len(item[0]),
+)
+
+NUMBER_WORDS = {
+    'пол': Fraction(1, 2), 'половина': Fraction(1, 2), 'половинка': Fraction(1, 2),
+    'четверть': Fraction(1, 4), 'один': 1, 'одна': 1, 'одно': 1, 'два': 2, 'две': 2,
+    'три': 3, 'четыре': 4, 'пять': 5, 'шесть': 6, 'десять': 10,
+}
+UNICODE_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+_NUMBER = r'\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?'
+_AMOUNT_RE = re.compile(rf'^\s*(?P<low>{_NUMBER})(?:\s*[-–—]\s*(?P<high>{_NUMBER}))?')
+_TOKEN_RE = re.compile(r'[^\s.]+')
+
+AMOUNT_QUANT = Decimal('0.001')
+# Ingredient.amount - DecimalField(max_digits=12, decimal_places=3): не больше 9 знаков до запятой
+MAX_AMOUNT = Decimal(10) ** 9
+
+
+def _parse_number(text):
+    """'1 1/2' -> Fraction; None, если число не разбирается ("1/0")"""
+    whole, _, fraction = text.replace(',', '.').partition(' ')
+    try:
+        return Fraction(whole) + (Fraction(fraction) if fraction else 0)
+    except (ZeroDivisionError, ValueError):
+        return None
+
+
+def _to_decimal(value):
+    return (Decimal(value.numerator) / Decimal(value.denominator)).quantize(AMOUNT_QUANT, ROUND_HALF_UP)
+
+
+def normalize_ingredient_name(name):
+    """Название для поиска в каталоге: нижний регистр, е вместо ё, без знаков препинания"""
+    return ' '.join(re.sub(r'[^\w\s-]', ' ', name.lower().replace('ё', 'е')).split())
+
+
+def parse_quantity(text):
+    """Строка количества -> ParsedQuantity(amount, unit, note)"""
+    source = ' '.join((text or '').split())
+    normalized = source.lower().replace('ё', 'е')
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        normalized = normalized.replace(symbol, f' {fraction}')
+    normalized = normalized.strip()
+
+    amount = None
+    rest = normalized
+    match = _AMOUNT_RE.match(normalized)
+    if match:
+        low = _parse_number(match['low'])
+        high = _parse_number(match['high']) if match['high'] else low
+        if low is None or high is None:
+            return ParsedQuantity(None, '', source)
+        # Диапазон "2-3" - берем середину, исходный текст остается в quantity
+        amount = (low + high) / 2
+        rest = normalized[match.end():]
+    else:
+        first, _, tail = normalized.partition(' ')
+        if first in NUMBER_WORDS:
+            amount = Fraction(NUMBER_WORDS[first])
+            rest = tail
+
+    unit = ''
+    tokens = [(token.group(), token.end()) for token in _TOKEN_RE.finditer(rest)]
+    words = tuple(token for token, _ in tokens)
+    for alias, (code, factor) in _ALIASES:
+        if words[:len(alias)] == alias:
+            unit = code
+            rest = rest[tokens[len(alias) - 1][1]:]
+            if amount is None:
+                # "щепотка соли", "стакан муки" - одна единица
+                amount = Fraction(1)
+            amount *= Fraction(factor)
+            break
+
+    if amount is not None:
+        amount = _to_decimal(amount)
+        if amount >= MAX_AMOUNT:
+            # "1000000 кг" не помещается в Ingredient.amount - оставляем только текст
+            return ParsedQuantity(None, '', source)
+
+    note = rest.strip(' .,;')
+    if amount is None and not unit:
+        # Ничего не распознано ("по вкусу") - заметка в исходном написании
+        note = source
+    return ParsedQuantity(amount, unit, note)
+
+
+def _plural(amount, forms):
+    if amount != amount.to_integral_value():
+        return forms[1]
+    n = int(amount) % 100
+    if 11 <= n <= 14:
+        return forms[2]
+    n %= 10
+    if n == 1:
+        return forms[0]
+    if 2 <= n <= 4:
+        return forms[1]
+    return forms[2]
+
+
+def _format_amount(amount):
+    # Крупные количества округляем до целых, мелкие - до сотых
+    amount = amount.quantize(Decimal(1) if amount >= 10 else Decimal('0.01'), ROUND_HALF_UP)
+    text = format(amount.normalize(), 'f')
+    return text.replace('.', ',')
+
+
+def format_quantity(amount, unit, note=''):
+    """Количество для показа: "1,5 кг", "2 стакана", "по вкусу" """
+    if amount is None:
+        return note
+    if unit == 'g' and amount >= 1000:
+        label, amount = 'кг', amount / 1000
+    elif unit == 'ml' and amount >= 1000:
+        label, amount = 'л', amount / 1000
+    elif unit:
+        label = UNITS[unit][0]
+    else:
+        label = ''
+    number = _format_amount(amount)
+    if not isinstance(label, str):
+        label = _plural(Decimal(number.replace(',', '.')), label)
+    return ' '.join(part for part in (number, label, note) if part)
+
+
+def grams(amount, unit):
+    """Примерный вес в граммах, если единица это позволяет (мл считаются как г)"""
+    if amount is None or not unit or UNITS[unit][1] is None:
+        return None
+    return amount * UNITS[unit][1]
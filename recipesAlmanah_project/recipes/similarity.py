@@ -0,0 +1,178 @@
+# recipes/similarity.py
+"""Индекс похожих рецептов: MinHash по ингредиентам и хештегам + LSH.
+
+Рецепт описывается множеством признаков: нормализованные названия
+ингредиентов (и их первое слово: "масло сливочное" -> "масло") и slug
+хештегов. MinHash-подпись из NUM_PERM чисел оценивает коэффициент Жаккара
+двух множеств долей совпавших позиций. Подпись режется на BANDS полос, каждая
+полоса хэшируется в корзину (RecipeBucket) - кандидатами в похожие считаются
+только рецепты с общей корзиной, попарного сравнения всего каталога нет.
+
+Индекс обновляется по рецепту (index_recipes) и сразу пересчитывает список
+SimilarRecipe и для рецепта, и для его соседей. Страница рецепта читает
+готовый список одним индексным запросом.
+"""
+import hashlib
+import random
+from array import array
+
+from django.db import transaction
+
+from .models import Ingredient, Recipe, RecipeBucket, RecipeSignature, SimilarRecipe
+from .quantities import normalize_ingredient_name
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Порог LSH примерно (1 / BANDS) ** (1 / ROWS) = 0.5: такие пары становятся кандидатами с вероятностью ~50%
+MIN_SCORE = 0.2
+TOP_K = 6
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Фиксированное зерно: подписи должны совпадать между процессами и перезапусками
+_random = random.Random(4409)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def recipe_features(ingredient_names, hashtag_slugs):
+    """Множество признаков рецепта"""
+    features = set()
+    for name in ingredient_names:
+        name = normalize_ingredient_name(name)
+        if name:
+            features.add('i:' + name)
+            features.add('w:' + name.split()[0])
+    features.update('t:' + slug for slug in hashtag_slugs)
+    return features
+
+
+def minhash(features):
+    """MinHash-подпись множества (NUM_PERM беззнаковых 32-битных чисел)"""
+    hashes = [_hash(feature) for feature in features]
+    return array('I', (
+        min((a * value + b) % _PRIME for value in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ))
+
+
+def buckets(signature):
+    """Корзины LSH: номер полосы входит в хэш, поэтому корзины разных полос не пересекаются"""
+    result = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(band.to_bytes(2, 'big') + rows.tobytes(), digest_size=8).digest()
+        result.append(int.from_bytes(digest, 'big', signed=True))
+    return result
+
+
+def similarity(first, second):
+    """Оценка коэффициента Жаккара по двум подписям"""
+    return sum(x == y for x, y in zip(first, second)) / NUM_PERM
+
+
+def _load_signature(data):
+    signature = array('I')
+    signature.frombytes(bytes(data))
+    return signature
+
+
+def _signatures(recipe_ids):
+    """Подписи рецептов (рецепты без ингредиентов и хештегов пропускаются)"""
+    names = {}
+    for recipe_id, name in Ingredient.objects.filter(recipe_id__in=recipe_ids).values_list('recipe_id', 'name'):
+        names.setdefault(recipe_id, []).append(name)
+    slugs = {}
+    through = Recipe.hashtags.through.objects.filter(recipe_id__in=recipe_ids)
+    for recipe_id, slug in through.values_list('recipe_id', 'hashtag__slug'):
+        slugs.setdefault(recipe_id, []).append(slug)
+
+    signatures = {}
+    for recipe_id in recipe_ids:
+        features = recipe_features(names.get(recipe_id, ()), slugs.get(recipe_id, ()))
+        if features:
+            signatures[recipe_id] = minhash(features)
+    return signatures
+
+
+def index_recipes(recipe_ids):
+    """Обновить подписи, корзины и списки похожих для рецептов recipe_ids"""
+    recipe_ids = list(Recipe.objects.filter(id__in=recipe_ids).values_list('id', flat=True))
+    if not recipe_ids:
+        return
+    signatures = _signatures(recipe_ids)
+    recipe_buckets = {recipe_id: buckets(signature) for recipe_id, signature in signatures.items()}
+
+    with transaction.atomic():
+        RecipeSignature.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeBucket.objects.filter(recipe_id__in=recipe_ids).delete()
+        # Старые связи в обе стороны: рецепт мог перестать быть похожим на соседей
+        SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+        affected = set(SimilarRecipe.objects.filter(similar_id__in=recipe_ids).values_list('recipe_id', flat=True))
+        SimilarRecipe.objects.filter(similar_id__in=recipe_ids).delete()
+
+        RecipeSignature.objects.bulk_create([
+            RecipeSignature(recipe_id=recipe_id, minhash=signature.tobytes())
+            for recipe_id, signature in signatures.items()
+        ])
+        RecipeBucket.objects.bulk_create([
+            RecipeBucket(recipe_id=recipe_id, bucket=bucket)
+            for recipe_id, values in recipe_buckets.items() for bucket in values
+        ], batch_size=1000)
+
+        # Кандидаты - рецепты с общей корзиной (включая рецепты той же пачки)
+        bucket_members = {}
+        all_buckets = {bucket for values in recipe_buckets.values() for bucket in values}
+        for recipe_id, bucket in RecipeBucket.objects.filter(bucket__in=all_buckets).values_list('recipe_id', 'bucket'):
+            bucket_members.setdefault(bucket, set()).add(recipe_id)
+        candidates = {
+            recipe_id: {other for bucket in values for other in bucket_members[bucket]} - {recipe_id}
+            for recipe_id, values in recipe_buckets.items()
+        }
+        candidate_ids = {other for others in candidates.values() for other in others} - signatures.keys()
+        candidate_signatures = dict(signatures)
+        for recipe_id, data in RecipeSignature.objects.filter(recipe_id__in=candidate_ids).values_list('recipe_id', 'minhash'):
+            candidate_signatures[recipe_id] = _load_signature(data)
+
+        links = {}
+        for recipe_id, others in candidates.items():
+            scored = []
+            for other in others:
+                score = similarity(signatures[recipe_id], candidate_signatures[other])
+                if score >= MIN_SCORE:
+                    scored.append((score, other))
+            scored.sort(reverse=True)
+            for score, other in scored[:TOP_K]:
+                links[recipe_id, other] = score
+                # Обратная связь: рецепт мог попасть в топ соседа, лишнее отрежет _trim
+                # (в том числе у рецептов той же пачки)
+                links.setdefault((other, recipe_id), score)
+                affected.add(other)
+        SimilarRecipe.objects.bulk_create(
+            [SimilarRecipe(recipe_id=recipe_id, similar_id=other, score=score)
+             for (recipe_id, other), score in links.items()],
+            ignore_conflicts=True, batch_size=1000,
+        )
+        _trim(affected | set(recipe_ids))
+
+
+def _trim(recipe_ids):
+    """Оставить у рецептов не больше TOP_K похожих с наибольшей оценкой"""
+    kept = {}
+    extra = []
+    rows = SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).order_by('recipe_id', '-score', 'similar_id')
+    for link_id, recipe_id in rows.values_list('id', 'recipe_id'):
+        kept[recipe_id] = kept.get(recipe_id, 0) + 1
+        if kept[recipe_id] > TOP_K:
+            extra.append(link_id)
+    if extra:
+        SimilarRecipe.objects.filter(id__in=extra).delete()
+
+
+def similar_links(recipe_id, limit=TOP_K):
+    """Готовый список похожих рецептов: один запрос по индексу (recipe, -score)"""
+    return SimilarRecipe.objects.filter(recipe_id=recipe_id).select_related('similar')[:limit]
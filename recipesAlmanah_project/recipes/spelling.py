@@ -0,0 +1,188 @@
+# recipes/spelling.py
+"""Исправление опечаток в поисковых запросах (индекс удалений в стиле SymSpell).
+
+Словарь - слова из названий рецептов, ингредиентов и хештегов с частотами.
+Для каждого слова в индекс кладутся все варианты с удалением до MAX_DISTANCE
+букв из первых PREFIX_LENGTH символов. Слово запроса порождает свои удаления,
+кандидаты из индекса проверяются расстоянием Дамерау-Левенштейна, побеждает
+ближайшее, при равенстве - самое частое.
+
+Словарь живет в памяти процесса. Раз в REFRESH_INTERVAL секунд в него
+добавляются слова из строк с id больше уже загруженных (без перестройки
+индекса), раз в REBUILD_INTERVAL он строится заново - так уходят слова
+удаленных и отредактированных рецептов.
+"""
+import re
+import threading
+import time
+from array import array
+
+from .models import Hashtag, Ingredient, Recipe
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+MIN_WORD_LENGTH = 3
+
+REFRESH_INTERVAL = 60
+REBUILD_INTERVAL = 6 * 60 * 60
+
+_WORD_RE = re.compile(r'[^\W\d_]+')
+
+# Модель -> поля со словами для словаря
+SOURCES = [
+    (Recipe, ('title',)),
+    (Ingredient, ('name',)),
+    (Hashtag, ('name',)),
+]
+
+
+def words(text):
+    return [word for word in _WORD_RE.findall(text.lower().replace('ё', 'е')) if len(word) >= MIN_WORD_LENGTH]
+
+
+def _max_distance(word):
+    # В коротких словах две правки превращают почти любое слово в другое
+    return 1 if len(word) <= 4 else MAX_DISTANCE
+
+
+def _deletes(word, distance):
+    """Все варианты префикса слова с удалением от 0 до distance букв"""
+    result = {word[:PREFIX_LENGTH]}
+    current = set(result)
+    for _ in range(distance):
+        current = {item[:i] + item[i + 1:] for item in current for i in range(len(item))}
+        result |= current
+    return result
+
+
+def edit_distance(first, second, limit):
+    """Расстояние Дамерау-Левенштейна (с перестановкой соседних букв) или limit + 1, если больше"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(second) + 1))
+    for i, a in enumerate(first, 1):
+        current = [i] + [0] * len(second)
+        for j, b in enumerate(second, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b))
+            if i > 1 and j > 1 and a == second[j - 2] and first[i - 2] == b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SpellingDictionary:
+    def __init__(self):
+        self.words = []
+        self.counts = array('I')
+        self.index = {}
+        # Удаление -> номер слова или список номеров (у большинства удалений одно слово)
+        self.deletes = {}
+        self.watermarks = {model: 0 for model, _ in SOURCES}
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word, count=1):
+        position = self.index.get(word)
+        if position is not None:
+            self.counts[position] += count
+            return
+        position = len(self.words)
+        self.words.append(word)
+        self.counts.append(count)
+        self.index[word] = position
+        for delete in _deletes(word, MAX_DISTANCE):
+            existing = self.deletes.get(delete)
+            if existing is None:
+                self.deletes[delete] = position
+            elif isinstance(existing, int):
+                self.deletes[delete] = [existing, position]
+            else:
+                existing.append(position)
+
+    def load_new_rows(self):
+        """Добавить слова строк, появившихся после прошлой загрузки"""
+        for model, fields in SOURCES:
+            rows = model.objects.filter(id__gt=self.watermarks[model]).order_by('id').values_list('id', *fields)
+            for row in rows.iterator(chunk_size=2000):
+                self.watermarks[model] = row[0]
+                for text in row[1:]:
+                    for word in words(text):
+                        self.add(word)
+
+    def lookup(self, word):
+        """Ближайшее слово словаря или None (слово из словаря возвращается как есть)"""
+        if word in self.index:
+            return word
+        limit = _max_distance(word)
+        best, best_key = None, None
+        seen = set()
+        for delete in _deletes(word, limit):
+            found = self.deletes.get(delete)
+            if found is None:
+                continue
+            for position in (found,) if isinstance(found, int) else found:
+                if position in seen:
+                    continue
+                seen.add(position)
+                candidate = self.words[position]
+                distance = edit_distance(word, candidate, limit)
+                if distance > limit:
+                    continue
+                key = (distance, -self.counts[position])
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+        return best
+
+    def suggest(self, query):
+        """Исправленный запрос или None, если исправлять нечего"""
+        changed = False
+        parts = []
+        for token in re.split(r'(\W+)', query):
+            word = token.lower().replace('ё', 'е')
+            if len(word) >= MIN_WORD_LENGTH and word.isalpha():
+                corrected = self.lookup(word)
+                if corrected and corrected != word:
+                    # Сохраняем регистр: в SQLite поиск по кириллице чувствителен к регистру
+                    token = corrected.upper() if token.isupper() else (
+                        corrected.capitalize() if token[0].isupper() else corrected
+                    )
+                    changed = True
+            parts.append(token)
+        return ''.join(parts).strip() if changed else None
+
+
+_local = {'dictionary': None, 'built_at': 0.0, 'refreshed_at': 0.0}
+_lock = threading.Lock()
+
+
+def get_dictionary():
+    """Словарь процесса: строится при первом обращении и догружается новыми строками"""
+    dictionary = _local['dictionary']
+    if dictionary is not None:
+        if time.monotonic() - _local['refreshed_at'] < REFRESH_INTERVAL:
+            return dictionary
+        # Обновляет один поток, остальные пока работают со старым словарем
+        if not _lock.acquire(blocking=False):
+            return dictionary
+    else:
+        _lock.acquire()
+    try:
+        now = time.monotonic()
+        if _local['dictionary'] is None or now - _local['built_at'] >= REBUILD_INTERVAL:
+            dictionary = SpellingDictionary()
+            dictionary.load_new_rows()
+            _local.update(dictionary=dictionary, built_at=now, refreshed_at=now)
+        elif now - _local['refreshed_at'] >= REFRESH_INTERVAL:
+            _local['dictionary'].load_new_rows()
+            _local['refreshed_at'] = now
+        return _local['dictionary']
+    finally:
+        _lock.release()
+
+
+def suggest(query):
+    return get_dictionary().suggest(query)
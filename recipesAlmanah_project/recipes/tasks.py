@@ -0,0 +1,69 @@
+# recipes/tasks.py
+"""Фоновые задачи рецептов (выполняются воркером jobs: manage.py run_worker)"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from jobs.registry import task
+from .duplicates import photo_hash
+from .models import Recipe
+from .popularity import TRENDING_REFRESH_INTERVAL, refresh_trending_scores as refresh_trending
+
+# Размер превью для карточек ленты
+THUMBNAIL_SIZE = (600, 400)
+
+
+@task()
+def make_recipe_thumbnail(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only('main_photo', 'main_photo_thumbnail').first()
+    if recipe is None or not recipe.main_photo:
+        return
+
+    with recipe.main_photo.open('rb') as source:
+        image = Image.open(source)
+        # Хэш для поиска повторно загруженных фото (recipes.duplicates)
+        main_photo_hash = photo_hash(image)
+        image.thumbnail(THUMBNAIL_SIZE)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=85, optimize=True)
+
+    if recipe.main_photo_thumbnail:
+        recipe.main_photo_thumbnail.delete(save=False)
+    name = os.path.splitext(os.path.basename(recipe.main_photo.name))[0] + '.jpg'
+    recipe.main_photo_thumbnail.save(name, ContentFile(buffer.getvalue()), save=False)
+    # update() не трогает updated_at и не вызывает сигналы, поэтому кэш страниц сбрасываем сами
+    Recipe.objects.filter(pk=recipe_id).update(
+        main_photo_thumbnail=recipe.main_photo_thumbnail.name, main_photo_hash=main_photo_hash,
+    )
+
+    from others.page_cache import invalidate_tags
+    invalidate_tags('recipes')
+
+
+@task()
+def compute_recipe_nutrition(recipe_id):
+    # Импорт здесь: recipes.nutrition опционально использует numpy
+    from .nutrition import compute_nutrition
+    compute_nutrition([recipe_id])
+
+
+@task()
+def update_recipe_similarity(recipe_id):
+    from .similarity import index_recipes
+    index_recipes([recipe_id])
+
+
+@task()
+def find_duplicate_recipes():
+    from .duplicates import find_duplicates
+    find_duplicates()
+
+
+@task(every=TRENDING_REFRESH_INTERVAL)
+def refresh_trending_scores():
+    # Следующий запуск ставит воркер (jobs.registry.PERIODIC)
+    refresh_trending()
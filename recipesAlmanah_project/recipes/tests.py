@@ -1,3 +1,289 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from .models import Ingredient, Recipe, SimilarRecipe
+from .quantities import format_quantity, grams, normalize_ingredient_name, parse_quantity
+from .similarity import BANDS, TOP_K, buckets, index_recipes, minhash, recipe_features, similarity
+from .spelling import SpellingDictionary, edit_distance, words
+
+
+class ParseQuantityTests(SimpleTestCase):
+    def assertParsed(self, text, amount, unit, note=''):
+        parsed = parse_quantity(text)
+        self.assertEqual(
+            (parsed.amount, parsed.unit, parsed.note),
+            (Decimal(amount) if amount is not None else None, unit, note),
+        )
+
+    def test_number_and_unit(self):
+        self.assertParsed('2 шт', '2', 'pcs')
+        self.assertParsed('100 г', '100', 'g')
+
+    def test_decimal_comma_and_point(self):
+        self.assertParsed('1,5 ст. л.', '1.5', 'tbsp')
+        self.assertParsed('1.5 ч. л.', '1.5', 'tsp')
+
+    def test_mixed_and_unicode_fractions(self):
+        self.assertParsed('1 1/2 ст. л.', '1.5', 'tbsp')
+        self.assertParsed('½ стакана', '0.5', 'cup')
+
+    def test_range_takes_middle(self):
+        self.assertParsed('2-3 зубчика', '2.5', 'clove')
+        self.assertParsed('2 – 3 шт', '2.5', 'pcs')
+
+    def test_units_converted_to_base(self):
+        self.assertParsed('1,5 кг', '1500', 'g')
+        self.assertParsed('500 мг', '0.5', 'g')
+        self.assertParsed('пол литра', '500', 'ml')
+
+    def test_longest_alias_wins(self):
+        # "ст л" - столовая ложка, а не "ст" (стакан) с остатком "л"
+        self.assertParsed('2 ст л', '2', 'tbsp')
+        self.assertParsed('2 ст', '2', 'cup')
+
+    def test_unit_without_number_is_one(self):
+        self.assertParsed('щепотка соли', '1', 'pinch', 'соли')
+
+    def test_case_and_yo_insensitive(self):
+        self.assertParsed('3 Столовые ложки', '3', 'tbsp')
+
+    def test_number_words(self):
+        self.assertParsed('две штуки', '2', 'pcs')
+
+    def test_number_without_unit(self):
+        self.assertParsed('3', '3', '')
+
+    def test_unrecognized_kept_as_note(self):
+        self.assertParsed('по  вкусу', None, '', 'по вкусу')
+        self.assertParsed('', None, '')
+        self.assertParsed(None, None, '')
+
+    def test_zero_denominator_kept_as_note(self):
+        self.assertParsed('1/0 шт', None, '', '1/0 шт')
+        self.assertParsed('1 1/0 ст. л.', None, '', '1 1/0 ст. л.')
+        self.assertParsed('1-1/0 шт', None, '', '1-1/0 шт')
+
+    def test_amount_too_large_kept_as_note(self):
+        self.assertParsed('1000000 кг', None, '', '1000000 кг')
+        self.assertParsed('999999999,9999 г', None, '', '999999999,9999 г')
+        self.assertParsed('999999999 г', '999999999', 'g')
+
+
+class IngredientSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author', password='x')
+        cls.recipe = Recipe.objects.create(
+            title='Блины', description='d', author=author, cooking_time=10, servings=2,
+            calories_per_100g=100, difficulty='easy',
+        )
+
+    def save(self, quantity):
+        ingredient = Ingredient.objects.create(recipe=self.recipe, name='мука', quantity=quantity)
+        return Ingredient.objects.get(pk=ingredient.pk)
+
+    def test_unparseable_quantities_saved_as_note(self):
+        for quantity in ['', '???', '1/0 шт', '1000000 кг']:
+            with self.subTest(quantity=quantity):
+                ingredient = self.save(quantity)
+                self.assertEqual((ingredient.amount, ingredient.unit, ingredient.note), (None, '', quantity))
+
+    def test_parsed_quantity_round_trips(self):
+        ingredient = self.save('1,5 кг')
+        self.assertEqual((ingredient.amount, ingredient.unit), (Decimal('1500'), 'g'))
+
+
+class FormatQuantityTests(SimpleTestCase):
+    def test_large_base_units_shown_as_kilo(self):
+        self.assertEqual(format_quantity(Decimal('1500'), 'g'), '1,5 кг')
+        self.assertEqual(format_quantity(Decimal('2000'), 'ml'), '2 л')
+
+    def test_plural_forms(self):
+        self.assertEqual(format_quantity(Decimal('1'), 'cup'), '1 стакан')
+        self.assertEqual(format_quantity(Decimal('2'), 'cup'), '2 стакана')
+        self.assertEqual(format_quantity(Decimal('5'), 'cup'), '5 стаканов')
+        self.assertEqual(format_quantity(Decimal('11'), 'clove'), '11 зубчиков')
+        self.assertEqual(format_quantity(Decimal('21'), 'clove'), '21 зубчик')
+        self.assertEqual(format_quantity(Decimal('1.5'), 'cup'), '1,5 стакана')
+
+    def test_note_without_amount(self):
+        self.assertEqual(format_quantity(None, '', 'по вкусу'), 'по вкусу')
+
+    def test_round_trip(self):
+        parsed = parse_quantity('1,5 кг муки')
+        self.assertEqual(format_quantity(*parsed), '1,5 кг муки')
+
+
+class GramsTests(SimpleTestCase):
+    def test_known_weight(self):
+        self.assertEqual(grams(Decimal('2'), 'tbsp'), Decimal('30'))
+
+    def test_unknown_weight(self):
+        self.assertIsNone(grams(Decimal('2'), 'pcs'))
+        self.assertIsNone(grams(None, 'g'))
+        self.assertIsNone(grams(Decimal('2'), ''))
+
+
+class NormalizeIngredientNameTests(SimpleTestCase):
+    def test_normalization(self):
+        self.assertEqual(normalize_ingredient_name('  Масло, сливочное! '), 'масло сливочное')
+        self.assertEqual(normalize_ingredient_name('Свёкла'), 'свекла')
+
+
+class RecipeKcalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='x')
+
+    def make_recipe(self):
+        return Recipe.objects.create(
+            title='Блины', description='d', author=self.author, cooking_time=10, servings=2,
+            calories_per_100g=200, difficulty='easy',
+        )
+
+    def test_follows_author_calories_until_computed(self):
+        recipe = self.make_recipe()
+        self.assertEqual(recipe.kcal_per_100g, 200)
+        recipe.calories_per_100g = 150
+        recipe.save()
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).kcal_per_100g, 150)
+
+    def test_computed_value_kept(self):
+        recipe = self.make_recipe()
+        recipe.kcal_per_100g, recipe.protein_per_100g = 180, Decimal('6.0')
+        recipe.save()
+        recipe.calories_per_100g = 150
+        recipe.save()
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).kcal_per_100g, 180)
+
+
+class MinHashTests(SimpleTestCase):
+    def test_identical_sets(self):
+        features = recipe_features(['Мука', 'Яйцо', 'Молоко'], ['выпечка'])
+        self.assertEqual(similarity(minhash(features), minhash(set(features))), 1.0)
+
+    def test_symmetric(self):
+        first = minhash(recipe_features(['мука', 'яйцо', 'молоко', 'сахар'], []))
+        second = minhash(recipe_features(['мука', 'яйцо', 'кефир'], ['блины']))
+        self.assertEqual(similarity(first, second), similarity(second, first))
+
+    def test_estimates_jaccard(self):
+        shared = {f'f{i}' for i in range(60)}
+        first = minhash(shared | {f'a{i}' for i in range(20)})
+        second = minhash(shared | {f'b{i}' for i in range(20)})
+        # Точное значение 60 / 100
+        self.assertAlmostEqual(similarity(first, second), 0.6, delta=0.2)
+        self.assertLess(similarity(minhash({'x', 'y'}), minhash({'z', 'w'})), 0.2)
+
+    def test_buckets_per_band(self):
+        signature = minhash({'a', 'b', 'c'})
+        self.assertEqual(len(buckets(signature)), BANDS)
+        self.assertEqual(buckets(signature), buckets(minhash({'c', 'b', 'a'})))
+
+    def test_features(self):
+        self.assertEqual(
+            recipe_features(['Масло сливочное'], ['завтрак']),
+            {'i:масло сливочное', 'w:масло', 't:завтрак'},
+        )
+
+
+class SimilarityIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='x')
+
+    def make_recipe(self, title, ingredients):
+        recipe = Recipe.objects.create(
+            title=title, description='d', author=self.author, cooking_time=10, servings=2,
+            calories_per_100g=100, difficulty='easy',
+        )
+        for name in ingredients:
+            Ingredient.objects.create(recipe=recipe, name=name, quantity='1 шт')
+        return recipe
+
+    def test_links_are_symmetric(self):
+        first = self.make_recipe('Блины', ['мука', 'яйцо', 'молоко', 'сахар'])
+        second = self.make_recipe('Оладьи', ['мука', 'яйцо', 'молоко', 'сахар', 'сода'])
+        other = self.make_recipe('Салат', ['огурец', 'помидор', 'укроп'])
+        index_recipes([first.id, second.id, other.id])
+
+        forward = SimilarRecipe.objects.get(recipe=first, similar=second)
+        backward = SimilarRecipe.objects.get(recipe=second, similar=first)
+        self.assertEqual(forward.score, backward.score)
+        self.assertFalse(SimilarRecipe.objects.filter(recipe=other).exists())
+
+    def test_trimmed_to_top_k(self):
+        ingredients = ['мука', 'яйцо', 'молоко', 'сахар', 'соль']
+        recipes = [self.make_recipe(f'Блины {i}', ingredients) for i in range(TOP_K + 3)]
+        # По одному, чтобы обратные связи копились у уже проиндексированных рецептов
+        for recipe in recipes:
+            index_recipes([recipe.id])
+
+        for recipe in recipes:
+            self.assertEqual(SimilarRecipe.objects.filter(recipe=recipe).count(), TOP_K)
+
+    def test_reindex_drops_stale_links(self):
+        first = self.make_recipe('Блины', ['мука', 'яйцо', 'молоко'])
+        second = self.make_recipe('Оладьи', ['мука', 'яйцо', 'молоко'])
+        index_recipes([first.id, second.id])
+        self.assertTrue(SimilarRecipe.objects.filter(recipe=first, similar=second).exists())
+
+        second.ingredients.all().delete()
+        Ingredient.objects.create(recipe=second, name='огурец', quantity='1 шт')
+        index_recipes([second.id])
+        self.assertFalse(SimilarRecipe.objects.filter(recipe=first, similar=second).exists())
+        self.assertFalse(SimilarRecipe.objects.filter(recipe=second, similar=first).exists())
+
+
+class EditDistanceTests(SimpleTestCase):
+    def test_basic_edits(self):
+        self.assertEqual(edit_distance('борщ', 'борщ', 2), 0)
+        self.assertEqual(edit_distance('борщ', 'борш', 2), 1)
+        self.assertEqual(edit_distance('борщ', 'бор', 2), 1)
+        self.assertEqual(edit_distance('борщ', 'боррщ', 2), 1)
+
+    def test_transposition_is_one_edit(self):
+        self.assertEqual(edit_distance('блины', 'лбины', 2), 1)
+
+    def test_limit_exceeded(self):
+        self.assertEqual(edit_distance('блины', 'салат', 2), 3)
+        self.assertEqual(edit_distance('а', 'абвгд', 2), 3)
+
+
+class SpellingDictionaryTests(SimpleTestCase):
+    def setUp(self):
+        self.dictionary = SpellingDictionary()
+        for word in words('Блины с творогом, блины с мясом, борщ, пирог, пирожки, сырники'):
+            self.dictionary.add(word)
+
+    def test_known_word_returned_as_is(self):
+        self.assertEqual(self.dictionary.lookup('блины'), 'блины')
+
+    def test_nearest_word(self):
+        self.assertEqual(self.dictionary.lookup('блиины'), 'блины')
+        self.assertEqual(self.dictionary.lookup('сырнеки'), 'сырники')
+        self.assertEqual(self.dictionary.lookup('творгом'), 'творогом')
+
+    def test_too_far_is_none(self):
+        self.assertIsNone(self.dictionary.lookup('шашлык'))
+
+    def test_short_words_allow_one_edit(self):
+        self.assertEqual(self.dictionary.lookup('борш'), 'борщ')
+        # Две правки в слове из 4 букв - уже другое слово
+        self.assertIsNone(self.dictionary.lookup('барш'))
+
+    def test_tie_broken_by_frequency(self):
+        dictionary = SpellingDictionary()
+        dictionary.add('сало', 1)
+        dictionary.add('соло', 5)
+        self.assertEqual(dictionary.lookup('сола'), 'соло')
+
+    def test_suggest_keeps_case_and_separators(self):
+        self.assertEqual(self.dictionary.suggest('Блиины с творгом'), 'Блины с творогом')
+        self.assertEqual(self.dictionary.suggest('БОРШ'), 'БОРЩ')
+
+    def test_suggest_nothing_to_fix(self):
+        self.assertIsNone(self.dictionary.suggest('блины с мясом'))
+        self.assertIsNone(self.dictionary.suggest(''))
@@ -1,12 +1,35 @@
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.db.models import Q, Count, Exists, OuterRef
+from django.core.paginator import Paginator, InvalidPage
+from django.http import Http404, JsonResponse
+from django.views import View
+from django.views.decorators.http import require_GET
+from django.views.generic import CreateView, UpdateView, DeleteView
+from django.db.models import Q, Count, Exists, OuterRef, Case, When, Value, BooleanField
 from django.contrib import messages
 from django.urls import reverse  # Добавьте этот импорт
-from .models import Recipe, Favorite, Hashtag, Ingredient, CookingStep
+from django.utils.decorators import method_decorator
+from .models import DEFAULT_SORT, NUTRITION_FILTERS, SORT_CHOICES, Recipe, Favorite, Ingredient, CookingStep
 from .forms import RecipeForm, IngredientForm, CookingStepForm
+from .tasks import compute_recipe_nutrition, make_recipe_thumbnail
+from .similarity import similar_links
+from .spelling import suggest
+from .vocabulary import aget_vocabulary, get_vocabulary
+from comments.models import Comment
+from others.metrics import FAVORITE_TOGGLES, SEARCHES
+from others.page_cache import anonymous_page_cache
+from others.ratelimit import rate_limit
+from users.models import Follow
+
+logger = logging.getLogger(__name__)
+
+# Предел пересчета ингредиентов на странице рецепта
+MAX_SCALED_SERVINGS = 100
 
 # Импортируем inlineformset_factory и создаем formsets прямо в views
 from django.forms import inlineformset_factory, formset_factory
@@ -35,85 +58,133 @@ CookingStepFormSet = inlineformset_factory(
 )
 
 #Отображение списка рецептов с поддержкой пагинации(разделение на мелкие части), поиска и фильтрации
-class RecipeListView(ListView):
-    model = Recipe
+class RecipeListView(View):
     template_name = 'recipes/home.html'
-    context_object_name = 'recipes'
     paginate_by = 9
 
-    def get_queryset(self):
-        # Базовый запрос
-        queryset = Recipe.objects.all().prefetch_related('hashtags').order_by('-created_at')
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Кэш страниц для анонимов оборачивает уже асинхронный view
+        return anonymous_page_cache('recipes', 'hashtags')(super().as_view(**initkwargs))
 
-        # Простой способ - не используем аннотацию для favorite_count
-        # Вместо этого будем использовать свойство в шаблоне или отдельный запрос
+    async def get(self, request):
+        request.user = await request.auser()
 
-        # Добавляем аннотацию для проверки избранного
-        if self.request.user.is_authenticated:
-            favorite_recipe_ids = Favorite.objects.filter(
-                user=self.request.user
-            ).values_list('recipe_id', flat=True)
+        # Поиск и фильтры (общие с search_recipes и API)
+        filtered = Recipe.objects.filter_by_params(request.GET)
+        if any(request.GET.get(param) for param in ('q', 'hashtags', *NUTRITION_FILTERS)):
+            SEARCHES.inc(kind='feed')
+
+        # Независимые запросы выполняем одновременно
+        favorite_recipe_ids, total, all_hashtags = await asyncio.gather(
+            self.get_favorite_recipe_ids(request.user),
+            filtered.acount(),
+            aget_vocabulary(),
+        )
 
-            from django.db.models import Case, When, BooleanField
+        sort = request.GET.get('sort') or DEFAULT_SORT
+        queryset = filtered.select_related('author').prefetch_related('hashtags').sort_by(sort)
+        # Добавляем аннотацию для проверки избранного
+        if request.user.is_authenticated:
             queryset = queryset.annotate(
                 is_favorite=Case(
-                    When(id__in=list(favorite_recipe_ids), then=True),
+                    When(id__in=favorite_recipe_ids, then=True),
                     default=False,
                     output_field=BooleanField()
                 )
             )
         else:
-            from django.db.models import Value, BooleanField
             queryset = queryset.annotate(is_favorite=Value(False, output_field=BooleanField()))
 
-        # Поиск по ключевым словам
-        query = self.request.GET.get('q')
-        if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(ingredients__name__icontains=query)
-            ).distinct()
-
-        # Фильтрация по нескольким хештегам
-        selected_hashtags = self.request.GET.getlist('hashtags')
-        if selected_hashtags:
-            for hashtag in selected_hashtags:
-                queryset = queryset.filter(hashtags__name=hashtag)
-            queryset = queryset.distinct()
-
-        # Фильтрация по калорийности
-        max_calories = self.request.GET.get('max_calories')
-        if max_calories:
-            queryset = queryset.filter(calories_per_100g__lte=max_calories)
-
-        return queryset
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['all_hashtags'] = Hashtag.objects.all().order_by('name')
-
-        # Получаем список выбранных хештегов для отображения
-        selected_hashtags = self.request.GET.getlist('hashtags')
-        context['selected_hashtags'] = selected_hashtags
-
-        # Альтернативный способ: передаем список ID избранных рецептов
-        if self.request.user.is_authenticated:
-            favorite_recipe_ids = Favorite.objects.filter(
-                user=self.request.user
-            ).values_list('recipe_id', flat=True)
-            context['favorite_recipe_ids'] = list(favorite_recipe_ids)
-        else:
-            context['favorite_recipe_ids'] = []
-
-        return context
+        paginator = Paginator(queryset, self.paginate_by)
+        # Количество уже посчитано асинхронно, Paginator не будет делать COUNT повторно
+        paginator.count = total
+        page_number = request.GET.get('page') or 1
+        if page_number == 'last':
+            page_number = paginator.num_pages
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage:
+            raise Http404('Неверный номер страницы')
+        page.object_list = [recipe async for recipe in page.object_list]
+
+        context = {
+            'recipes': page.object_list,
+            'object_list': page.object_list,
+            'page_obj': page,
+            'paginator': paginator,
+            'is_paginated': page.has_other_pages(),
+            'all_hashtags': all_hashtags.by_name,
+            # Получаем список выбранных хештегов для отображения
+            'selected_hashtags': request.GET.getlist('hashtags'),
+            'favorite_recipe_ids': favorite_recipe_ids,
+            'sort': sort,
+            'sort_choices': SORT_CHOICES,
+        }
+        return await sync_to_async(render)(request, self.template_name, context)
+
+    async def get_favorite_recipe_ids(self, user):
+        if not user.is_authenticated:
+            return []
+        return [
+            recipe_id async for recipe_id in
+            Favorite.objects.filter(user=user).values_list('recipe_id', flat=True)
+        ]
 
 #Отображение детальной информации о конкретном рецепте
-class RecipeDetailView(DetailView):
-    model = Recipe
+class RecipeDetailView(View):
     template_name = 'recipes/recipe_detail.html'
 
+    async def get(self, request, pk):
+        request.user = await request.auser()
+        recipe_query = Recipe.objects.select_related('author').prefetch_related(
+            'ingredients', 'cooking_steps', 'hashtags'
+        ).aget(pk=pk)
+        try:
+            # В страницу встраиваем только первую страницу комментариев,
+            # остальные подгружаются через comments:comment-list
+            recipe, (comments, next_cursor), comments_count, similar = await asyncio.gather(
+                recipe_query,
+                Comment.objects.apage_for_recipe(pk),
+                Comment.objects.filter(recipe_id=pk).acount(),
+                self.get_similar_recipes(pk),
+            )
+        except Recipe.DoesNotExist:
+            raise Http404('Рецепт не найден')
+
+        is_following = request.user.is_authenticated and await Follow.objects.filter(
+            follower_id=request.user.pk, author_id=recipe.author_id
+        ).aexists()
+
+        # ?servings=N - ингредиенты, пересчитанные на N порций
+        servings = self.get_servings(request, recipe)
+        context = {
+            'object': recipe,
+            'recipe': recipe,
+            'servings': servings,
+            'ingredients': recipe.scaled_ingredients(servings),
+            'comments': comments,
+            'next_cursor': next_cursor,
+            'comments_count': comments_count,
+            'similar_recipes': similar,
+            'is_following': is_following,
+        }
+        # Шаблон может обращаться к ленивым связям, поэтому рендерим в потоке
+        return await sync_to_async(render)(request, self.template_name, context)
+
+    async def get_similar_recipes(self, pk):
+        # Список предрассчитан индексом recipes.similarity
+        return [link.similar async for link in similar_links(pk)]
+
+    def get_servings(self, request, recipe):
+        try:
+            servings = int(request.GET.get('servings', recipe.servings))
+        except ValueError:
+            return recipe.servings
+        return servings if 1 <= servings <= MAX_SCALED_SERVINGS else recipe.servings
+
 #Создание нового рецепта(только для авторизованных пользователей)
+@method_decorator(rate_limit('recipe_create'), name='dispatch')
 class RecipeCreateView(LoginRequiredMixin, CreateView):
     model = Recipe
     form_class = RecipeForm
@@ -121,7 +192,7 @@ class RecipeCreateView(LoginRequiredMixin, CreateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['existing_hashtags'] = Hashtag.objects.all().order_by('name')
+        context['existing_hashtags'] = get_vocabulary().by_name
         if self.request.POST:
             context['ingredient_formset'] = IngredientFormSet(
                 self.request.POST, prefix='ingredients'
@@ -147,6 +218,11 @@ class RecipeCreateView(LoginRequiredMixin, CreateView):
 
         # Сохраняем основной рецепт
         self.object = form.save()
+        # Превью для ленты готовит воркер, запрос его не ждет
+        if 'main_photo' in form.changed_data:
+            make_recipe_thumbnail.enqueue(
+                {'recipe_id': self.object.pk}, dedup_key=f"thumbnail:{self.object.pk}"
+            )
 
         try:
             # Сохраняем ингредиенты - ВАЖНО: сначала обрабатываем удаленные формы
@@ -165,7 +241,7 @@ class RecipeCreateView(LoginRequiredMixin, CreateView):
                     if form.instance.pk:
                         form.instance.delete()
             else:
-                print("Ingredient formset errors:", ingredient_formset.errors)
+                logger.debug("Ошибки в ингредиентах: %s", ingredient_formset.errors)
                 # Если есть ошибки, показываем их пользователю
                 return self.render_to_response(self.get_context_data(form=form))
 
@@ -185,14 +261,18 @@ class RecipeCreateView(LoginRequiredMixin, CreateView):
                     if form.instance.pk:
                         form.instance.delete()
             else:
-                print("Cooking step formset errors:", cooking_step_formset.errors)
+                logger.debug("Ошибки в шагах приготовления: %s", cooking_step_formset.errors)
                 # Если есть ошибки, показываем их пользователю
                 return self.render_to_response(self.get_context_data(form=form))
 
+            # КБЖУ по ингредиентам тоже считает воркер
+            compute_recipe_nutrition.enqueue(
+                {'recipe_id': self.object.pk}, dedup_key=f"nutrition:{self.object.pk}"
+            )
             return redirect('recipes:recipe-detail', pk=self.object.pk)
 
-        except Exception as e:
-            print(f"Error saving formsets: {e}")
+        except Exception:
+            logger.exception("Ошибка при сохранении ингредиентов и шагов рецепта %s", self.object.pk)
             return self.render_to_response(self.get_context_data(form=form))
 #Реадктирование существующего рецепта(только для автора)
 class RecipeUpdateView(LoginRequiredMixin, UpdateView):
@@ -202,7 +282,7 @@ class RecipeUpdateView(LoginRequiredMixin, UpdateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['existing_hashtags'] = Hashtag.objects.all()
+        context['existing_hashtags'] = get_vocabulary().by_name
 
         if self.request.POST:
             context['ingredient_formset'] = IngredientFormSet(
@@ -232,6 +312,11 @@ class RecipeUpdateView(LoginRequiredMixin, UpdateView):
 
         # Сохраняем основной рецепт
         self.object = form.save()
+        # Превью для ленты готовит воркер, запрос его не ждет
+        if 'main_photo' in form.changed_data:
+            make_recipe_thumbnail.enqueue(
+                {'recipe_id': self.object.pk}, dedup_key=f"thumbnail:{self.object.pk}"
+            )
 
         try:
             # Сохраняем ингредиенты - ВАЖНО: сначала обрабатываем удаленные формы
@@ -250,8 +335,8 @@ class RecipeUpdateView(LoginRequiredMixin, UpdateView):
                     if form.instance.pk:
                         form.instance.delete()
             else:
-                print("Ingredient formset errors:", ingredient_formset.errors)
-                print("Ingredient formset non-form errors:", ingredient_formset.non_form_errors())
+                logger.debug("Ошибки в ингредиентах: %s; %s",
+                             ingredient_formset.errors, ingredient_formset.non_form_errors())
                 # Если есть ошибки, показываем их пользователю
                 return self.render_to_response(self.get_context_data(form=form))
 
@@ -271,15 +356,19 @@ class RecipeUpdateView(LoginRequiredMixin, UpdateView):
                     if form.instance.pk:
                         form.instance.delete()
             else:
-                print("Cooking step formset errors:", cooking_step_formset.errors)
-                print("Cooking step formset non-form errors:", cooking_step_formset.non_form_errors())
+                logger.debug("Ошибки в шагах приготовления: %s; %s",
+                             cooking_step_formset.errors, cooking_step_formset.non_form_errors())
                 # Если есть ошибки, показываем их пользователю
                 return self.render_to_response(self.get_context_data(form=form))
 
+            # КБЖУ по ингредиентам тоже считает воркер
+            compute_recipe_nutrition.enqueue(
+                {'recipe_id': self.object.pk}, dedup_key=f"nutrition:{self.object.pk}"
+            )
             return redirect('recipes:recipe-detail', pk=self.object.pk)
 
-        except Exception as e:
-            print(f"Error saving formsets: {e}")
+        except Exception:
+            logger.exception("Ошибка при сохранении ингредиентов и шагов рецепта %s", self.object.pk)
             return self.render_to_response(self.get_context_data(form=form))
 
 #Удаление рецепта(только для автора)
@@ -297,14 +386,17 @@ class RecipeDeleteView(LoginRequiredMixin, DeleteView):
 
 #Добавление(если нет)/удаление(если был) в избранное
 @login_required
+@rate_limit('favorites', methods=None)
 def add_to_favorites(request, pk):
     recipe = get_object_or_404(Recipe, pk=pk)
     favorite, created = Favorite.objects.get_or_create(user=request.user, recipe=recipe)
 
     if not created:
         favorite.delete()
+        FAVORITE_TOGGLES.inc(action='remove')
         messages.success(request, 'Рецепт удален из избранного.')
     else:
+        FAVORITE_TOGGLES.inc(action='add')
         messages.success(request, 'Рецепт добавлен в избранное!')
 
     # Возвращаем на предыдущую страницу или на главную
@@ -312,7 +404,24 @@ def add_to_favorites(request, pk):
 
 
 
+#Автодополнение хештегов по префиксу: самые используемые теги из словаря в памяти
+@require_GET
+def hashtag_autocomplete(request):
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    prefix = request.GET.get('q', '')
+    entries = get_vocabulary().complete(prefix, limit) if prefix.strip('# ') else []
+    response = JsonResponse({
+        'results': [{'id': entry.id, 'name': entry.name, 'usage': entry.usage} for entry in entries],
+    })
+    response['Cache-Control'] = 'max-age=60'
+    return response
+
+
 #Реализует расширенный поиск рецептов с фильтрацией
+@rate_limit('search', methods=None)
 def search_recipes(request):
     query = request.GET.get('q', '')
     max_calories = request.GET.get('max_calories', '')
@@ -339,28 +448,28 @@ def search_recipes(request):
         from django.db.models import Value, BooleanField
         recipes = recipes.annotate(is_favorite=Value(False, output_field=BooleanField()))
 
-    if query:
-        recipes = recipes.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(ingredients__name__icontains=query)
-        ).distinct()
-
-    # Фильтрация по нескольким хештегам
-    if selected_hashtags:
-        for hashtag in selected_hashtags:
-            recipes = recipes.filter(hashtags__name=hashtag)
-        recipes = recipes.distinct()
+    sort = request.GET.get('sort') or DEFAULT_SORT
+    found = recipes.filter_by_params(request.GET).sort_by(sort)
+    SEARCHES.inc(kind='recipes')
 
-    if max_calories:
-        recipes = recipes.filter(calories_per_100g__lte=max_calories)
+    # Ничего не нашлось - возможно, опечатка: ищем по исправленному запросу
+    suggestion = None
+    if query and not found.exists():
+        suggestion = suggest(query)
+        if suggestion:
+            params = request.GET.copy()
+            params['q'] = suggestion
+            found = recipes.filter_by_params(params).sort_by(sort)
 
     context = {
-        'recipes': recipes,
+        'recipes': found,
         'query': query,
+        'suggestion': suggestion,
+        'sort': sort,
+        'sort_choices': SORT_CHOICES,
         'max_calories': max_calories,
         'selected_hashtags': selected_hashtags,
-        'all_hashtags': Hashtag.objects.all().order_by('name'),
+        'all_hashtags': get_vocabulary().by_name,
     }
     return render(request, 'recipes/search_results.html', context)
 
@@ -370,6 +479,7 @@ def remove_favorite(request, pk):
 
     if favorite.exists():
         favorite.delete()
+        FAVORITE_TOGGLES.inc(action='remove')
         messages.success(request, 'Рецепт удален из избранного.')
     else:
         messages.error(request, 'Этот рецепт не был в избранном.')
@@ -385,6 +495,7 @@ def remove_from_favorites(request, pk):
 
     if favorite.exists():
         favorite.delete()
+        FAVORITE_TOGGLES.inc(action='remove')
         messages.success(request, 'Рецепт удален из избранного.')
     else:
         messages.error(request, 'Этот рецепт не был в избранном.')
@@ -0,0 +1,100 @@
+# recipes/vocabulary.py
+"""Словарь хештегов в памяти процесса: списки тегов в формах и ленте
+и автодополнение по префиксу без запросов к базе.
+
+Содержимое (id, имя, число рецептов) хранится в кэше под версией. Изменение
+хештегов или привязки тегов к рецептам увеличивает версию, и каждый процесс
+при следующем обращении перестраивает свой экземпляр Vocabulary.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Hashtag, normalize_hashtag
+
+VERSION_KEY = 'hashtag_vocabulary_version'
+ENTRIES_KEY = 'hashtag_vocabulary_entries_{}'
+ENTRIES_TIMEOUT = 24 * 60 * 60
+
+HashtagEntry = namedtuple('HashtagEntry', ['id', 'name', 'usage'])
+
+
+class Vocabulary:
+    def __init__(self, entries):
+        # Для шаблонов - по имени, как раньше Hashtag.objects.order_by('name')
+        self.by_name = sorted(entries, key=lambda entry: entry.name)
+        # Для автодополнения - отсортированный массив нормализованных имен
+        keyed = sorted((normalize_hashtag(entry.name), entry) for entry in entries)
+        self._keys = [key for key, _ in keyed]
+        self._entries = [entry for _, entry in keyed]
+
+    def __iter__(self):
+        return iter(self.by_name)
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def complete(self, prefix, limit=10):
+        """Самые используемые теги, начинающиеся с prefix"""
+        prefix = normalize_hashtag(prefix)
+        start = bisect_left(self._keys, prefix)
+        # Все ключи с этим префиксом меньше prefix + максимальный символ
+        end = bisect_left(self._keys, prefix + '\U0010ffff', start)
+        return heapq.nlargest(limit, self._entries[start:end], key=lambda entry: (entry.usage, -entry.id))
+
+
+_local = {'version': None, 'vocabulary': None}
+_lock = threading.Lock()
+
+
+def _load_entries():
+    return [
+        HashtagEntry(*row) for row in
+        Hashtag.objects.annotate(usage=Count('recipe')).values_list('id', 'name', 'usage')
+    ]
+
+
+def _vocabulary_for(version, entries):
+    with _lock:
+        if _local['version'] != version:
+            _local['vocabulary'] = Vocabulary(entries)
+            _local['version'] = version
+        return _local['vocabulary']
+
+
+def get_vocabulary():
+    """Текущий словарь хештегов (перестраивается только после изменений)"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    if _local['version'] == version:
+        return _local['vocabulary']
+
+    key = ENTRIES_KEY.format(version)
+    entries = cache.get(key)
+    if entries is None:
+        entries = [tuple(entry) for entry in _load_entries()]
+        cache.set(key, entries, ENTRIES_TIMEOUT)
+    return _vocabulary_for(version, [HashtagEntry(*entry) for entry in entries])
+
+
+async def aget_vocabulary():
+    version = await cache.aget(VERSION_KEY)
+    if version is not None and _local['version'] == version:
+        return _local['vocabulary']
+    return await sync_to_async(get_vocabulary)()
+
+
+def invalidate_vocabulary():
+    """Сбросить словарь во всех процессах"""
+    cache.add(VERSION_KEY, 1, None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
@@ -47,18 +47,23 @@ INSTALLED_APPS = [
     'recipes',
     'crispy_forms',
     'others',
+    'api',
+    'jobs',
 ]
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    'others.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'others.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'others.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'recipesAlmanah_project.urls'
@@ -85,12 +90,120 @@ WSGI_APPLICATION = 'recipesAlmanah_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# DATABASE_ENGINE=postgresql переключает проект на PostgreSQL (нужен psycopg[pool]),
+# по умолчанию используется SQLite
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+
+# База для аналитики с интенсивной записью (SearchQuery, HashtagSearch, Statistic),
+# см. others.routers.AnalyticsRouter
+ANALYTICS_DATABASE = 'analytics'
+
+# Реплики только для чтения (others.routers.ReplicaRouter)
+REPLICA_DATABASES = []
+
+if DATABASE_ENGINE == 'postgresql':
+    POSTGRES_DATABASE = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'recipes_almanah'),
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        # Встроенный пул соединений Django 5.1+ (psycopg_pool) несовместим с CONN_MAX_AGE
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 10)),
+                'timeout': int(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+            },
+        },
+    }
+    DATABASES = {
+        'default': POSTGRES_DATABASE,
+        # Аналитика - в отдельной схеме той же базы (схему нужно создать заранее);
+        # public остается в search_path, чтобы находились таблицы пользователей и хештегов
+        ANALYTICS_DATABASE: {
+            **POSTGRES_DATABASE,
+            'OPTIONS': {
+                **POSTGRES_DATABASE['OPTIONS'],
+                'options': '-c search_path={},public'.format(
+                    os.environ.get('POSTGRES_ANALYTICS_SCHEMA', 'analytics')
+                ),
+            },
+        },
+    }
+    # Хосты реплик через запятую
+    for number, host in enumerate(filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')), 1):
+        alias = f'replica{number}'
+        DATABASES[alias] = {**POSTGRES_DATABASE, 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+        REPLICA_DATABASES.append(alias)
+else:
+    SQLITE_DATABASE = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # Переиспользуем соединения между запросами, проверяя их перед использованием
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Сколько секунд ждать освобождения блокировки записи
+            'timeout': 20,
+            # Транзакции берут блокировку записи сразу (BEGIN IMMEDIATE),
+            # а не при первой записи - так не бывает deadlock при повышении блокировки
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
+    DATABASES = {
+        'default': {**SQLITE_DATABASE, 'NAME': BASE_DIR / 'db.sqlite3'},
+        # Отдельный файл - своя блокировка записи, не конкурирует с рецептами и избранным
+        ANALYTICS_DATABASE: {**SQLITE_DATABASE, 'NAME': BASE_DIR / 'analytics.sqlite3'},
+    }
+    # Локальная реплика - копия db.sqlite3, обновляемая командой sync_replica
+    if os.environ.get('SQLITE_REPLICA'):
+        DATABASES['replica'] = {
+            **SQLITE_DATABASE,
+            'NAME': BASE_DIR / 'db_replica.sqlite3',
+            'TEST': {'MIRROR': 'default'},
+        }
+        REPLICA_DATABASES.append('replica')
+
+DATABASE_ROUTERS = ['others.routers.AnalyticsRouter', 'others.routers.ReplicaRouter']
+
+# Представления, которые могут читать с реплик
+REPLICA_READ_VIEWS = [
+    'recipes:home',
+    'recipes:recipe-detail',
+    'recipes:search-recipes',
+    'others:articles-list',
+    'others:statistics',
+    'others:public-statistics',
+    'api:recipe-list',
+    'api:recipe-detail',
+    'api:recipe-comments',
+    'api:hashtag-list',
+    'api:article-list',
+    'api:article-detail',
+]
+# Сколько секунд после записи пользователь читает только из основной базы
+REPLICA_PIN_SECONDS = 10
+
+# PRAGMA для каждого нового соединения с SQLite (others.db)
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'cache_size': -20000,  # ~20 МБ страничного кэша
+    'mmap_size': 134217728,  # 128 МБ
+    'temp_store': 'MEMORY',
 }
+# Продакшен-профиль: WAL (читатели не ждут писателя) и synchronous=NORMAL.
+# WAL сохраняется в самом файле базы, поэтому локально (DEBUG) по умолчанию
+# выключен - иначе любая команда manage.py переводит отслеживаемый db.sqlite3
+# в WAL и создает рядом -wal/-shm. Включить явно: SQLITE_WAL=1
+SQLITE_WAL_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+}
+SQLITE_WAL = os.environ.get('SQLITE_WAL', '0' if DEBUG else '1') == '1'
+if SQLITE_WAL:
+    SQLITE_PRAGMAS = {**SQLITE_WAL_PRAGMAS, **SQLITE_PRAGMAS}
 
 
 
@@ -146,3 +259,121 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+
+# Кэш: маленький LRU в памяти процесса для самых горячих ключей поверх общего
+# для всех воркеров бэкенда (others.cache.TieredCache). Общий уровень - Redis
+# из REDIS_URL, без него - файловый кэш в CACHE_DIR.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR') or BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'others.cache.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_PREFIXES': ['site_statistics', 'hashtag_vocabulary', 'page_cache_tag_', 'auth_user_'],
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 30,
+            'INVALIDATION_POLL_INTERVAL': 1,
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
+# Хранение сессий: SESSION_STRATEGY = db (запрос к django_session на каждый запрос),
+# cached_db (чтение из кэша, запись в кэш и базу), cache (только кэш, сессии теряются
+# при его очистке) или signed_cookies (данные в подписанной cookie, без хранилища;
+# выход не отзывает скопированную cookie, размер ограничен ~4 КБ)
+SESSION_STRATEGY = os.environ.get('SESSION_STRATEGY', 'cached_db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_STRATEGY]
+SESSION_CACHE_ALIAS = 'shared'
+
+# Пользователь с профилем кэшируется между запросами (users.backends), в секундах.
+# ModelBackend оставлен, чтобы не разлогинить сессии, созданные до перехода на кэш
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend', 'django.contrib.auth.backends.ModelBackend']
+USER_CACHE_TIMEOUT = 300
+
+# Кэш целых страниц для анонимных посетителей (others.page_cache), в секундах
+PAGE_CACHE_TIMEOUT = 300
+
+# Ограничение частоты запросов (others.ratelimit): "<число>/<период s|m|h|d>" на
+# пользователя (анонимов - на IP). Счетчики в общем кэше, атомарно - только в Redis
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMITS = {
+    'favorites': '60/m',
+    'comments': '10/m',
+    'search': '30/m',
+    'recipe_create': '20/h',
+}
+
+# Очередь фоновых задач (jobs): базовая задержка повтора после ошибки
+# и время, после которого задача "выполняется" считается брошенной, в секундах
+JOB_RETRY_DELAY = 30
+JOB_STALE_SECONDS = 600
+# Как часто накопленные счетчики (просмотры статей) сбрасываются в базу
+COUNTER_FLUSH_INTERVAL = 30
+
+# Логирование: запись через очередь (others.log.QueueStreamHandler), уровни по модулям.
+# LOG_LEVEL - общий уровень приложений, LOG_LEVELS - точечно, например
+# LOG_LEVELS="others.models=DEBUG,django.db.backends=DEBUG"
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_LEVELS = dict(
+    item.split('=', 1) for item in os.environ.get('LOG_LEVELS', '').split(',') if '=' in item
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            'format': '{asctime} {levelname} {name} [{process}] {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'others.log.QueueStreamHandler',
+            'formatter': 'verbose',
+            'stream': 'ext://sys.stdout',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        **{app: {'level': LOG_LEVEL} for app in ('api', 'comments', 'jobs', 'others', 'recipes', 'users')},
+        **{name.strip(): {'level': level.strip().upper()} for name, level in LOG_LEVELS.items()},
+    },
+}
+
+# Метрики Prometheus (others.metrics), отдаются на /metrics.
+# Под gunicorn с несколькими воркерами укажите METRICS_DIR - общий каталог
+# для файлов метрик процессов (очищайте его при перезапуске сервера)
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+
+# Выборочное профилирование запросов (others.profiling): PROFILING_ENABLED включает
+# middleware, PROFILING_SAMPLE_RATE - доля профилируемых запросов (0..1), персонал
+# может запросить профиль заголовком X-Profile: 1. Файлы складываются в PROFILING_DIR
+# по именам URL и сводятся командой aggregate_profiles.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_INTERVAL = 0.005
+PROFILING_DIR = os.environ.get('PROFILING_DIR') or BASE_DIR / 'profiles'
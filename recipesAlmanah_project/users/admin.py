@@ -1,8 +1,15 @@
 from django.contrib import admin
-from .models import Profile
+from .models import Profile, Follow
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'location', 'birth_date']
+    list_display = ['user', 'location', 'birth_date', 'followers_count']
     list_filter = ['location']
-    search_fields = ['user__username']
\ No newline at end of file
+    search_fields = ['user__username']
+
+
+@admin.register(Follow)
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ['follower', 'author', 'created_at']
+    search_fields = ['follower__username', 'author__username']
+    raw_id_fields = ['follower', 'author']
@@ -0,0 +1,49 @@
+# users/backends.py
+"""Бэкенд аутентификации с кэшем пользователя.
+
+AuthenticationMiddleware на каждом запросе загружает пользователя по id из
+сессии, а шаблоны следом обращаются к user.profile - два запроса к базе.
+CachedModelBackend держит пользователя вместе с профилем в кэше
+(ключ auth_user_<id>, USER_CACHE_TIMEOUT секунд). Кэш сбрасывается при
+сохранении или удалении User и Profile (сигналы в users.models); изменения
+через QuerySet.update() (например, followers_count) видны после истечения
+USER_CACHE_TIMEOUT.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_PREFIX = 'auth_user_'
+USER_CACHE_TIMEOUT = getattr(settings, 'USER_CACHE_TIMEOUT', 300)
+
+
+def user_cache_key(user_id):
+    return f'{USER_CACHE_PREFIX}{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            UserModel = get_user_model()
+            try:
+                user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # Попадание в локальный уровень кэша - без перехода в поток
+        user = await cache.aget(user_cache_key(user_id))
+        if user is not None:
+            return user if self.user_can_authenticate(user) else None
+        # Промах: тот же путь, что в get_user - с профилем и записью в кэш
+        return await sync_to_async(self.get_user)(user_id)
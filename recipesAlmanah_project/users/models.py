@@ -1,7 +1,16 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils.dateparse import parse_datetime
+
+# Количество записей ленты подписок на одной странице
+TIMELINE_PAGE_SIZE = 20
+# Авторам с большим числом подписчиков ленты не рассылаются: их публикации
+# подмешиваются при чтении (TimelineManager._pulled_entries)
+TIMELINE_FANOUT_LIMIT = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 5000)
 
 #Описание модели Profile
 class Profile(models.Model):
@@ -12,6 +21,8 @@ class Profile(models.Model):
     birth_date = models.DateField(null=True, blank=True)
     profile_photo = models.ImageField(upload_to='profile_photos/', null=True, blank=True)
     show_favorites = models.BooleanField(default=True)
+    # Денормализованное число подписчиков: решает, рассылать ли публикации по лентам
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
     User.add_to_class('profile_photo', models.ImageField(upload_to='profile_photos/', null=True, blank=True))
     User.add_to_class('show_favorites', models.BooleanField(default=True))
 
@@ -33,4 +44,136 @@ def create_user_profile(sender, instance, created, **kwargs):
 def save_user_profile(sender, instance, **kwargs):
     #Добавление для избегание циклического сохранения
     if hasattr(instance, 'profile'):
-        instance.profile.save(update_fields=['user'])
\ No newline at end of file
+        instance.profile.save(update_fields=['user'])
+
+
+#Сброс кэша пользователя (users.backends.CachedModelBackend) при изменении пользователя или профиля
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    from .backends import invalidate_cached_user
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    from .backends import invalidate_cached_user
+    invalidate_cached_user(instance.user_id)
+
+
+#Подписка пользователя на автора
+class Follow(models.Model):
+    follower = models.ForeignKey(User, related_name='following_links', on_delete=models.CASCADE)
+    author = models.ForeignKey(User, related_name='follower_links', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'author'], name='follow_unique'),
+            models.CheckConstraint(condition=~Q(follower=models.F('author')), name='follow_not_self'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} -> {self.author_id}"
+
+
+class TimelineManager(models.Manager):
+    def page_for_user(self, user, cursor=None, limit=TIMELINE_PAGE_SIZE):
+        """Страница ленты подписок (новые сверху) с курсорной пагинацией
+
+        Курсор - строка "<published_at>_<id>" последней записи предыдущей страницы.
+        Записи ленты читаются одним диапазонным запросом по индексу (user, -published_at, -id),
+        публикации авторов без рассылки подмешиваются отдельными запросами.
+        Возвращает кортеж (список записей, курсор следующей страницы или None).
+        """
+        before = self.parse_cursor(cursor) if cursor else None
+        queryset = self.filter(user=user).select_related('author', 'recipe', 'article').order_by('-published_at', '-id')
+        if before:
+            published_at, last_id = before
+            queryset = queryset.filter(
+                Q(published_at__lt=published_at) |
+                Q(published_at=published_at, id__lt=last_id)
+            )
+        # Берем на один больше, чтобы понять, есть ли следующая страница
+        entries = list(queryset[:limit + 1])
+
+        pulled = self._pulled_entries(user, before, limit + 1)
+        if pulled:
+            seen = {entry.key for entry in entries}
+            entries.extend(entry for entry in pulled if entry.key not in seen)
+            entries.sort(key=lambda entry: (entry.published_at, entry.id or 0), reverse=True)
+
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            last = entries[-1]
+            next_cursor = f"{last.published_at.isoformat()}_{last.id or 0}"
+        return entries, next_cursor
+
+    def _pulled_entries(self, user, before, limit):
+        """Публикации подписок с большим числом подписчиков (чтение вместо рассылки)"""
+        from others.models import Article
+        from recipes.models import Recipe
+
+        author_ids = list(Follow.objects.filter(
+            follower=user, author__profile__followers_count__gt=TIMELINE_FANOUT_LIMIT,
+        ).values_list('author_id', flat=True))
+        if not author_ids:
+            return []
+
+        recipes = Recipe.objects.filter(author_id__in=author_ids).select_related('author').order_by('-created_at')
+        articles = Article.objects.filter(author_id__in=author_ids, is_published=True).select_related('author')
+        if before:
+            recipes = recipes.filter(created_at__lt=before[0])
+            articles = articles.filter(published_at__lt=before[0])
+        pulled = [
+            TimelineEntry(user=user, author=recipe.author, recipe=recipe, published_at=recipe.created_at)
+            for recipe in recipes[:limit]
+        ]
+        pulled += [
+            TimelineEntry(user=user, author=article.author, article=article, published_at=article.published_at)
+            for article in articles.order_by('-published_at')[:limit]
+        ]
+        return pulled
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """Разобрать курсор, ValueError при неверном формате"""
+        published_at, _, last_id = cursor.rpartition('_')
+        parsed = parse_datetime(published_at)
+        if parsed is None:
+            raise ValueError(f"Неверный курсор: {cursor}")
+        return parsed, int(last_id)
+
+
+#Запись ленты подписок: рецепт или статья автора, на которого подписан пользователь
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, related_name='timeline_entries', on_delete=models.CASCADE)
+    author = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    recipe = models.ForeignKey('recipes.Recipe', null=True, blank=True, related_name='+', on_delete=models.CASCADE)
+    article = models.ForeignKey('others.Article', null=True, blank=True, related_name='+', on_delete=models.CASCADE)
+    published_at = models.DateTimeField()
+
+    objects = TimelineManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-published_at', '-id'], name='timeline_user_published_idx'),
+        ]
+        constraints = [
+            # Повторная рассылка той же публикации не создает дубликатов
+            models.UniqueConstraint(fields=['user', 'recipe'], name='timeline_user_recipe_unique'),
+            models.UniqueConstraint(fields=['user', 'article'], name='timeline_user_article_unique'),
+            models.CheckConstraint(
+                condition=Q(recipe__isnull=False, article__isnull=True) | Q(recipe__isnull=True, article__isnull=False),
+                name='timeline_recipe_or_article',
+            ),
+        ]
+
+    @property
+    def key(self):
+        return ('recipe', self.recipe_id) if self.recipe_id else ('article', self.article_id)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
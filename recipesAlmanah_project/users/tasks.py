@@ -0,0 +1,20 @@
+# users/tasks.py
+"""Фоновые задачи пользователей (выполняются воркером jobs: manage.py run_worker)"""
+from jobs.registry import task
+
+
+@task()
+def fan_out_publication(kind, object_id):
+    """Разослать новый рецепт (kind='recipe') или статью (kind='article') подписчикам автора"""
+    from others.models import Article
+    from recipes.models import Recipe
+    from .timeline import fan_out
+
+    if kind == 'recipe':
+        row = Recipe.objects.filter(pk=object_id).values_list('author_id', 'created_at').first()
+        if row:
+            fan_out(row[0], row[1], recipe_id=object_id)
+    else:
+        row = Article.objects.filter(pk=object_id, is_published=True).values_list('author_id', 'published_at').first()
+        if row:
+            fan_out(row[0], row[1], article_id=object_id)
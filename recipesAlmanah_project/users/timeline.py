@@ -0,0 +1,84 @@
+# users/timeline.py
+"""Лента подписок: рассылка публикаций по лентам подписчиков при записи.
+
+Новый рецепт или статья автора ставит задачу fan_out_publication, которая
+пачками по FANOUT_BATCH_SIZE вставляет записи TimelineEntry всем
+подписчикам. Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+не рассылаются - их публикации лента подмешивает при чтении.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import TIMELINE_FANOUT_LIMIT, Follow, Profile, TimelineEntry
+
+FANOUT_BATCH_SIZE = 1000
+# Сколько последних публикаций автора добавить в ленту при подписке
+BACKFILL_SIZE = 20
+
+
+def follow(follower, author):
+    """Подписаться; True, если подписка создана"""
+    if follower.pk == author.pk:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(follower=follower, author=author)
+            Profile.objects.filter(user=author).update(followers_count=F('followers_count') + 1)
+    except IntegrityError:
+        return False
+    _backfill(follower, author)
+    return True
+
+
+def unfollow(follower, author):
+    """Отписаться; True, если подписка была"""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(follower=follower, author=author).delete()
+        if deleted:
+            Profile.objects.filter(user=author, followers_count__gt=0).update(
+                followers_count=F('followers_count') - 1
+            )
+            TimelineEntry.objects.filter(user=follower, author=author).delete()
+    return bool(deleted)
+
+
+def _backfill(follower, author):
+    """Последние публикации автора - в ленту нового подписчика"""
+    from others.models import Article
+    from recipes.models import Recipe
+
+    entries = [
+        TimelineEntry(user=follower, author=author, recipe_id=recipe_id, published_at=created_at)
+        for recipe_id, created_at in Recipe.objects.filter(author=author).order_by('-created_at')
+        .values_list('id', 'created_at')[:BACKFILL_SIZE]
+    ]
+    entries += [
+        TimelineEntry(user=follower, author=author, article_id=article_id, published_at=published_at)
+        for article_id, published_at in Article.objects.filter(author=author, is_published=True)
+        .order_by('-published_at').values_list('id', 'published_at')[:BACKFILL_SIZE]
+    ]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(author_id, published_at, recipe_id=None, article_id=None):
+    """Разослать публикацию по лентам подписчиков. Возвращает число лент (0 - без рассылки)"""
+    followers_count = Profile.objects.filter(user_id=author_id).values_list('followers_count', flat=True).first()
+    if not followers_count or followers_count > TIMELINE_FANOUT_LIMIT:
+        return 0
+
+    delivered = 0
+    batch = []
+    follower_ids = Follow.objects.filter(author_id=author_id).values_list('follower_id', flat=True)
+    for follower_id in follower_ids.iterator(chunk_size=FANOUT_BATCH_SIZE):
+        batch.append(TimelineEntry(
+            user_id=follower_id, author_id=author_id, recipe_id=recipe_id, article_id=article_id,
+            published_at=published_at,
+        ))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            delivered += len(batch)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        delivered += len(batch)
+    return delivered
@@ -11,4 +11,6 @@ urlpatterns = [
     path('profile/', views.profile, name='profile'),
     path('profile/edit/', views.edit_profile, name='edit_profile'),
     path('favorite/remove/<int:pk>/', views.remove_favorite, name='remove-favorite'),
+    path('follow/<int:author_id>/', views.follow_author, name='follow-author'),
+    path('timeline/', views.timeline, name='timeline'),
 ]
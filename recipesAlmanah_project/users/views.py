@@ -1,11 +1,20 @@
+import logging
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.urls import reverse
 from recipes.models import Recipe, Favorite
 from comments.models import Comment
 from django.views.decorators.http import require_http_methods
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
+from .models import TimelineEntry
+from .timeline import follow, unfollow
+
+logger = logging.getLogger(__name__)
 
 
 # Обработка регистрации новых пользователей на сайте
@@ -49,11 +58,6 @@ def profile(request):
         # Получаем список рецептов из избранного для отображения
         favorite_recipes = Recipe.objects.filter(favorite__user=request.user)
 
-        # Отладочная информация
-        print(f"User: {request.user}")
-        print(f"User recipes count: {user_recipes.count()}")
-        print(f"User favorites count: {user_favorites.count()}")
-
         context = {
             'title': 'Профиль пользователя',
             'user_recipes': user_recipes,
@@ -64,6 +68,7 @@ def profile(request):
 
         return render(request, 'users/profile.html', context)
     except Exception as e:
+        logger.exception("Ошибка при загрузке профиля пользователя %s", request.user.pk)
         messages.error(request, f'Произошла ошибка при загрузке профиля: {str(e)}')
         return render(request, 'users/profile.html', {
             'user_recipes': [],
@@ -129,4 +134,34 @@ def remove_favorite(request, pk):
 @require_http_methods(['GET', 'POST'])
 def custom_logout(request):
     logout(request)
-    return redirect('recipes:home')
\ No newline at end of file
+    return redirect('recipes:home')
+
+
+# Подписка на автора или отписка (если уже подписан)
+@login_required
+@require_http_methods(['POST'])
+def follow_author(request, author_id):
+    author = get_object_or_404(User, pk=author_id)
+    if author == request.user:
+        messages.error(request, 'Нельзя подписаться на самого себя.')
+    elif follow(request.user, author):
+        messages.success(request, f'Вы подписались на {author.username}.')
+    else:
+        unfollow(request.user, author)
+        messages.success(request, f'Вы отписались от {author.username}.')
+    return redirect(request.META.get('HTTP_REFERER', reverse('users:timeline')))
+
+
+# Лента публикаций авторов, на которых подписан пользователь
+@login_required
+def timeline(request):
+    try:
+        entries, next_cursor = TimelineEntry.objects.page_for_user(request.user, request.GET.get('cursor'))
+    except ValueError:
+        raise Http404('Неверный курсор')
+    return render(request, 'users/timeline.html', {
+        'title': 'Лента подписок',
+        'entries': entries,
+        'next_cursor': next_cursor,
+        'following_count': request.user.following_links.count(),
+    })